@@ -0,0 +1,148 @@
+"""Análisis de tendencias de cortes con NumPy.
+
+Las columnas necesarias de ``hair_cuts`` se leen en una sola consulta, por
+lotes, directo a arreglos (nunca objetos del ORM) y todo se calcula de forma
+vectorizada. La memoria por request queda acotada por la ventana de semanas
+(``MAX_WEEKS``): unos 20 bytes por corte.
+"""
+from datetime import date, timedelta
+
+import numpy as np
+from sqlalchemy import select
+
+import archive
+from models import db
+
+BATCH_SIZE = 10000
+DEFAULT_WEEKS = 52
+MAX_WEEKS = 260
+MOVING_AVERAGE_WEEKS = (4, 12)
+
+
+def fetch_columns(start, end, shop_id, user_id=None):
+    """Cortes de la sede entre ``start`` y ``end`` como arreglos columnares.
+
+    Devuelve un dict con ``day`` (días desde ``start``), ``hour`` (hora local
+    de registro, -1 si no hay), ``quantity``, ``total`` y ``user_id``.
+    """
+    cuts = archive.hair_cuts(start)
+    query = select(
+        cuts.date_cut, cuts.date_recorded, cuts.quantity, cuts.total, cuts.user_id,
+    ).where(cuts.shop_id == shop_id, cuts.date_cut.between(start, end))
+    if user_id is not None:
+        query = query.where(cuts.user_id == user_id)
+
+    base = np.datetime64(start, 'D')
+    chunks = []
+    result = db.session.execute(query.execution_options(yield_per=BATCH_SIZE))
+    for rows in result.partitions():
+        cut_days, recorded, quantity, total, users = zip(*rows)
+        chunks.append((
+            (np.array(cut_days, dtype='datetime64[D]') - base).astype(np.int32),
+            np.array([r.hour if r else -1 for r in recorded], dtype=np.int8),
+            np.array(quantity, dtype=np.int32),
+            np.array(total, dtype=np.float64),
+            np.array(users, dtype=np.int32),
+        ))
+
+    names = ('day', 'hour', 'quantity', 'total', 'user_id')
+    dtypes = (np.int32, np.int8, np.int32, np.float64, np.int32)
+    if not chunks:
+        return {name: np.empty(0, dtype=dtype) for name, dtype in zip(names, dtypes)}
+    return {name: np.concatenate(parts) for name, parts in zip(names, zip(*chunks))}
+
+
+def moving_average(values, window):
+    """Media móvil simple; las primeras ``window - 1`` posiciones quedan en NaN."""
+    result = np.full(len(values), np.nan)
+    if len(values) >= window:
+        sums = np.cumsum(np.insert(values, 0, 0.0))
+        result[window - 1:] = (sums[window:] - sums[:-window]) / window
+    return result
+
+
+def growth(values):
+    """Variación porcentual contra el periodo anterior (NaN si era cero)."""
+    result = np.full(len(values), np.nan)
+    previous = values[:-1]
+    with np.errstate(divide='ignore', invalid='ignore'):
+        result[1:] = np.where(previous > 0, (values[1:] - previous) / previous * 100, np.nan)
+    return result
+
+
+def _clean(values, digits=2):
+    """Arreglo -> lista para JSON/plantillas, con ``None`` en lugar de NaN."""
+    return [None if np.isnan(value) else round(float(value), digits) for value in values]
+
+
+def barber_analytics(shop_id, weeks=DEFAULT_WEEKS, user_id=None, end=None, utc_offset_hours=0):
+    """Tendencias de las últimas ``weeks`` semanas completas o en curso.
+
+    Las semanas empiezan el lunes. ``utc_offset_hours`` pasa ``date_recorded``
+    (UTC) a la hora local para el reparto por hora.
+    """
+    end = end or date.today()
+    weeks = max(1, min(weeks, MAX_WEEKS))
+    start = end - timedelta(days=end.weekday()) - timedelta(weeks=weeks - 1)
+    columns = fetch_columns(start, end, shop_id, user_id)
+    day, quantity, total = columns['day'], columns['quantity'], columns['total']
+
+    # Día de la semana (0 = lunes) del corte; ``start`` es lunes
+    weekday = day % 7
+    by_weekday = np.bincount(weekday, weights=quantity, minlength=7)
+
+    hour = columns['hour'].astype(np.int16)
+    has_hour = hour >= 0
+    local_hour = (hour[has_hour] + utc_offset_hours) % 24
+    by_hour = np.bincount(local_hour, weights=quantity[has_hour], minlength=24)
+    heatmap = np.bincount(weekday[has_hour] * 24 + local_hour,
+                          weights=quantity[has_hour], minlength=7 * 24).reshape(7, 24)
+
+    week = day // 7
+    weekly_quantity = np.bincount(week, weights=quantity, minlength=weeks)[:weeks]
+    weekly_total = np.bincount(week, weights=total, minlength=weeks)[:weeks]
+
+    users, user_index = np.unique(columns['user_id'], return_inverse=True)
+    user_quantity = np.bincount(user_index, weights=quantity, minlength=len(users))
+    user_total = np.bincount(user_index, weights=total, minlength=len(users))
+    last_week = week == weeks - 1
+    previous_week = week == weeks - 2
+    user_last = np.bincount(user_index[last_week], weights=total[last_week], minlength=len(users))
+    user_previous = np.bincount(user_index[previous_week], weights=total[previous_week],
+                                minlength=len(users))
+
+    total_quantity = int(quantity.sum())
+    with np.errstate(divide='ignore', invalid='ignore'):
+        user_ticket = np.where(user_quantity > 0, user_total / user_quantity, np.nan)
+        user_growth = np.where(user_previous > 0, (user_last - user_previous) / user_previous * 100, np.nan)
+
+    return {
+        'start': start.isoformat(),
+        'end': end.isoformat(),
+        'weeks': weeks,
+        'cuts': total_quantity,
+        'total': round(float(total.sum()), 2),
+        'average_ticket': round(float(total.sum()) / total_quantity, 2) if total_quantity else None,
+        'by_weekday': [int(value) for value in by_weekday],
+        'by_hour': [int(value) for value in by_hour],
+        'heatmap': heatmap.astype(int).tolist(),
+        'weekly': {
+            'week_start': [(start + timedelta(weeks=i)).isoformat() for i in range(weeks)],
+            'quantity': [int(value) for value in weekly_quantity],
+            'total': _clean(weekly_total),
+            'growth': _clean(growth(weekly_total), 1),
+            **{f'moving_average_{window}': _clean(moving_average(weekly_total, window))
+               for window in MOVING_AVERAGE_WEEKS},
+        },
+        'barbers': [
+            {
+                'user_id': int(users[i]),
+                'cuts': int(user_quantity[i]),
+                'total': round(float(user_total[i]), 2),
+                'average_ticket': _clean([user_ticket[i]])[0],
+                'last_week': round(float(user_last[i]), 2),
+                'week_over_week': _clean([user_growth[i]], 1)[0],
+            }
+            for i in np.argsort(-user_total)
+        ],
+    }
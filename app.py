@@ -1,527 +1,151 @@
-from flask import Flask, render_template, request, redirect, url_for, flash, session, jsonify
-from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, date, timedelta
-from functools import wraps
+from flask import Flask
+from werkzeug.middleware.proxy_fix import ProxyFix
 import os
 import logging
 
+import assets
+import cache
+import cli
+import jobs
+import metrics
+import slow_queries
+import query_counter
+import ratelimit
+import replicas
+from models import db
+from views import bp
+
 # Configurar logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
-app = Flask(__name__)
 
-# ✅ CONFIGURACIÓN MEJORADA - FORZAR POSTGRESQL
-app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'barberapp_secret_key_2024')
+def database_url():
+    """URL de la base de datos; PostgreSQL en Render, SQLite local si no hay."""
+    url = os.environ.get('DATABASE_URL')
+    if not url:
+        return None
+    return normalize_url(url)
 
-# OBTENER Y CONFIGURAR DATABASE_URL DE RENDER
-database_url = os.environ.get('DATABASE_URL')
 
-if database_url:
+def normalize_url(url):
     # ✅ CONVERTIR a formato PostgreSQL correcto
-    if database_url.startswith('postgres://'):
-        database_url = database_url.replace('postgres://', 'postgresql://', 1)
-    app.config['SQLALCHEMY_DATABASE_URI'] = database_url
-    logger.info("✅ PostgreSQL CONFIGURADO - Los datos se guardarán permanentemente")
-else:
-    # ❌ FALLBACK a SQLite (pero mostrar advertencia)
-    app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///temp_database.db'
-    logger.warning("⚠️  ADVERTENCIA: No hay DATABASE_URL - usando SQLite (datos temporales)")
-
-app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
-app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
-    'pool_recycle': 300,
-    'pool_pre_ping': True
-}
-
-db = SQLAlchemy(app)
-
-# Modelos
-class User(db.Model):
-    __tablename__ = 'users'
-    id = db.Column(db.Integer, primary_key=True)
-    email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
-    name = db.Column(db.String(100), nullable=False)
-    role = db.Column(db.String(20), nullable=False, default='barbero')
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    
-    cuts = db.relationship('HairCut', backref='barber', lazy=True)
-    
-    def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-    
-    def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
-
-class HairCut(db.Model):
-    __tablename__ = 'hair_cuts'
-    id = db.Column(db.Integer, primary_key=True)
-    date_cut = db.Column(db.Date, nullable=False)
-    date_recorded = db.Column(db.DateTime, default=datetime.utcnow)
-    price = db.Column(db.Float, nullable=False)
-    quantity = db.Column(db.Integer, nullable=False, default=1)
-    total = db.Column(db.Float, nullable=False)
-    divided_total = db.Column(db.Float, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-
-class MonthlyExpense(db.Model):
-    __tablename__ = 'monthly_expenses'
-    id = db.Column(db.Integer, primary_key=True)
-    month_year = db.Column(db.String(7), nullable=False)
-    amount = db.Column(db.Float, nullable=False)
-    description = db.Column(db.String(200))
-    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
-    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    if url.startswith('postgres://'):
+        url = url.replace('postgres://', 'postgresql://', 1)
+    return url
 
-class ProductSale(db.Model):
-    __tablename__ = 'product_sales'
-    id = db.Column(db.Integer, primary_key=True)
-    date_sale = db.Column(db.Date, nullable=False)
-    date_recorded = db.Column(db.DateTime, default=datetime.utcnow)
-    product_name = db.Column(db.String(200), nullable=False)
-    price = db.Column(db.Float, nullable=False)
-    quantity = db.Column(db.Integer, nullable=False, default=1)
-    total = db.Column(db.Float, nullable=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
 
-# Decoradores
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-        return f(*args, **kwargs)
-    return decorated_function
+def replica_urls():
+    """URLs de réplicas de sólo lectura (``DATABASE_REPLICA_URLS``, separadas por comas)."""
+    urls = os.environ.get('DATABASE_REPLICA_URLS', '')
+    return [normalize_url(url.strip()) for url in urls.split(',') if url.strip()]
 
-def jefe_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        if 'user_id' not in session:
-            return redirect(url_for('login'))
-        user = User.query.get(session['user_id'])
-        if user.role != 'jefe':
-            flash('No tienes permisos para acceder a esta página', 'error')
-            return redirect(url_for('dashboard'))
-        return f(*args, **kwargs)
-    return decorated_function
 
-# Rutas
-@app.route('/')
-def index():
-    if 'user_id' in session:
-        user = User.query.get(session['user_id'])
-        if user.role == 'jefe':
-            return redirect(url_for('admin_dashboard'))
-        else:
-            return redirect(url_for('dashboard'))
-    return redirect(url_for('login'))
+def create_app(config=None):
+    """Crea la aplicación. No abre conexiones: la base de datos se prepara
+    con ``flask --app app init-db``."""
+    app = Flask(__name__)
 
-@app.route('/login', methods=['GET', 'POST'])
-def login():
-    try:
-        if request.method == 'POST':
-            email = request.form['email']
-            password = request.form['password']
-            
-            logger.info(f"Intento de login para: {email}")
-            
-            user = User.query.filter_by(email=email).first()
-            
-            if user and user.check_password(password):
-                session['user_id'] = user.id
-                session['user_name'] = user.name
-                session['user_role'] = user.role
-                
-                logger.info(f"Login exitoso: {user.name} ({user.role})")
-                
-                if user.role == 'jefe':
-                    return redirect(url_for('admin_dashboard'))
-                else:
-                    return redirect(url_for('dashboard'))
-            else:
-                flash('Email o contraseña incorrectos', 'error')
-                logger.warning(f"Login fallido para: {email}")
-        
-        return render_template('login.html')
-        
-    except Exception as e:
-        logger.error(f"Error en login: {str(e)}")
-        flash('Error interno del servidor. Por favor intenta nuevamente.', 'error')
-        return render_template('login.html')
+    # ✅ CONFIGURACIÓN MEJORADA - FORZAR POSTGRESQL
+    app.config['SECRET_KEY'] = os.environ.get('SECRET_KEY', 'barberapp_secret_key_2024')
 
-@app.route('/register', methods=['GET', 'POST'])
-@jefe_required
-def register():
-    if request.method == 'POST':
-        try:
-            email = request.form['email']
-            name = request.form['name']
-            password = request.form['password']
-            role = request.form['role']
-            
-            if User.query.filter_by(email=email).first():
-                flash('El email ya está registrado', 'error')
-                return render_template('register.html')
-            
-            user = User(email=email, name=name, role=role)
-            user.set_password(password)
-            
-            db.session.add(user)
-            db.session.commit()
-            
-            flash('Usuario creado exitosamente', 'success')
-            return redirect(url_for('admin_users'))
-            
-        except Exception as e:
-            flash('Error al crear usuario: ' + str(e), 'error')
-    
-    return render_template('register.html')
-
-@app.route('/dashboard')
-@login_required
-def dashboard():
-    try:
-        user = User.query.get(session['user_id'])
-        today = date.today()
-        today_cuts = HairCut.query.filter_by(user_id=user.id, date_cut=today).all()
-        
-        # ✅ CORREGIDO: Usar divided_total REAL de la base de datos
-        daily_total = sum(cut.total for cut in today_cuts)
-        daily_divided = sum(cut.divided_total for cut in today_cuts)
-        
-        week_ago = today - timedelta(days=7)
-        weekly_cuts = HairCut.query.filter(
-            HairCut.user_id == user.id,
-            HairCut.date_cut >= week_ago
-        ).all()
-        
-        weekly_total = sum(cut.total for cut in weekly_cuts)
-        weekly_divided = sum(cut.divided_total for cut in weekly_cuts)
-        
-        two_weeks_ago = today - timedelta(days=14)
-        biweekly_cuts = HairCut.query.filter(
-            HairCut.user_id == user.id,
-            HairCut.date_cut >= two_weeks_ago
-        ).all()
-        
-        biweekly_total = sum(cut.total for cut in biweekly_cuts)
-        biweekly_divided = sum(cut.divided_total for cut in biweekly_cuts)
-        
-        return render_template('dashboard.html',
-                             user=user,
-                             today_cuts=today_cuts,
-                             daily_total=daily_total,
-                             daily_divided=daily_divided,
-                             weekly_total=weekly_total,
-                             weekly_divided=weekly_divided,
-                             biweekly_total=biweekly_total,
-                             biweekly_divided=biweekly_divided)
-                             
-    except Exception as e:
-        logger.error(f"Error en dashboard: {str(e)}")
-        flash('Error al cargar el dashboard', 'error')
-        return redirect(url_for('login'))
-
-@app.route('/add_cut', methods=['GET', 'POST'])
-@login_required
-def add_cut():
-    if request.method == 'POST':
-        try:
-            date_cut_str = request.form['date_cut']
-            price = float(request.form['price'])
-            quantity = int(request.form['quantity'])
-            
-            date_cut = datetime.strptime(date_cut_str, '%Y-%m-%d').date()
-            total = price * quantity
-            
-            # ✅ CORRECCIÓN: Jefe recibe 100%, barbero 50%
-            user = User.query.get(session['user_id'])
-            if user.role == 'jefe':
-                divided_total = total
-            else:
-                divided_total = total / 2
-            
-            cut = HairCut(
-                date_cut=date_cut,
-                price=price,
-                quantity=quantity,
-                total=total,
-                divided_total=divided_total,
-                user_id=session['user_id']
-            )
-            
-            db.session.add(cut)
-            db.session.commit()
-            
-            flash('Corte registrado exitosamente', 'success')
-            return redirect(url_for('dashboard'))
-            
-        except Exception as e:
-            flash('Error al registrar el corte: ' + str(e), 'error')
-    
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    return render_template('add_cut.html', current_date=current_date)
-
-@app.route('/calendar')
-@login_required
-def calendar():
-    user = User.query.get(session['user_id'])
-    selected_date = request.args.get('date', date.today().isoformat())
-    
-    try:
-        selected_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
-    except:
-        selected_date = date.today()
-    
-    if user.role == 'jefe':
-        cuts = HairCut.query.filter_by(date_cut=selected_date).all()
+    url = database_url()
+    if url:
+        app.config['SQLALCHEMY_DATABASE_URI'] = url
+        logger.info("✅ PostgreSQL CONFIGURADO - Los datos se guardarán permanentemente")
     else:
-        cuts = HairCut.query.filter_by(user_id=user.id, date_cut=selected_date).all()
-    
-    return render_template('calendar.html', cuts=cuts, selected_date=selected_date)
-
-@app.route('/weekly_summary')
-@login_required
-def weekly_summary():
-    user = User.query.get(session['user_id'])
-    
-    specific_user_id = request.args.get('user_id')
-    weeks_back = int(request.args.get('weeks', 0))
-    
-    end_date = date.today() - timedelta(weeks=weeks_back)
-    start_date = end_date - timedelta(days=6)
-    
-    if user.role == 'jefe' and specific_user_id:
-        specific_user = User.query.get(specific_user_id)
-        cuts = HairCut.query.filter(
-            HairCut.user_id == specific_user_id,
-            HairCut.date_cut >= start_date,
-            HairCut.date_cut <= end_date
-        ).all()
-        page_title = f"Cortes de {specific_user.name}"
-    elif user.role == 'jefe':
-        cuts = HairCut.query.filter(
-            HairCut.date_cut >= start_date,
-            HairCut.date_cut <= end_date
-        ).all()
-        page_title = "Todos los Cortes"
-    else:
-        cuts = HairCut.query.filter(
-            HairCut.user_id == user.id,
-            HairCut.date_cut >= start_date,
-            HairCut.date_cut <= end_date
-        ).all()
-        page_title = "Mis Cortes"
-    
-    total_cuts = sum(cut.quantity for cut in cuts)
-    total_earned = sum(cut.total for cut in cuts)
-    total_divided = sum(cut.divided_total for cut in cuts)
-    
-    return render_template('weekly_summary.html',
-                         cuts=cuts,
-                         start_date=start_date,
-                         end_date=end_date,
-                         total_cuts=total_cuts,
-                         total_earned=total_earned,
-                         total_divided=total_divided,
-                         user=user,
-                         weeks_back=weeks_back,
-                         page_title=page_title,
-                         specific_user_id=specific_user_id)
-
-@app.route('/admin/dashboard')
-@jefe_required
-def admin_dashboard():
-    today = date.today()
-    
-    today_cuts = HairCut.query.filter_by(date_cut=today).all()
-    daily_total = sum(cut.total for cut in today_cuts)
-    daily_divided = sum(cut.divided_total for cut in today_cuts)
-    
-    week_ago = today - timedelta(days=7)
-    weekly_cuts = HairCut.query.filter(HairCut.date_cut >= week_ago).all()
-    weekly_total = sum(cut.total for cut in weekly_cuts)
-    weekly_divided = sum(cut.divided_total for cut in weekly_cuts)
-    
-    month_ago = today - timedelta(days=30)
-    monthly_cuts = HairCut.query.filter(HairCut.date_cut >= month_ago).all()
-    monthly_total = sum(cut.total for cut in monthly_cuts)
-    monthly_divided = sum(cut.divided_total for cut in monthly_cuts)
-    
-    month_start = date(today.year, today.month, 1)
-    product_sales = ProductSale.query.filter(ProductSale.date_sale >= month_start).all()
-    product_sales_total = sum(sale.total for sale in product_sales)
-    
-    users = User.query.all()
-    
-    return render_template('admin_dashboard.html',
-                         today_cuts=today_cuts,
-                         daily_total=daily_total,
-                         daily_divided=daily_divided,
-                         weekly_total=weekly_total,
-                         weekly_divided=weekly_divided,
-                         monthly_total=monthly_total,
-                         monthly_divided=monthly_divided,
-                         product_sales_total=product_sales_total,
-                         users=users)
-
-@app.route('/admin/users')
-@jefe_required
-def admin_users():
-    users = User.query.all()
-    return render_template('admin_users.html', users=users)
-
-@app.route('/admin/delete_user/<int:user_id>')
-@jefe_required
-def delete_user(user_id):
-    try:
-        user = User.query.get_or_404(user_id)
-        
-        # No permitir borrarse a sí mismo
-        if user.id == session['user_id']:
-            flash('No puedes eliminar tu propio usuario', 'error')
-            return redirect(url_for('admin_users'))
-        
-        # Borrar todos los cortes del usuario primero
-        HairCut.query.filter_by(user_id=user_id).delete()
-        
-        # Borrar el usuario
-        db.session.delete(user)
-        db.session.commit()
-        
-        flash(f'Usuario {user.name} eliminado exitosamente', 'success')
-        
-    except Exception as e:
-        flash(f'Error al eliminar usuario: {str(e)}', 'error')
-    
-    return redirect(url_for('admin_users'))
-
-@app.route('/admin/expenses', methods=['GET', 'POST'])
-@jefe_required
-def admin_expenses():
-    if request.method == 'POST':
-        month_year = request.form['month_year']
-        amount = float(request.form['amount'])
-        description = request.form['description']
-        
-        expense = MonthlyExpense(
-            month_year=month_year,
-            amount=amount,
-            description=description,
-            created_by=session['user_id']
-        )
-        
-        db.session.add(expense)
-        db.session.commit()
-        
-        flash('Gasto mensual registrado exitosamente', 'success')
-        return redirect(url_for('admin_expenses'))
-    
-    expenses = MonthlyExpense.query.all()
-    current_date = datetime.now().strftime('%Y-%m')
-    
-    return render_template('admin_expenses.html', 
-                         expenses=expenses, 
-                         current_date=current_date)
-
-@app.route('/admin/product_sales', methods=['GET', 'POST'])
-@jefe_required
-def admin_product_sales():
-    if request.method == 'POST':
-        try:
-            date_sale_str = request.form['date_sale']
-            product_name = request.form['product_name']
-            price = float(request.form['price'])
-            quantity = int(request.form['quantity'])
-            
-            date_sale = datetime.strptime(date_sale_str, '%Y-%m-%d').date()
-            total = price * quantity
-            
-            sale = ProductSale(
-                date_sale=date_sale,
-                product_name=product_name,
-                price=price,
-                quantity=quantity,
-                total=total,
-                created_by=session['user_id']
-            )
-            
-            db.session.add(sale)
-            db.session.commit()
-            
-            flash('Venta de producto registrada exitosamente', 'success')
-            return redirect(url_for('admin_product_sales'))
-            
-        except Exception as e:
-            flash('Error al registrar la venta: ' + str(e), 'error')
-    
-    product_sales = ProductSale.query.order_by(ProductSale.date_sale.desc()).all()
-    
-    today = date.today()
-    today_sales = ProductSale.query.filter_by(date_sale=today).all()
-    today_total = sum(sale.total for sale in today_sales)
-    
-    month_sales = ProductSale.query.filter(
-        ProductSale.date_sale >= date(today.year, today.month, 1)
-    ).all()
-    month_total = sum(sale.total for sale in month_sales)
-    
-    current_date = datetime.now().strftime('%Y-%m-%d')
-    
-    return render_template('admin_product_sales.html',
-                         product_sales=product_sales,
-                         today_total=today_total,
-                         month_total=month_total,
-                         current_date=current_date)
-
-@app.route('/admin/delete_product_sale/<int:sale_id>')
-@jefe_required
-def delete_product_sale(sale_id):
-    sale = ProductSale.query.get_or_404(sale_id)
-    db.session.delete(sale)
-    db.session.commit()
-    flash('Venta de producto eliminada exitosamente', 'success')
-    return redirect(url_for('admin_product_sales'))
-
-@app.route('/logout')
-def logout():
-    session.clear()
-    return redirect(url_for('login'))
-
-@app.route('/manifest.json')
-def manifest():
-    return app.send_static_file('manifest.json')
-
-# Función para inicializar la base de datos
-def init_db():
-    with app.app_context():
-        try:
-            db.create_all()
-            logger.info("✅ Tablas creadas exitosamente")
-            
-            # Crear usuario jefe por defecto si no existe
-            if not User.query.filter_by(role='jefe').first():
-                jefe = User(
-                    email='jefe@barberia.com', 
-                    name='Jefe Principal', 
-                    role='jefe'
-                )
-                jefe.set_password('admin123')
-                db.session.add(jefe)
-                db.session.commit()
-                logger.info("✅ Usuario jefe creado: jefe@barberia.com / admin123")
-            
-            logger.info("✅ Base de datos inicializada correctamente")
-            
-        except Exception as e:
-            logger.error(f"❌ Error inicializando base de datos: {str(e)}")
-
-# Inicializar la base de datos al iniciar
-init_db()
+        # ❌ FALLBACK a SQLite (pero mostrar advertencia)
+        app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite:///temp_database.db'
+        logger.warning("⚠️  ADVERTENCIA: No hay DATABASE_URL - usando SQLite (datos temporales)")
+
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    # Réplicas de lectura: binds replica_N para las vistas con @replica_reads
+    app.config['SQLALCHEMY_BINDS'] = replicas.replica_binds(replica_urls())
+    app.config['DB_REPLICA_STICKY_SECONDS'] = int(os.environ.get('DB_REPLICA_STICKY_SECONDS', 10))
+    app.config['DB_REPLICA_RETRY_SECONDS'] = int(os.environ.get('DB_REPLICA_RETRY_SECONDS', 30))
+    # Caché de agregados: 'memory' (por worker) o 'redis' (compartida)
+    app.config['CACHE_BACKEND'] = os.environ.get('CACHE_BACKEND', 'memory')
+    app.config['CACHE_REDIS_URL'] = os.environ.get('REDIS_URL')
+
+    # Pool de conexiones por worker: cada hilo de gunicorn (gthread) usa una
+    # conexión, así que DB_POOL_SIZE debería ser >= GUNICORN_THREADS. El total
+    # en PostgreSQL es workers * (DB_POOL_SIZE + DB_MAX_OVERFLOW).
+    app.config['DB_POOL_SIZE'] = int(os.environ.get('DB_POOL_SIZE', 5))
+    app.config['DB_MAX_OVERFLOW'] = int(os.environ.get('DB_MAX_OVERFLOW', 5))
+    app.config['DB_POOL_TIMEOUT'] = int(os.environ.get('DB_POOL_TIMEOUT', 10))
+
+    app.config['SQLALCHEMY_ENGINE_OPTIONS'] = {
+        'pool_recycle': 300,
+        'pool_pre_ping': True
+    }
+
+    # Métricas de Prometheus en /metrics; METRICS_TOKEN las protege con Bearer
+    app.config['METRICS_ENABLED'] = os.environ.get('METRICS_ENABLED', '1') == '1'
+    app.config['METRICS_TOKEN'] = os.environ.get('METRICS_TOKEN')
+
+    # Hora local para los análisis por hora (date_recorded se guarda en UTC; Perú = -5)
+    app.config['LOCAL_UTC_OFFSET_HOURS'] = int(os.environ.get('LOCAL_UTC_OFFSET_HOURS', -5))
+
+    # Cabecera X-SQL-Queries en cada respuesta (siempre activa con TESTING)
+    app.config['SQL_QUERY_COUNT_HEADER'] = os.environ.get('SQL_QUERY_COUNT_HEADER') == '1'
+
+    # Registro de consultas lentas: desactivado salvo que se defina SLOW_QUERY_MS
+    slow_query_ms = os.environ.get('SLOW_QUERY_MS')
+    app.config['SLOW_QUERY_MS'] = float(slow_query_ms) if slow_query_ms else None
+    app.config['SLOW_QUERY_BUFFER'] = int(os.environ.get('SLOW_QUERY_BUFFER', 100))
+
+    # Trabajos en segundo plano (exportaciones, recálculos): hilos y cola por worker
+    app.config['JOBS_DIR'] = os.environ.get('JOBS_DIR')
+    app.config['JOBS_MAX_WORKERS'] = int(os.environ.get('JOBS_MAX_WORKERS', 1))
+    app.config['JOBS_MAX_PENDING'] = int(os.environ.get('JOBS_MAX_PENDING', 10))
+
+    # Segundos que cada worker recuerda hasta qué fecha hay cortes y ventas archivados
+    app.config['ARCHIVE_BOUNDARY_TTL'] = int(os.environ.get('ARCHIVE_BOUNDARY_TTL', 60))
+
+    # Login: baldes de intentos por IP y por cuenta, y costo del hash de contraseñas
+    app.config['LOGIN_RATE_LIMIT_BACKEND'] = os.environ.get('LOGIN_RATE_LIMIT_BACKEND', 'memory')
+    app.config['LOGIN_IP_BURST'] = int(os.environ.get('LOGIN_IP_BURST', 10))
+    app.config['LOGIN_IP_PER_MINUTE'] = float(os.environ.get('LOGIN_IP_PER_MINUTE', 10))
+    app.config['LOGIN_ACCOUNT_BURST'] = int(os.environ.get('LOGIN_ACCOUNT_BURST', 5))
+    app.config['LOGIN_ACCOUNT_PER_MINUTE'] = float(os.environ.get('LOGIN_ACCOUNT_PER_MINUTE', 1))
+    app.config['PASSWORD_HASH_METHOD'] = os.environ.get('PASSWORD_HASH_METHOD', 'pbkdf2:sha256:600000')
+    # Proxies delante de la app (Render: 1) cuyo X-Forwarded-For se acepta como IP del cliente
+    app.config['PROXY_FIX_X_FOR'] = int(os.environ.get('PROXY_FIX_X_FOR', 0))
+
+    if config:
+        app.config.update(config)
+
+    if app.config['PROXY_FIX_X_FOR']:
+        app.wsgi_app = ProxyFix(app.wsgi_app, x_for=app.config['PROXY_FIX_X_FOR'])
+
+    if not app.config['SQLALCHEMY_DATABASE_URI'].startswith('sqlite'):
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        options.setdefault('pool_size', app.config['DB_POOL_SIZE'])
+        options.setdefault('max_overflow', app.config['DB_MAX_OVERFLOW'])
+        options.setdefault('pool_timeout', app.config['DB_POOL_TIMEOUT'])
+
+    # Antes que metrics: sus EXPLAIN al cerrar el request no cuentan en las métricas
+    slow_queries.init_app(app)
+    metrics.init_app(app)
+    db.init_app(app)
+    query_counter.init_app(app)
+    replicas.init_app(app)
+    assets.init_app(app)
+    cache.init_app(app)
+    ratelimit.init_app(app)
+    cli.init_app(app)
+    jobs.init_app(app)
+    app.register_blueprint(bp)
+
+    return app
+
+
+app = create_app()
 
 if __name__ == '__main__':
     port = int(os.environ.get('PORT', 5000))
     logger.info(f"🚀 BarberApp iniciando en puerto {port}")
+    # En desarrollo se prepara la base al arrancar; en producción lo hace `flask init-db`
+    with app.app_context():
+        cli.init_db()
     app.run(host='0.0.0.0', port=port, debug=False)
@@ -0,0 +1,214 @@
+"""Archivo de cortes y ventas de periodos cerrados.
+
+``hair_cuts`` y ``product_sales`` sólo crecen. ``flask --app app archive``
+mueve las filas anteriores a un mes de corte a ``hair_cuts_archive`` y
+``product_sales_archive`` (mismas columnas, mismo id), así las tablas activas
+quedan chicas para las vistas del día y de la semana.
+
+- Antes de mover nada se comprueba que el resumen diario cubra esos días: los
+  totales, el P&L y el calendario mensual siguen leyendo ``daily_rollups`` y
+  no notan el archivo.
+- Listados, exportaciones y análisis piden su tabla con ``hair_cuts(start)`` o
+  ``product_sales(start)``: si el periodo llega a la parte archivada reciben
+  la unión de ambas tablas, si no, la tabla activa sola.
+- Se mueve por lotes de ``chunk_size`` filas, cada uno en su propia
+  transacción (INSERT en el archivo y DELETE en la activa juntos), así nunca
+  se bloquean las tablas activas por mucho tiempo. Si se corta a la mitad,
+  volver a ejecutar el comando sigue donde quedó.
+- ``flask --app app restore-archive`` hace lo inverso, también por lotes.
+
+En ``archived_periods`` queda, por tabla, la fecha hasta la que puede haber
+filas archivadas; se guarda antes de empezar a mover, para que las lecturas
+ya incluyan el archivo mientras dura el proceso. Cada worker la recuerda
+``ARCHIVE_BOUNDARY_TTL`` segundos (así las vistas no pagan una consulta más),
+y ``archive`` espera ese tiempo tras subirla antes de mover la primera fila.
+"""
+import logging
+import time
+from datetime import date
+
+from flask import current_app
+
+from sqlalchemy import delete, insert, select, true, union_all
+from sqlalchemy.orm import aliased
+
+from cache import LRUCache
+from models import (db, ArchivedPeriod, HairCut, HairCutArchive, ProductSale,
+                    ProductSaleArchive)
+from reports import rebuild_daily_rollups, verify_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CHUNK_SIZE = 5000
+DEFAULT_KEEP_MONTHS = 24
+DEFAULT_BOUNDARY_TTL = 60
+
+# tabla -> (modelo activo, modelo del archivo, columna de fecha)
+TABLES = {
+    'hair_cuts': (HairCut, HairCutArchive, 'date_cut'),
+    'product_sales': (ProductSale, ProductSaleArchive, 'date_sale'),
+}
+
+
+def months_ago(months, today=None):
+    """Primer día del mes que está ``months`` meses antes del actual."""
+    today = today or date.today()
+    index = today.year * 12 + today.month - 1 - months
+    return date(index // 12, index % 12 + 1, 1)
+
+
+def _boundary_ttl():
+    return current_app.config.get('ARCHIVE_BOUNDARY_TTL', DEFAULT_BOUNDARY_TTL)
+
+
+def _boundaries():
+    return current_app.extensions.setdefault(
+        'archive_boundaries', LRUCache(maxsize=len(TABLES), default_ttl=_boundary_ttl())
+    )
+
+
+def archived_before(name):
+    """Fecha hasta la que ``name`` puede tener filas archivadas, o ``None``."""
+    cached = _boundaries().get(name)
+    if cached is None:
+        period = db.session.get(ArchivedPeriod, name)
+        cached = (period.before if period else None,)
+        if _boundary_ttl():
+            _boundaries().set(name, cached)
+    return cached[0]
+
+
+# ---------- Lectura ----------
+def source(name, start=None):
+    """Modelo a consultar para un periodo que empieza en ``start`` (``None``: todo).
+
+    Devuelve el modelo activo, o un alias del mismo modelo sobre
+    ``activa UNION ALL archivo`` si el periodo llega a fechas archivadas. Las
+    filas salen como instancias del modelo activo en ambos casos.
+    """
+    hot, cold, _ = TABLES[name]
+    before = archived_before(name)
+    if before is None or (start is not None and start >= before):
+        return hot
+    columns = [column.name for column in hot.__table__.columns]
+    both = union_all(
+        select(*(hot.__table__.c[column] for column in columns)),
+        select(*(cold.__table__.c[column] for column in columns)),
+    ).subquery(f'{name}_all')
+    return aliased(hot, both)
+
+
+def hair_cuts(start=None):
+    return source('hair_cuts', start)
+
+
+def product_sales(start=None):
+    return source('product_sales', start)
+
+
+# ---------- Movimiento por lotes ----------
+def _move_chunks(from_table, to_table, condition, chunk_size, on_chunk=None):
+    columns = [column.name for column in from_table.columns]
+    moved = 0
+    while True:
+        ids = [row_id for row_id, in db.session.execute(
+            select(from_table.c.id).where(condition).order_by(from_table.c.id).limit(chunk_size)
+        )]
+        if not ids:
+            return moved
+        db.session.execute(insert(to_table).from_select(
+            columns,
+            select(*(from_table.c[column] for column in columns)).where(from_table.c.id.in_(ids)),
+        ))
+        db.session.execute(delete(from_table).where(from_table.c.id.in_(ids)))
+        db.session.commit()
+        moved += len(ids)
+        if on_chunk:
+            on_chunk(moved)
+
+
+def _delete_chunks(table, condition, chunk_size):
+    deleted = 0
+    while True:
+        ids = [row_id for row_id, in db.session.execute(
+            select(table.c.id).where(condition).limit(chunk_size)
+        )]
+        if not ids:
+            return deleted
+        db.session.execute(delete(table).where(table.c.id.in_(ids)))
+        db.session.commit()
+        deleted += len(ids)
+
+
+def _set_before(name, before):
+    period = db.session.get(ArchivedPeriod, name)
+    if before is None:
+        if period is not None:
+            db.session.delete(period)
+    elif period is None:
+        db.session.add(ArchivedPeriod(table_name=name, before=before))
+    else:
+        period.before = before
+    db.session.commit()
+    _boundaries().delete(name)
+
+
+def archive(before, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """Mueve al archivo los cortes y ventas con fecha anterior a ``before``.
+
+    ``on_chunk(tabla, filas_movidas)`` se llama tras cada lote. Devuelve las
+    filas movidas por tabla.
+    """
+    # Primero los totales: el resumen diario tiene que cuadrar con lo que se archiva
+    mismatches = verify_daily_rollups(before=before)
+    if mismatches:
+        logger.warning(f"⚠️  Resumen diario con {len(mismatches)} diferencias antes de archivar; se reconstruye")
+        rebuild_daily_rollups()
+
+    raised = False
+    for name in TABLES:
+        current = archived_before(name)
+        if current is None or current < before:
+            _set_before(name, before)
+            raised = True
+    # Los workers pueden tener la fecha anterior en memoria hasta que venza
+    if raised and _boundary_ttl():
+        logger.info(f"⏳ Esperando {_boundary_ttl()} s a que los workers vean la nueva fecha del archivo")
+        time.sleep(_boundary_ttl())
+
+    moved = {}
+    for name, (hot, cold, column) in TABLES.items():
+        moved[name] = _move_chunks(
+            hot.__table__, cold.__table__, hot.__table__.c[column] < before, chunk_size,
+            on_chunk and (lambda rows, name=name: on_chunk(name, rows)),
+        )
+        logger.info(f"📦 {name}: {moved[name]} filas archivadas (antes de {before})")
+    return moved
+
+
+def restore(since=None, chunk_size=DEFAULT_CHUNK_SIZE, on_chunk=None):
+    """Devuelve a las tablas activas lo archivado desde ``since`` (``None``: todo).
+
+    La fecha del archivo se ajusta al terminar cada tabla, cuando las filas
+    ya volvieron; hasta entonces las lecturas siguen uniendo ambas tablas.
+    """
+    moved = {}
+    for name, (hot, cold, column) in TABLES.items():
+        condition = cold.__table__.c[column] >= since if since else true()
+        moved[name] = _move_chunks(
+            cold.__table__, hot.__table__, condition, chunk_size,
+            on_chunk and (lambda rows, name=name: on_chunk(name, rows)),
+        )
+        current = archived_before(name)
+        if since is None:
+            _set_before(name, None)
+        elif current is not None and since < current:
+            _set_before(name, since)
+        logger.info(f"📤 {name}: {moved[name]} filas restauradas")
+    return moved
+
+
+def delete_user_cuts(user_id, chunk_size=DEFAULT_CHUNK_SIZE):
+    """Borra por lotes los cortes archivados de un barbero. Devuelve cuántos."""
+    table = HairCutArchive.__table__
+    return _delete_chunks(table, table.c.user_id == user_id, chunk_size)
@@ -0,0 +1,277 @@
+"""Archivos estáticos: versión, huellas de contenido y compresión previa.
+
+``flask --app app build-assets`` (en el build de Render) descarga Bootstrap y
+Font Awesome a ``static/vendor``, genera las variantes del logo y copia cada
+archivo de ``static`` a ``static/dist`` con un hash de su contenido en el
+nombre (``css/style.3f2a1b9c.css``), más sus versiones ``.gz`` y ``.br``. El
+``url_for`` de las plantillas usa el manifiesto resultante, así
+``url_for('static', filename='css/style.css')`` apunta a ``/assets/...``, que
+se sirve con ``Cache-Control: immutable`` y la compresión que acepte el
+navegador.
+
+Sin build (desarrollo local) todo sigue funcionando como antes: los archivos
+salen de ``/static`` y las dependencias del CDN.
+"""
+import glob
+import gzip
+import hashlib
+import json
+import mimetypes
+import os
+import posixpath
+import re
+import shutil
+import urllib.request
+
+from flask import abort, current_app, request, send_file, url_for as flask_url_for
+
+try:
+    import brotli
+except ImportError:  # opcional: sin él sólo se genera .gz
+    brotli = None
+
+DIST_DIR = 'dist'
+MANIFEST_NAME = 'assets-manifest.json'
+IMMUTABLE = 'public, max-age=31536000, immutable'
+
+# Dependencias de base.html: copia local -> URL del CDN (respaldo si no hay build)
+VENDOR_FILES = {
+    'vendor/bootstrap/css/bootstrap.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/css/bootstrap.min.css',
+    'vendor/fontawesome/css/all.min.css':
+        'https://cdnjs.cloudflare.com/ajax/libs/font-awesome/6.0.0/css/all.min.css',
+    'vendor/bootstrap/js/bootstrap.bundle.min.js':
+        'https://cdnjs.cloudflare.com/ajax/libs/bootstrap/5.3.0/js/bootstrap.bundle.min.js',
+}
+
+# Archivos del "app shell" que el service worker guarda al instalarse
+SHELL_FILES = ('css/style.css', 'js/app.js', 'manifest.json', 'images/logo.jpg',
+               'images/logo-45.webp', 'images/logo-90.webp') + tuple(VENDOR_FILES)
+
+# Sólo vale la pena comprimir texto; woff2 e imágenes ya vienen comprimidos
+COMPRESSIBLE = ('.css', '.js', '.json', '.svg', '.txt', '.map', '.ttf', '.eot')
+CSS_URL = re.compile(r'url\(\s*([\'"]?)([^\'")]+)\1\s*\)')
+
+
+def build_hash(paths):
+    """Hash corto del contenido de ``paths``; cambia con cualquier despliegue que los toque."""
+    digest = hashlib.sha256()
+    for path in sorted(paths):
+        digest.update(path.encode())
+        with open(path, 'rb') as f:
+            digest.update(f.read())
+    return digest.hexdigest()[:12]
+
+
+# ---------- Build ----------
+def _download(url, path):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with urllib.request.urlopen(url, timeout=30) as response, open(path, 'wb') as f:
+        shutil.copyfileobj(response, f)
+
+
+def _relative_urls(css):
+    """URLs relativas (fuentes, imágenes) a las que apunta una hoja de estilos."""
+    for _, url in CSS_URL.findall(css):
+        if not url.startswith(('data:', 'http:', 'https:', '//', '/', '#')):
+            yield url.split('?')[0].split('#')[0]
+
+
+def vendor(static_folder):
+    """Descarga las dependencias del CDN (y las fuentes de sus CSS) que falten."""
+    downloaded = []
+    for name, url in VENDOR_FILES.items():
+        path = os.path.join(static_folder, name)
+        if not os.path.exists(path):
+            _download(url, path)
+            downloaded.append(name)
+        if name.endswith('.css'):
+            with open(path, encoding='utf-8') as f:
+                css = f.read()
+            for relative in set(_relative_urls(css)):
+                dependency = posixpath.normpath(posixpath.join(posixpath.dirname(name), relative))
+                dependency_path = os.path.join(static_folder, dependency)
+                if not os.path.exists(dependency_path):
+                    _download(posixpath.join(posixpath.dirname(url), relative), dependency_path)
+                    downloaded.append(dependency)
+    return downloaded
+
+
+def _hashed_name(name, content):
+    root, ext = posixpath.splitext(name)
+    return f'{root}.{hashlib.sha256(content).hexdigest()[:10]}{ext}'
+
+
+def _rewrite_css(name, css, manifest):
+    """Apunta los ``url()`` relativos de ``name`` a los archivos con hash."""
+    base = posixpath.dirname(name)
+
+    def replace(match):
+        quote, url = match.groups()
+        clean = url.split('?')[0].split('#')[0]
+        target = manifest.get(posixpath.normpath(posixpath.join(base, clean)))
+        if target is None:
+            return match.group(0)
+        # El CSS con hash queda en la misma carpeta que el original
+        return f'url({quote}{posixpath.relpath(target, base)}{url[len(clean):]}{quote})'
+    return CSS_URL.sub(replace, css)
+
+
+def _write_compressed(path, content):
+    written = []
+    packed = gzip.compress(content, compresslevel=9, mtime=0)
+    if len(packed) < len(content):
+        with open(path + '.gz', 'wb') as f:
+            f.write(packed)
+        written.append('gzip')
+    if brotli is not None:
+        packed = brotli.compress(content, quality=11)
+        if len(packed) < len(content):
+            with open(path + '.br', 'wb') as f:
+                f.write(packed)
+            written.append('br')
+    return written
+
+
+def fingerprint(static_folder):
+    """Copia ``static`` a ``static/dist`` con hash en los nombres y escribe el manifiesto.
+
+    Las hojas de estilos se procesan al final para reescribir sus ``url()``
+    con los nombres ya calculados del resto de archivos.
+    """
+    dist = os.path.join(static_folder, DIST_DIR)
+    shutil.rmtree(dist, ignore_errors=True)
+    names = sorted(
+        os.path.relpath(path, static_folder).replace(os.sep, '/')
+        for path in glob.glob(os.path.join(static_folder, '**', '*'), recursive=True)
+        if os.path.isfile(path)
+    )
+    names = [name for name in names if not name.startswith(DIST_DIR + '/')]
+    names.sort(key=lambda name: name.endswith('.css'))
+
+    manifest = {}
+    compressed = {}
+    for name in names:
+        with open(os.path.join(static_folder, name), 'rb') as f:
+            content = f.read()
+        if name.endswith('.css'):
+            content = _rewrite_css(name, content.decode('utf-8'), manifest).encode('utf-8')
+        hashed = manifest[name] = _hashed_name(name, content)
+        path = os.path.join(dist, hashed)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        with open(path, 'wb') as f:
+            f.write(content)
+        if name.endswith(COMPRESSIBLE):
+            compressed[hashed] = _write_compressed(path, content)
+
+    with open(os.path.join(dist, MANIFEST_NAME), 'w') as f:
+        json.dump({'files': manifest, 'compressed': compressed}, f, indent=2, sort_keys=True)
+    return manifest
+
+
+# ---------- URLs y servidor ----------
+def _state():
+    return current_app.extensions['assets']
+
+
+def url_for(endpoint, **values):
+    """``url_for`` que manda los archivos estáticos a su versión con hash."""
+    if endpoint == 'static':
+        state = _state()
+        filename = values.get('filename')
+        hashed = state['files'].get(filename)
+        if hashed is not None:
+            values.pop('v', None)
+            values['filename'] = hashed
+            return flask_url_for('assets', **values)
+        if filename in VENDOR_FILES and not os.path.exists(os.path.join(current_app.static_folder, filename)):
+            return VENDOR_FILES[filename]
+    return flask_url_for(endpoint, **values)
+
+
+def available(filename):
+    """Si ``filename`` se puede servir desde este sitio (build o ``static``)."""
+    return filename in _state()['files'] or os.path.isfile(os.path.join(current_app.static_folder, filename))
+
+
+def shell_urls():
+    """URLs del app shell para el service worker: ``(propias, del CDN)``."""
+    local, cdn = [], []
+    for name in SHELL_FILES:
+        url = url_for('static', filename=name, v=current_app.config['ASSET_VERSION'])
+        if url.startswith('https://'):
+            cdn.append(url)
+        elif available(name):
+            local.append(url)
+    return local, cdn
+
+
+def image_srcset(filename, height, ext):
+    """``srcset`` 1x/2x de las variantes ``<nombre>-<alto>.<ext>`` de una imagen.
+
+    Las genera ``resize_logo.py``; vacío si todavía no existen.
+    """
+    root = posixpath.splitext(filename)[0]
+    candidates = []
+    for density in (1, 2):
+        name = f'{root}-{height * density}.{ext}'
+        if available(name):
+            candidates.append(f"{url_for('static', filename=name)} {density}x")
+    return ', '.join(candidates)
+
+
+def serve_asset(filename):
+    state = _state()
+    if filename not in state['hashed']:
+        abort(404)
+    path = os.path.join(state['dist'], filename)
+    mimetype = mimetypes.guess_type(filename)[0] or 'application/octet-stream'
+    encodings = state['compressed'].get(filename, ())
+    for encoding, suffix in (('br', '.br'), ('gzip', '.gz')):
+        if encoding in encodings and request.accept_encodings[encoding]:
+            response = send_file(path + suffix, mimetype=mimetype)
+            response.headers['Content-Encoding'] = encoding
+            break
+    else:
+        response = send_file(path, mimetype=mimetype)
+    if encodings:
+        response.vary.add('Accept-Encoding')
+    response.headers['Cache-Control'] = IMMUTABLE
+    return response
+
+
+def load_manifest(static_folder):
+    path = os.path.join(static_folder, DIST_DIR, MANIFEST_NAME)
+    try:
+        with open(path) as f:
+            data = json.load(f)
+    except (OSError, ValueError):
+        return {'files': {}, 'compressed': {}}, None
+    return data, path
+
+
+def init_app(app):
+    manifest, manifest_path = load_manifest(app.static_folder)
+    app.extensions['assets'] = {
+        'files': manifest['files'],
+        'hashed': set(manifest['files'].values()),
+        'compressed': manifest['compressed'],
+        'dist': os.path.join(app.static_folder, DIST_DIR),
+    }
+
+    shell_paths = [path for path in (os.path.join(app.static_folder, name) for name in SHELL_FILES)
+                   if os.path.exists(path)]
+    if manifest_path:
+        shell_paths.append(manifest_path)
+    sw_template = os.path.join(app.root_path, app.template_folder, 'sw.js')
+    app.config['ASSET_VERSION'] = build_hash(shell_paths + [sw_template])
+    # Cambia con cualquier plantilla; forma parte de los ETag de las páginas
+    templates = glob.glob(os.path.join(app.root_path, app.template_folder, '*'))
+    app.config['RELEASE_VERSION'] = build_hash(shell_paths + templates)
+
+    app.add_url_rule('/assets/<path:filename>', 'assets', serve_asset)
+    app.jinja_env.globals.update(url_for=url_for, image_srcset=image_srcset)
+
+    @app.context_processor
+    def asset_version():
+        return {'asset_version': app.config['ASSET_VERSION']}
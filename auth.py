@@ -0,0 +1,90 @@
+"""Usuario de la sesión y decoradores de acceso."""
+from functools import wraps
+
+from flask import flash, g, redirect, session, url_for
+
+from models import db, Shop, User
+
+# Usuario actual
+def current_user():
+    """Usuario de la sesión, cargado una sola vez por request y compartido
+    entre los decoradores y la vista. ``None`` si el usuario ya no existe."""
+    if 'current_user' not in g:
+        user_id = session.get('user_id')
+        g.current_user = User.query.get(user_id) if user_id else None
+    return g.current_user
+
+def invalidate_current_user():
+    """Descarta el usuario cacheado tras cambiar usuarios en este request."""
+    g.pop('current_user', None)
+
+def current_shop_id():
+    """Sede en la que trabaja la sesión: la del usuario, o la que eligió el dueño."""
+    shop_id = session.get('shop_id')
+    if shop_id is None:
+        user = current_user()
+        shop_id = user.shop_id if user else None
+    return shop_id
+
+def select_shop(shop):
+    session['shop_id'] = shop.id
+    session['shop_name'] = shop.name
+
+def _sync_session(user):
+    if session.get('user_role') != user.role:
+        session['user_role'] = user.role
+    if session.get('is_owner') != user.is_owner:
+        session['is_owner'] = user.is_owner
+    # Sólo el dueño puede trabajar en una sede distinta de la suya
+    if session.get('shop_id') is None or (not user.is_owner and session['shop_id'] != user.shop_id):
+        select_shop(db.session.get(Shop, user.shop_id))
+
+def _end_stale_session():
+    session.clear()
+    flash('Tu sesión ya no es válida. Inicia sesión nuevamente.', 'error')
+    return redirect(url_for('main.login'))
+
+# Decoradores
+def login_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('main.login'))
+        user = current_user()
+        if user is None:
+            return _end_stale_session()
+        _sync_session(user)
+        return f(*args, **kwargs)
+    return decorated_function
+
+def jefe_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('main.login'))
+        # El rol firmado en la sesión basta para rechazar sin consultar la BD
+        if session.get('user_role', 'jefe') == 'jefe':
+            user = current_user()
+            if user is None:
+                return _end_stale_session()
+            _sync_session(user)
+        if session['user_role'] != 'jefe':
+            flash('No tienes permisos para acceder a esta página', 'error')
+            return redirect(url_for('main.dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
+
+def owner_required(f):
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        if 'user_id' not in session:
+            return redirect(url_for('main.login'))
+        user = current_user()
+        if user is None:
+            return _end_stale_session()
+        _sync_session(user)
+        if not (user.role == 'jefe' and user.is_owner):
+            flash('No tienes permisos para acceder a esta página', 'error')
+            return redirect(url_for('main.dashboard'))
+        return f(*args, **kwargs)
+    return decorated_function
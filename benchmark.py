@@ -0,0 +1,242 @@
+"""Benchmark de todas las rutas GET de BarberApp.
+
+Con el cliente de pruebas de Flask (por defecto) usa la base de
+``DATABASE_URL`` directamente, en un solo proceso:
+
+    flask --app app init-db && flask --app app seed-demo
+    python benchmark.py --requests 50 --output antes.json
+
+Contra un gunicorn local (arrancado con ``SQL_QUERY_COUNT_HEADER=1`` para
+recibir la cantidad de consultas de cada request):
+
+    python benchmark.py --url http://127.0.0.1:5000 --concurrency 8 --output antes.json
+
+Por cada ruta informa throughput, latencias p50/p95/p99 y consultas SQL (en
+las exportaciones en streaming sólo las previas al primer bloque), y
+guarda todo en JSON. ``--compare antes.json`` muestra la diferencia de p95.
+"""
+import argparse
+import http.cookiejar
+import json
+import math
+import os
+import platform
+import statistics
+import threading
+import time
+import urllib.error
+import urllib.parse
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, date, timedelta
+
+JEFE = ('jefe@barberia.com', 'admin123')
+BARBER = ('barbero1@barberia.com', 'barbero123')
+
+# Rutas que no se miden: sin datos, de sesión o que no dependen de la base
+SKIP_ENDPOINTS = {'static', 'login', 'logout', 'index', 'manifest', 'metrics', 'service_worker'}
+
+
+def extra_paths():
+    """Variantes con parámetros habituales de las vistas más pesadas."""
+    today = date.today()
+    month_ago = (today - timedelta(days=30)).isoformat()
+    return [
+        '/weekly_summary?weeks=4',
+        f'/calendar?date={month_ago}',
+        f'/api/cuts?start={month_ago}&limit=200',
+        f'/export/cuts.csv?start={month_ago}',
+    ]
+
+
+def route_paths(app):
+    """Rutas GET sin argumentos de la app, más algunas variantes con filtros."""
+    paths = sorted(
+        rule.rule for rule in app.url_map.iter_rules()
+        if 'GET' in rule.methods and not rule.arguments
+        and rule.endpoint.rpartition('.')[2] not in SKIP_ENDPOINTS
+    )
+    return paths + extra_paths()
+
+
+def percentile(values, pct):
+    """Percentil por rango más cercano; ``values`` ordenada."""
+    if not values:
+        return None
+    rank = math.ceil(pct / 100 * len(values))
+    return values[min(max(rank, 1), len(values)) - 1]
+
+
+def summarize(samples, elapsed):
+    """``samples`` es una lista de ``(segundos, status, consultas SQL)``."""
+    latencies = sorted(seconds for seconds, _, _ in samples)
+    queries = [count for _, _, count in samples if count is not None]
+    return {
+        'requests': len(samples),
+        'errors': sum(1 for _, status, _ in samples if status >= 400),
+        'throughput_rps': round(len(samples) / elapsed, 2) if elapsed else None,
+        'p50_ms': round(percentile(latencies, 50) * 1000, 2),
+        'p95_ms': round(percentile(latencies, 95) * 1000, 2),
+        'p99_ms': round(percentile(latencies, 99) * 1000, 2),
+        'mean_ms': round(statistics.mean(latencies) * 1000, 2),
+        'sql_mean': round(statistics.mean(queries), 2) if queries else None,
+        'sql_max': max(queries) if queries else None,
+    }
+
+
+def _sql_count(headers):
+    value = headers.get('X-SQL-Queries')
+    return int(value) if value is not None else None
+
+
+# ---------- Cliente de pruebas ----------
+def run_test_client(args):
+    from app import create_app
+    from models import User
+
+    app = create_app({'SQL_QUERY_COUNT_HEADER': True})
+    with app.app_context():
+        users = {
+            'jefe': User.query.filter_by(email=args.jefe_email).first(),
+            'barbero': User.query.filter_by(email=args.barber_email).first(),
+        }
+    paths = route_paths(app)
+
+    results = {}
+    for role, user in users.items():
+        if user is None:
+            print(f"⚠️  No existe {role}; ejecuta flask seed-demo para medir sus rutas")
+            continue
+        client = app.test_client()
+        with client.session_transaction() as sess:
+            sess['user_id'] = user.id
+            sess['user_name'] = user.name
+            sess['user_role'] = user.role
+        for path in paths:
+            if role != 'jefe' and (path.startswith('/admin') or path.startswith('/register')):
+                continue
+            client.get(path)  # calentamiento
+            samples = []
+            started = time.perf_counter()
+            for _ in range(args.requests):
+                start = time.perf_counter()
+                response = client.get(path)
+                response.get_data()
+                samples.append((time.perf_counter() - start, response.status_code,
+                                _sql_count(response.headers)))
+            results[f'{role} {path}'] = summarize(samples, time.perf_counter() - started)
+    return results
+
+
+# ---------- Servidor HTTP (gunicorn) ----------
+def _login(base_url, email, password):
+    jar = http.cookiejar.CookieJar()
+    opener = urllib.request.build_opener(urllib.request.HTTPCookieProcessor(jar))
+    data = urllib.parse.urlencode({'email': email, 'password': password}).encode()
+    opener.open(base_url + '/login', data).read()
+    if not any(cookie.name == 'session' for cookie in jar):
+        raise SystemExit(f"❌ No se pudo iniciar sesión como {email}")
+    return opener
+
+
+def _fetch(opener, url):
+    start = time.perf_counter()
+    try:
+        with opener.open(url) as response:
+            response.read()
+            status, headers = response.status, response.headers
+    except urllib.error.HTTPError as e:
+        status, headers = e.code, e.headers
+    return time.perf_counter() - start, status, _sql_count(headers)
+
+
+def run_http(args):
+    from app import app
+
+    base_url = args.url.rstrip('/')
+    paths = route_paths(app)
+    local = threading.local()
+
+    def opener_for(role):
+        # Una sesión (cookie) por hilo y rol, como varios navegadores
+        openers = local.__dict__.setdefault('openers', {})
+        if role not in openers:
+            email, password = (args.jefe_email, args.jefe_password) if role == 'jefe' else (
+                args.barber_email, args.barber_password)
+            openers[role] = _login(base_url, email, password)
+        return openers[role]
+
+    results = {}
+    with ThreadPoolExecutor(args.concurrency) as pool:
+        for role in ('jefe', 'barbero'):
+            for path in paths:
+                if role != 'jefe' and (path.startswith('/admin') or path.startswith('/register')):
+                    continue
+                fetch = lambda _: _fetch(opener_for(role), base_url + path)
+                list(pool.map(fetch, range(args.concurrency)))  # calentamiento
+                started = time.perf_counter()
+                samples = list(pool.map(fetch, range(args.requests)))
+                results[f'{role} {path}'] = summarize(samples, time.perf_counter() - started)
+    return results
+
+
+# ---------- Reporte ----------
+def print_table(results, previous=None):
+    header = f"{'ruta':48} {'req/s':>8} {'p50':>8} {'p95':>8} {'p99':>8} {'sql':>6}"
+    if previous:
+        header += f" {'Δp95':>8}"
+    print(header)
+    for name, stats in results.items():
+        sql = '-' if stats['sql_mean'] is None else f"{stats['sql_mean']:g}"
+        line = (f"{name[:48]:48} {stats['throughput_rps'] or 0:8.1f} {stats['p50_ms']:8.1f} "
+                f"{stats['p95_ms']:8.1f} {stats['p99_ms']:8.1f} {sql:>6}")
+        before = (previous or {}).get(name)
+        if before:
+            change = (stats['p95_ms'] - before['p95_ms']) / before['p95_ms'] * 100 if before['p95_ms'] else 0
+            line += f" {change:+7.0f}%"
+        if stats['errors']:
+            line += f"  ❌ {stats['errors']} errores"
+        print(line)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark de las rutas de BarberApp.')
+    parser.add_argument('--url', help='Medir contra un servidor (p. ej. gunicorn) en vez del cliente de pruebas.')
+    parser.add_argument('--requests', type=int, default=30, help='Requests por ruta.')
+    parser.add_argument('--concurrency', type=int, default=4, help='Hilos simultáneos con --url.')
+    parser.add_argument('--jefe-email', default=JEFE[0])
+    parser.add_argument('--jefe-password', default=JEFE[1])
+    parser.add_argument('--barber-email', default=BARBER[0])
+    parser.add_argument('--barber-password', default=BARBER[1])
+    parser.add_argument('--output', help='Archivo JSON donde guardar los resultados.')
+    parser.add_argument('--compare', help='JSON de una corrida anterior para comparar.')
+    args = parser.parse_args()
+
+    started = time.perf_counter()
+    results = run_http(args) if args.url else run_test_client(args)
+    total_seconds = time.perf_counter() - started
+
+    previous = None
+    if args.compare:
+        with open(args.compare) as f:
+            previous = json.load(f)['routes']
+    print_table(results, previous)
+
+    if args.output:
+        report = {
+            'created_at': datetime.now().isoformat(timespec='seconds'),
+            'mode': 'http' if args.url else 'test_client',
+            'target': args.url or os.environ.get('DATABASE_URL', 'sqlite:///temp_database.db'),
+            'requests_per_route': args.requests,
+            'concurrency': args.concurrency if args.url else 1,
+            'python': platform.python_version(),
+            'total_seconds': round(total_seconds, 2),
+            'routes': results,
+        }
+        with open(args.output, 'w') as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+        print(f"✅ Resultados guardados en {args.output}")
+
+
+if __name__ == '__main__':
+    main()
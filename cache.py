@@ -0,0 +1,167 @@
+"""Caché de resultados para los agregados del panel del jefe.
+
+Por defecto es un LRU en memoria con TTL, propio de cada worker. Con
+``CACHE_BACKEND = 'redis'`` y ``CACHE_REDIS_URL`` se comparte entre todos los
+workers de gunicorn; las pruebas pueden pasar cualquier objeto con la misma
+interfaz (``get``, ``set``, ``delete``, ``keys``, ``clear`` y ``shared``) a
+``init_app``.
+
+Las claves de periodos tienen la forma ``prefijo:desde:hasta`` (``hasta``
+vacío si el periodo es abierto), así una escritura de una fecha borra
+exactamente los periodos que la contienen con ``invalidate_windows``. Con
+Redis (``shared``) eso alcanza a todos los workers. El LRU en memoria sólo
+lo limpia el worker que escribe, así que ahí los prefijos de cada sede
+llevan además su versión de datos (``reports.shop_cache_prefix``) y los
+demás workers no sirven totales viejos.
+"""
+import json
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+import replicas
+
+DEFAULT_TTL = 300
+DEFAULT_MAXSIZE = 1024
+
+
+class LRUCache:
+    """LRU en memoria con vencimiento por entrada, seguro entre hilos."""
+
+    # Propio de cada worker: borrar una clave no llega a los demás
+    shared = False
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE, default_ttl=DEFAULT_TTL):
+        self.maxsize = maxsize
+        self.default_ttl = default_ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            value, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl=None):
+        expires_at = time.monotonic() + (ttl or self.default_ttl)
+        with self._lock:
+            self._data[key] = (value, expires_at)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, *keys):
+        with self._lock:
+            for key in keys:
+                self._data.pop(key, None)
+
+    def keys(self, prefix=''):
+        with self._lock:
+            return [key for key in self._data if key.startswith(prefix)]
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+
+class RedisCache:
+    """Backend compartido. Requiere el paquete ``redis`` (opcional)."""
+
+    shared = True
+
+    def __init__(self, url, default_ttl=DEFAULT_TTL, namespace='barberapp:cache:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.default_ttl = default_ttl
+        self.namespace = namespace
+
+    def get(self, key):
+        raw = self.client.get(self.namespace + key)
+        return None if raw is None else json.loads(raw)
+
+    def set(self, key, value, ttl=None):
+        self.client.set(self.namespace + key, json.dumps(value), ex=ttl or self.default_ttl)
+
+    def delete(self, *keys):
+        if keys:
+            self.client.delete(*(self.namespace + key for key in keys))
+
+    def keys(self, prefix=''):
+        start = len(self.namespace)
+        return [
+            key.decode()[start:]
+            for key in self.client.scan_iter(match=self.namespace + prefix + '*')
+        ]
+
+    def clear(self):
+        self.delete(*self.keys())
+
+
+def init_app(app, backend=None):
+    if backend is None:
+        ttl = app.config.get('CACHE_DEFAULT_TTL', DEFAULT_TTL)
+        if app.config.get('CACHE_BACKEND') == 'redis':
+            backend = RedisCache(app.config['CACHE_REDIS_URL'], default_ttl=ttl)
+        else:
+            backend = LRUCache(app.config.get('CACHE_MAXSIZE', DEFAULT_MAXSIZE), default_ttl=ttl)
+    app.extensions['result_cache'] = backend
+    return backend
+
+
+def get_cache():
+    return current_app.extensions['result_cache']
+
+
+def is_shared():
+    """Si las claves borradas dejan de verse en todos los workers."""
+    return getattr(get_cache(), 'shared', False)
+
+
+def window_key(prefix, start, end=None):
+    return f"{prefix}:{start}:{end or ''}"
+
+
+def memoize(key, compute, ttl=None):
+    """Devuelve el valor cacheado de ``key`` o lo calcula y lo guarda.
+
+    Los valores deben ser serializables a JSON para que sirvan con Redis. Se
+    calculan en la base principal: una réplica atrasada no queda en la caché.
+    """
+    cache = get_cache()
+    value = cache.get(key)
+    if value is None:
+        with replicas.primary():
+            value = compute()
+        cache.set(key, value, ttl)
+    return value
+
+
+def invalidate_windows(prefix, day):
+    """Borra las claves ``prefix:...`` cuyo periodo contiene ``day``.
+
+    ``day`` y los límites guardados en las claves son cadenas ISO (fechas
+    ``YYYY-MM-DD`` o meses ``YYYY-MM``), que se comparan en orden.
+    """
+    cache = get_cache()
+    stale = []
+    for key in cache.keys(prefix + ':'):
+        start, _, end = key[len(prefix) + 1:].rpartition(':')
+        start = start.rpartition(':')[2]
+        if start <= day and (not end or day <= end):
+            stale.append(key)
+    cache.delete(*stale)
+
+
+def invalidate_prefix(prefix):
+    cache = get_cache()
+    cache.delete(*cache.keys(prefix))
@@ -1,4 +1,5 @@
 from app import app
+from models import db
 import os
 
 print("🔍 VERIFICANDO CONFIGURACIÓN ACTUAL...")
@@ -6,5 +7,4 @@ print(f"📊 DATABASE_URL en Environment: {os.environ.get('DATABASE_URL', 'NO EX
 print(f"📊 SQLALCHEMY_DATABASE_URI: {app.config.get('SQLALCHEMY_DATABASE_URI')}")
 
 with app.app_context():
-    from app import db
     print(f"📊 URL de conexión real: {db.engine.url}")
@@ -0,0 +1,251 @@
+"""Comandos ``flask`` de mantenimiento.
+
+La base de datos ya no se toca al importar la app ni al arrancar los workers:
+las tablas, migraciones y el usuario jefe inicial se crean con
+``flask --app app init-db`` antes de levantar gunicorn.
+"""
+import logging
+import os
+from datetime import datetime
+
+import click
+from flask import current_app
+from flask.cli import with_appcontext
+
+import archive
+import assets
+import cache
+import migrations
+import query_plans
+import resize_logo
+import seed
+from models import (db, DEFAULT_SHOP_NAME, Shop, User, HairCut, ProductSale, DailyRollup,
+                    user_scope, bump_data_version, bump_shop_versions)
+from reports import rebuild_daily_rollups, rollup_days, verify_daily_rollups
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_JEFE_EMAIL = 'jefe@barberia.com'
+DEFAULT_JEFE_PASSWORD = 'admin123'
+
+
+def seed_default_jefe():
+    """Crea el usuario jefe por defecto, dueño de la sede principal, si no hay
+    ningún jefe. Devuelve si lo creó."""
+    if User.query.filter_by(role='jefe').first():
+        return False
+    shop = Shop.query.order_by(Shop.id).first()
+    if shop is None:
+        shop = Shop(name=DEFAULT_SHOP_NAME)
+        db.session.add(shop)
+        db.session.flush()
+    jefe = User(email=DEFAULT_JEFE_EMAIL, name='Jefe Principal', role='jefe', shop_id=shop.id, is_owner=True)
+    jefe.set_password(DEFAULT_JEFE_PASSWORD)
+    db.session.add(jefe)
+    db.session.commit()
+    return True
+
+
+def rebuild_rollups():
+    """Reconstruye el resumen diario de todas las sedes y sube las versiones de
+    lo que cambió, como el trabajo de la sede: los workers no deben seguir
+    sirviendo agregados ni ETags de antes de la reconstrucción."""
+    def touched():
+        barbers = {id_ for id_, in db.session.query(DailyRollup.user_id).distinct()}
+        days = {shop_id: set(rollup_days(shop_id)) for shop_id, in db.session.query(Shop.id)}
+        return barbers, days
+
+    barbers, days = touched()
+    rows = rebuild_daily_rollups()
+    after_barbers, after_days = touched()
+    barbers |= after_barbers
+    bump_data_version(*(user_scope(id_) for id_ in barbers))
+    for shop_id, shop_days in after_days.items():
+        bump_shop_versions(shop_id, shop_days | days.get(shop_id, set()))
+    db.session.commit()
+    cache.get_cache().clear()
+    return rows
+
+
+def populate_daily_rollups():
+    """Genera el resumen diario si está vacío y ya hay cortes o ventas (bases
+    existentes, o tras una migración que lo vuelve a crear)."""
+    if not DailyRollup.query.first() and (HairCut.query.first() or ProductSale.query.first()):
+        rows = rebuild_rollups()
+        logger.info(f"✅ Resumen diario generado: {rows} filas")
+
+
+def init_db(seed=True):
+    """Crea las tablas, aplica migraciones y, si ``seed``, crea el jefe inicial."""
+    db.create_all()
+    logger.info("✅ Tablas creadas exitosamente")
+
+    # Índices y cambios de esquema sobre tablas que ya existían
+    for version in migrations.upgrade(db.engine):
+        logger.info(f"✅ Migración {version} aplicada")
+
+    if seed and seed_default_jefe():
+        logger.info(f"✅ Usuario jefe creado: {DEFAULT_JEFE_EMAIL} / {DEFAULT_JEFE_PASSWORD}")
+
+    populate_daily_rollups()
+    logger.info("✅ Base de datos inicializada correctamente")
+
+
+@click.command('init-db')
+@click.option('--seed/--no-seed', default=True, help='Crear el usuario jefe por defecto si no existe.')
+@with_appcontext
+def init_db_command(seed):
+    """Crea las tablas, aplica migraciones y crea el jefe inicial."""
+    try:
+        init_db(seed=seed)
+    except Exception as e:
+        print(f"❌ Error inicializando base de datos: {str(e)}")
+        raise SystemExit(1)
+    print("✅ Base de datos inicializada")
+
+
+@click.command('seed-demo')
+@click.option('--barbers', default=20, show_default=True, help='Cantidad de barberos.')
+@click.option('--years', default=5.0, show_default=True, help='Años de historia hacia atrás.')
+@click.option('--cuts-per-day', default=6, show_default=True, help='Cortes promedio por barbero y día.')
+@click.option('--sales-per-day', default=3, show_default=True, help='Ventas de productos promedio por día.')
+@click.option('--random-seed', default=1, show_default=True, help='Semilla para repetir los mismos datos.')
+@click.option('--shops', default=1, show_default=True, help='Sedes; los barberos se reparten entre ellas.')
+@with_appcontext
+def seed_demo_command(barbers, years, cuts_per_day, sales_per_day, random_seed, shops):
+    """Llena la base con datos sintéticos para pruebas de carga."""
+    counts = seed.seed_database(barbers=barbers, years=years, cuts_per_day=cuts_per_day,
+                                sales_per_day=sales_per_day, random_seed=random_seed, shops=shops)
+    for table, rows in counts.items():
+        print(f"✅ {table}: {rows} filas")
+    print(f"🔑 Barberos: barbero1..{barbers}@barberia.com / {seed.BARBER_PASSWORD}")
+    if shops > 1:
+        print(f"🔑 Jefes de sede: jefe2..{shops}@barberia.com / {seed.BARBER_PASSWORD}")
+
+
+@click.command('rebuild-rollups')
+@with_appcontext
+def rebuild_rollups_command():
+    """Reconstruye el resumen diario desde cortes y ventas."""
+    rows = rebuild_rollups()
+    print(f"✅ Resumen diario reconstruido: {rows} filas")
+
+
+@click.command('verify-rollups')
+@with_appcontext
+def verify_rollups_command():
+    """Verifica el resumen diario contra cortes y ventas."""
+    mismatches = verify_daily_rollups()
+    for day, shop_id, user_id, field, expected, stored in mismatches:
+        print(f"❌ {day} sede {shop_id} usuario {user_id} {field}: esperado {expected}, guardado {stored}")
+    if mismatches:
+        raise SystemExit(1)
+    print("✅ Resumen diario correcto")
+
+
+@click.command('db-upgrade')
+@with_appcontext
+def db_upgrade_command():
+    """Aplica las migraciones de esquema pendientes."""
+    applied = migrations.upgrade(db.engine)
+    populate_daily_rollups()
+    if applied:
+        print(f"✅ Migraciones aplicadas: {', '.join(map(str, applied))}")
+    else:
+        print("✅ El esquema ya está actualizado")
+
+
+@click.command('db-status')
+@with_appcontext
+def db_status_command():
+    """Muestra las migraciones pendientes."""
+    pending = migrations.pending_migrations(db.engine)
+    for version, description, _ in pending:
+        print(f"⏳ {version}: {description}")
+    if not pending:
+        print("✅ No hay migraciones pendientes")
+
+
+@click.command('archive')
+@click.option('--keep-months', default=archive.DEFAULT_KEEP_MONTHS, show_default=True,
+              help='Meses cerrados que se quedan en las tablas activas, además del mes en curso.')
+@click.option('--chunk-size', default=archive.DEFAULT_CHUNK_SIZE, show_default=True, help='Filas por transacción.')
+@with_appcontext
+def archive_command(keep_months, chunk_size):
+    """Mueve cortes y ventas antiguos a las tablas de archivo, por lotes."""
+    before = archive.months_ago(keep_months)
+    print(f"📦 Archivando cortes y ventas anteriores a {before}")
+    moved = archive.archive(before, chunk_size=chunk_size,
+                            on_chunk=lambda name, rows: print(f"   {name}: {rows} filas"))
+    for name, rows in moved.items():
+        print(f"✅ {name}: {rows} filas archivadas")
+
+
+@click.command('restore-archive')
+@click.option('--since', default=None, help='Mes YYYY-MM desde el que se restaura; sin él, todo el archivo.')
+@click.option('--chunk-size', default=archive.DEFAULT_CHUNK_SIZE, show_default=True, help='Filas por transacción.')
+@with_appcontext
+def restore_archive_command(since, chunk_size):
+    """Devuelve cortes y ventas archivados a las tablas activas, por lotes."""
+    try:
+        since = datetime.strptime(since, '%Y-%m').date() if since else None
+    except ValueError:
+        print("❌ --since debe tener el formato YYYY-MM")
+        raise SystemExit(1)
+    moved = archive.restore(since, chunk_size=chunk_size,
+                            on_chunk=lambda name, rows: print(f"   {name}: {rows} filas"))
+    for name, rows in moved.items():
+        print(f"✅ {name}: {rows} filas restauradas")
+
+
+@click.command('explain-routes')
+@with_appcontext
+def explain_routes_command():
+    """Imprime el plan de ejecución de las consultas de cada ruta."""
+    jefe = User.query.filter_by(role='jefe').first()
+    if not jefe:
+        print("❌ Se necesita un usuario jefe para recorrer las rutas")
+        raise SystemExit(1)
+
+    app = current_app._get_current_object()
+    for path, statements in query_plans.route_query_plans(app, db.engine, jefe.id, jefe.role):
+        print(f"\n=== {path}")
+        seen = set()
+        for statement, plan in statements:
+            if statement in seen:
+                continue
+            seen.add(statement)
+            print(' '.join(statement.split()))
+            for line in plan:
+                print(f"    {line}")
+
+
+@click.command('build-assets')
+@click.option('--download/--no-download', default=True, help='Descargar las dependencias del CDN que falten.')
+@with_appcontext
+def build_assets_command(download):
+    """Copia local de dependencias, variantes del logo y archivos con hash comprimidos."""
+    static_folder = current_app.static_folder
+    if download:
+        for name in assets.vendor(static_folder):
+            print(f"⬇️  {name}")
+
+    logo = os.path.join(static_folder, 'images', 'logo.jpg')
+    if os.path.exists(logo):
+        try:
+            variants = resize_logo.build_variants(logo)
+            print(f"✅ Variantes del logo: {len(variants)}")
+        except ImportError:
+            print("⚠️  Pillow no está instalado; no se generan variantes del logo")
+
+    manifest = assets.fingerprint(static_folder)
+    if assets.brotli is None:
+        print("⚠️  brotli no está instalado; sólo se genera .gz")
+    print(f"✅ {len(manifest)} archivos en static/{assets.DIST_DIR}")
+
+
+def init_app(app):
+    for command in (init_db_command, seed_demo_command, rebuild_rollups_command, verify_rollups_command,
+                    db_upgrade_command, db_status_command, explain_routes_command, build_assets_command,
+                    archive_command, restore_archive_command):
+        app.cli.add_command(command)
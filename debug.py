@@ -1,4 +1,5 @@
-from app import app, User
+from app import app
+from models import User
 from datetime import datetime
 
 def check_current_code():
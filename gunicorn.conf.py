@@ -0,0 +1,58 @@
+"""Configuración de gunicorn para producción.
+
+gunicorn lee este archivo automáticamente (``gunicorn app:app``). Todo se
+puede ajustar con variables de entorno:
+
+- ``WEB_CONCURRENCY``: procesos worker (por defecto 2 * CPUs + 1, máx. 8).
+- ``GUNICORN_THREADS``: hilos por worker (por defecto 4, worker ``gthread``).
+  Un hash de contraseña o un panel lento ocupa un hilo, no el worker entero.
+- ``GUNICORN_TIMEOUT``, ``GUNICORN_GRACEFUL_TIMEOUT``, ``GUNICORN_KEEPALIVE``.
+- ``GUNICORN_PRELOAD``: carga la app una vez en el master y la comparte con
+  los workers (``1`` por defecto). Crear la app no abre conexiones y
+  ``post_fork`` descarta las que pudieran venir heredadas del master.
+
+El pool de SQLAlchemy de cada worker se configura con ``DB_POOL_SIZE``,
+``DB_MAX_OVERFLOW`` y ``DB_POOL_TIMEOUT`` (ver ``create_app``).
+"""
+import multiprocessing
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    return int(value) if value else default
+
+
+bind = f"0.0.0.0:{os.environ.get('PORT', '5000')}"
+
+workers = _env_int('WEB_CONCURRENCY', min(multiprocessing.cpu_count() * 2 + 1, 8))
+threads = _env_int('GUNICORN_THREADS', 4)
+worker_class = 'gthread' if threads > 1 else 'sync'
+
+timeout = _env_int('GUNICORN_TIMEOUT', 30)
+graceful_timeout = _env_int('GUNICORN_GRACEFUL_TIMEOUT', 30)
+# Render pone un balanceador delante: mantener la conexión abierta un poco más
+# que su intervalo evita reconexiones en cada request
+keepalive = _env_int('GUNICORN_KEEPALIVE', 5)
+
+# Reciclar workers de vez en cuando acota cualquier crecimiento de memoria
+max_requests = _env_int('GUNICORN_MAX_REQUESTS', 1000)
+max_requests_jitter = _env_int('GUNICORN_MAX_REQUESTS_JITTER', 100)
+
+preload_app = os.environ.get('GUNICORN_PRELOAD', '1') == '1'
+
+accesslog = '-'
+errorlog = '-'
+loglevel = os.environ.get('GUNICORN_LOGLEVEL', 'info')
+
+
+def post_fork(server, worker):
+    """Cada worker abre sus propias conexiones: las del master no se comparten."""
+    from app import app
+    from models import db
+
+    with app.app_context():
+        for engine in db.engines.values():
+            # close=False: no cerrar los sockets que todavía usa el master
+            engine.dispose(close=False)
+    server.log.info(f"🔧 Worker {worker.pid}: pool de conexiones reiniciado")
@@ -0,0 +1,228 @@
+"""Trabajos en segundo plano sin broker externo.
+
+Las exportaciones de varios años, el recálculo del P&L o del resumen diario
+tardan más que el ``timeout`` de gunicorn si se hacen dentro del request. Las
+rutas los encolan con ``submit`` y responden de inmediato con el id; el
+trabajo corre en un ``ThreadPoolExecutor`` del propio worker.
+
+El estado de cada trabajo se guarda como JSON en ``JOBS_DIR`` junto con su
+archivo resultante, así cualquier worker de gunicorn puede responder al
+sondeo de estado y a la descarga. La concurrencia queda acotada por worker
+(``JOBS_MAX_WORKERS`` hilos y ``JOBS_MAX_PENDING`` en cola): los reportes
+nunca ocupan más que esos hilos ni sus conexiones del pool, y el resto queda
+para ``add_cut``, ``dashboard`` y demás tráfico interactivo.
+"""
+import json
+import logging
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from flask import current_app
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_MAX_WORKERS = 1
+DEFAULT_MAX_PENDING = 10
+DEFAULT_TTL = 24 * 3600
+# Cada cuánto se escribe el progreso a disco como máximo
+PROGRESS_INTERVAL = 0.5
+
+QUEUED, RUNNING, DONE, FAILED = 'queued', 'running', 'done', 'failed'
+
+TASKS = {}
+
+
+class JobQueueFull(Exception):
+    """Ya hay ``JOBS_MAX_PENDING`` trabajos esperando en este worker."""
+
+
+def task(name, params=(), jefe_only=False):
+    """Registra ``fn(job, **params)`` como trabajo ``name``.
+
+    ``params`` son los nombres aceptados desde el request; ``fn`` devuelve el
+    nombre de descarga del archivo que dejó en ``job.artifact_path`` o
+    ``None`` si no genera archivo.
+    """
+    def decorator(fn):
+        TASKS[name] = {'fn': fn, 'params': tuple(params), 'jefe_only': jefe_only}
+        return fn
+    return decorator
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class Job:
+    """Estado de un trabajo, tal como se guarda en ``<id>.json``."""
+
+    FIELDS = ('id', 'kind', 'user_id', 'params', 'status', 'progress', 'message',
+              'filename', 'error', 'pid', 'created_at', 'finished_at')
+
+    def __init__(self, runner, **state):
+        self.runner = runner
+        for field in self.FIELDS:
+            setattr(self, field, state.get(field))
+        self._saved_at = 0.0
+
+    @property
+    def artifact_path(self):
+        return self.runner.path(f'{self.id}.out')
+
+    @property
+    def finished(self):
+        return self.status in (DONE, FAILED)
+
+    def to_dict(self):
+        return {field: getattr(self, field) for field in self.FIELDS}
+
+    def save(self):
+        path = self.runner.path(f'{self.id}.json')
+        tmp = f'{path}.{os.getpid()}.tmp'
+        with open(tmp, 'w') as f:
+            json.dump(self.to_dict(), f)
+        os.replace(tmp, path)
+        self._saved_at = time.monotonic()
+
+    def update(self, progress=None, message=None):
+        """Actualiza el progreso (0 a 1); se escribe a disco cada ``PROGRESS_INTERVAL``."""
+        if progress is not None:
+            self.progress = round(min(max(progress, 0.0), 1.0), 3)
+        if message is not None:
+            self.message = message
+        if time.monotonic() - self._saved_at >= PROGRESS_INTERVAL:
+            self.save()
+
+    def counter(self, total, every=1000):
+        """Función para llamar por cada fila procesada de un total conocido."""
+        done = 0
+
+        def tick():
+            nonlocal done
+            done += 1
+            if done % every == 0 and total:
+                self.update(done / total, f'{done} de {total} filas')
+        return tick
+
+
+class JobRunner:
+    def __init__(self, app, directory, max_workers=DEFAULT_MAX_WORKERS,
+                 max_pending=DEFAULT_MAX_PENDING, ttl=DEFAULT_TTL):
+        self.app = app
+        self.directory = directory
+        self.max_workers = max_workers
+        self.max_pending = max_pending
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._executor = None
+        self._pid = None
+        self._active = 0
+        os.makedirs(directory, exist_ok=True)
+
+    def path(self, name):
+        return os.path.join(self.directory, name)
+
+    def _get_executor(self):
+        # Con preload_app el runner se crea antes del fork: cada worker arma su pool
+        if self._pid != os.getpid():
+            self._executor = ThreadPoolExecutor(self.max_workers, thread_name_prefix='job')
+            self._pid = os.getpid()
+            self._active = 0
+        return self._executor
+
+    def submit(self, kind, user_id, params):
+        """Encola un trabajo y devuelve su ``Job`` ya guardado como ``queued``."""
+        fn = TASKS[kind]['fn']
+        with self._lock:
+            executor = self._get_executor()
+            if self._active >= self.max_workers + self.max_pending:
+                raise JobQueueFull(kind)
+            self._active += 1
+        self.prune()
+
+        job = Job(self, id=uuid.uuid4().hex, kind=kind, user_id=user_id, params=params,
+                  status=QUEUED, progress=0.0, message='En cola', pid=os.getpid(),
+                  created_at=datetime.utcnow().isoformat(timespec='seconds'))
+        job.save()
+        executor.submit(self._run, job, fn)
+        return job
+
+    def _run(self, job, fn):
+        try:
+            with self.app.app_context():
+                job.status = RUNNING
+                job.message = 'En proceso'
+                job.save()
+                try:
+                    job.filename = fn(job, **job.params)
+                    job.status, job.progress, job.message = DONE, 1.0, 'Terminado'
+                except Exception as e:
+                    logger.exception(f"❌ Trabajo {job.kind} {job.id} falló")
+                    job.status, job.error, job.message = FAILED, str(e), 'Error'
+                job.finished_at = datetime.utcnow().isoformat(timespec='seconds')
+                job.save()
+        finally:
+            with self._lock:
+                self._active -= 1
+
+    def get(self, job_id):
+        """El ``Job`` con ese id, o ``None``. Marca como fallidos los huérfanos."""
+        try:
+            uuid.UUID(hex=job_id)
+            with open(self.path(f'{job_id}.json')) as f:
+                job = Job(self, **json.load(f))
+        except (ValueError, OSError):
+            return None
+        if not job.finished and not _pid_alive(job.pid):
+            # El worker que lo corría terminó (reinicio, max_requests, timeout)
+            job.status, job.message, job.error = FAILED, 'Error', 'El proceso se detuvo antes de terminar'
+            job.save()
+        return job
+
+    def list(self, user_id=None, limit=20):
+        """Trabajos más recientes, opcionalmente sólo los de ``user_id``."""
+        names = [name for name in os.listdir(self.directory) if name.endswith('.json')]
+        names.sort(key=lambda name: os.path.getmtime(self.path(name)), reverse=True)
+        jobs = []
+        for name in names:
+            job = self.get(name[:-len('.json')])
+            if job and (user_id is None or job.user_id == user_id):
+                jobs.append(job)
+                if len(jobs) >= limit:
+                    break
+        return jobs
+
+    def prune(self):
+        """Borra estado y archivos de trabajos terminados hace más de ``ttl``."""
+        cutoff = time.time() - self.ttl
+        for name in os.listdir(self.directory):
+            path = self.path(name)
+            try:
+                if os.path.getmtime(path) < cutoff:
+                    os.remove(path)
+            except OSError:
+                pass
+
+
+def init_app(app):
+    app.extensions['jobs'] = JobRunner(
+        app,
+        app.config.get('JOBS_DIR') or os.path.join(app.instance_path, 'jobs'),
+        max_workers=app.config.get('JOBS_MAX_WORKERS', DEFAULT_MAX_WORKERS),
+        max_pending=app.config.get('JOBS_MAX_PENDING', DEFAULT_MAX_PENDING),
+        ttl=app.config.get('JOBS_TTL', DEFAULT_TTL),
+    )
+
+
+def get_runner():
+    return current_app.extensions['jobs']
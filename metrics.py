@@ -0,0 +1,252 @@
+"""Métricas en formato de texto de Prometheus (``GET /metrics``).
+
+Por cada endpoint se cuentan los requests y se guardan histogramas de la
+duración total, del tiempo dentro de SQL, del tiempo renderizando plantillas
+y de la cantidad de sentencias SQL. Del pool de conexiones se publican las
+conexiones en uso (eventos ``checkout``/``checkin``) y un histograma de la
+espera para obtener una.
+
+Los valores viven en memoria de cada proceso: con varios workers de gunicorn
+cada scrape ve el worker que lo atiende, así que conviene agregarlos con
+``sum``/``rate`` en Prometheus. Medir cuesta un par de ``perf_counter`` y un
+lock por request o sentencia; con ``METRICS_ENABLED=0`` no se registra
+ningún evento y no cuesta nada. Con ``METRICS_TOKEN`` configurado,
+``/metrics`` exige ``Authorization: Bearer <token>`` (en Render se genera uno
+al crear el servicio).
+"""
+import threading
+import time
+
+from flask import Response, g, has_request_context, request, template_rendered, before_render_template
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.pool import Pool, QueuePool
+
+import query_counter
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10)
+COUNT_BUCKETS = (1, 2, 3, 5, 8, 13, 20, 50, 100)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+def _escape(value):
+    return str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+
+
+def _labels(names, values, extra=()):
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    pairs.extend(f'{name}="{value}"' for name, value in extra)
+    return '{' + ','.join(pairs) + '}' if pairs else ''
+
+
+def _number(value):
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Counter:
+    type = 'counter'
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, *label_values, amount=1):
+        with self._lock:
+            self._values[label_values] = self._values.get(label_values, 0) + amount
+
+    def samples(self):
+        with self._lock:
+            items = sorted(self._values.items())
+        for label_values, value in items:
+            yield self.name + _labels(self.labels, label_values), value
+
+
+class Gauge(Counter):
+    type = 'gauge'
+
+    def dec(self, *label_values, amount=1):
+        self.inc(*label_values, amount=-amount)
+
+
+class Histogram:
+    type = 'histogram'
+
+    def __init__(self, name, help, labels=(), buckets=LATENCY_BUCKETS):
+        self.name = name
+        self.help = help
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value, *label_values):
+        with self._lock:
+            entry = self._values.get(label_values)
+            if entry is None:
+                entry = self._values[label_values] = [[0] * len(self.buckets), 0.0, 0]
+            counts = entry[0]
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    counts[i] += 1
+                    break
+            entry[1] += value
+            entry[2] += 1
+
+    def samples(self):
+        with self._lock:
+            items = sorted((key, (list(counts), total, count))
+                           for key, (counts, total, count) in self._values.items())
+        for label_values, (counts, total, count) in items:
+            cumulative = 0
+            for bound, bucket_count in zip(self.buckets, counts):
+                cumulative += bucket_count
+                yield (self.name + '_bucket'
+                       + _labels(self.labels, label_values, [('le', _number(float(bound)))]),
+                       cumulative)
+            yield self.name + '_bucket' + _labels(self.labels, label_values, [('le', '+Inf')]), count
+            yield self.name + '_sum' + _labels(self.labels, label_values), total
+            yield self.name + '_count' + _labels(self.labels, label_values), count
+
+
+REQUESTS = Counter('barberapp_http_requests_total', 'Requests atendidos.',
+                   ('endpoint', 'method', 'status'))
+REQUEST_SECONDS = Histogram('barberapp_http_request_duration_seconds',
+                            'Duración total del request.', ('endpoint',))
+SQL_SECONDS = Histogram('barberapp_sql_duration_seconds',
+                        'Tiempo del request ejecutando SQL.', ('endpoint',))
+TEMPLATE_SECONDS = Histogram('barberapp_template_duration_seconds',
+                             'Tiempo del request renderizando plantillas.', ('endpoint',))
+SQL_STATEMENTS = Histogram('barberapp_sql_statements', 'Sentencias SQL por request.',
+                           ('endpoint',), buckets=COUNT_BUCKETS)
+POOL_IN_USE = Gauge('barberapp_db_pool_connections_in_use',
+                    'Conexiones del pool prestadas en este momento.')
+POOL_WAIT_SECONDS = Histogram('barberapp_db_pool_checkout_wait_seconds',
+                              'Espera para obtener una conexión del pool.')
+
+METRICS = (REQUESTS, REQUEST_SECONDS, SQL_SECONDS, TEMPLATE_SECONDS, SQL_STATEMENTS,
+           POOL_IN_USE, POOL_WAIT_SECONDS)
+
+
+def render():
+    lines = []
+    for metric in METRICS:
+        lines.append(f'# HELP {metric.name} {metric.help}')
+        lines.append(f'# TYPE {metric.name} {metric.type}')
+        lines.extend(f'{name} {_number(value)}' for name, value in metric.samples())
+    return '\n'.join(lines) + '\n'
+
+
+class InstrumentedQueuePool(QueuePool):
+    """``QueuePool`` que mide cuánto espera cada checkout por una conexión libre."""
+
+    def _do_get(self):
+        start = time.perf_counter()
+        try:
+            return super()._do_get()
+        finally:
+            POOL_WAIT_SECONDS.observe(time.perf_counter() - start)
+
+
+def _on_checkout(dbapi_connection, connection_record, connection_proxy):
+    POOL_IN_USE.inc()
+
+
+def _on_checkin(dbapi_connection, connection_record):
+    POOL_IN_USE.dec()
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('metrics_start', []).append(time.perf_counter())
+
+
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    elapsed = time.perf_counter() - conn.info['metrics_start'].pop()
+    if has_request_context():
+        g.metrics_sql_seconds = g.get('metrics_sql_seconds', 0.0) + elapsed
+
+
+def _failed_statement(context):
+    starts = context.connection.info.get('metrics_start') if context.connection else None
+    if starts:
+        starts.pop()
+
+
+# (clase, evento, función): se registran en ``init_app``, sólo si las métricas están activas
+_LISTENERS = (
+    (Pool, 'checkout', _on_checkout),
+    (Pool, 'checkin', _on_checkin),
+    (Engine, 'before_cursor_execute', _start_statement),
+    (Engine, 'after_cursor_execute', _end_statement),
+    (Engine, 'handle_error', _failed_statement),
+)
+
+
+def _listen():
+    # Los eventos son de las clases, no de un engine: una vez por proceso
+    for target, name, fn in _LISTENERS:
+        if not event.contains(target, name, fn):
+            event.listen(target, name, fn)
+
+
+def _start_template(sender, template, context, **extra):
+    g.metrics_template_start = time.perf_counter()
+
+
+def _end_template(sender, template, context, **extra):
+    start = g.pop('metrics_template_start', None)
+    if start is not None:
+        g.metrics_template_seconds = g.get('metrics_template_seconds', 0.0) + time.perf_counter() - start
+
+
+def _uses_queue_pool(uri):
+    # SQLite en memoria usa un pool por hilo, no QueuePool
+    return not (uri.startswith('sqlite') and (uri == 'sqlite://' or ':memory:' in uri))
+
+
+def init_app(app):
+    """Registra ``/metrics`` y la medición por request. Va antes de ``db.init_app``
+    para que el engine se cree con el pool instrumentado."""
+    if not app.config.get('METRICS_ENABLED', True):
+        return
+
+    _listen()
+
+    if _uses_queue_pool(app.config['SQLALCHEMY_DATABASE_URI']):
+        options = app.config['SQLALCHEMY_ENGINE_OPTIONS'] = dict(app.config['SQLALCHEMY_ENGINE_OPTIONS'])
+        options.setdefault('poolclass', InstrumentedQueuePool)
+
+    before_render_template.connect(_start_template, app)
+    template_rendered.connect(_end_template, app)
+
+    @app.before_request
+    def start_timer():
+        g.metrics_start = time.perf_counter()
+
+    @app.teardown_request
+    def record_request(exc):
+        start = g.pop('metrics_start', None)
+        if start is None:
+            return
+        endpoint = request.url_rule.endpoint if request.url_rule else 'unmatched'
+        status = g.pop('metrics_status', 500 if exc else 200)
+        REQUESTS.inc(endpoint, request.method, str(status))
+        REQUEST_SECONDS.observe(time.perf_counter() - start, endpoint)
+        SQL_SECONDS.observe(g.pop('metrics_sql_seconds', 0.0), endpoint)
+        TEMPLATE_SECONDS.observe(g.pop('metrics_template_seconds', 0.0), endpoint)
+        SQL_STATEMENTS.observe(query_counter.query_count(), endpoint)
+
+    @app.after_request
+    def remember_status(response):
+        g.metrics_status = response.status_code
+        return response
+
+    def metrics_view():
+        token = app.config.get('METRICS_TOKEN')
+        if token and request.headers.get('Authorization') != f'Bearer {token}':
+            return Response('Unauthorized\n', 401, content_type='text/plain')
+        return Response(render(), content_type=CONTENT_TYPE)
+
+    app.add_url_rule('/metrics', 'metrics', metrics_view)
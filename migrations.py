@@ -0,0 +1,207 @@
+"""Migraciones de esquema versionadas.
+
+``db.create_all()`` sólo crea tablas que no existen, así que los índices o
+columnas nuevas nunca llegan a una base de datos que ya está en producción.
+Cada migración de ``MIGRATIONS`` se aplica una sola vez y queda registrada en
+la tabla ``schema_migrations``. Las operaciones se ejecutan en modo
+autocommit para que en PostgreSQL los índices se creen con ``CONCURRENTLY``
+sin bloquear las escrituras de la tabla.
+"""
+import logging
+from datetime import datetime
+
+from sqlalchemy import Column, DateTime, Integer, MetaData, String, Table, text
+
+logger = logging.getLogger(__name__)
+
+# Clave arbitraria para pg_advisory_lock: evita que dos workers migren a la vez
+_LOCK_KEY = 72_410_001
+
+_metadata = MetaData()
+schema_migrations = Table(
+    'schema_migrations', _metadata,
+    Column('version', Integer, primary_key=True),
+    Column('description', String(200), nullable=False),
+    Column('applied_at', DateTime, nullable=False),
+)
+
+
+class Operations:
+    """Operaciones disponibles dentro de una migración."""
+
+    def __init__(self, conn):
+        self.conn = conn
+        self.dialect = conn.dialect.name
+
+    def execute(self, sql, **params):
+        return self.conn.execute(text(sql), params)
+
+    def create_index(self, name, table, columns, unique=False):
+        columns_sql = ', '.join(columns)
+        unique_sql = 'UNIQUE ' if unique else ''
+        if self.dialect == 'postgresql':
+            self._drop_invalid_index(name)
+            self.execute(
+                f'CREATE {unique_sql}INDEX CONCURRENTLY IF NOT EXISTS {name} '
+                f'ON {table} ({columns_sql})'
+            )
+        else:
+            self.execute(
+                f'CREATE {unique_sql}INDEX IF NOT EXISTS {name} ON {table} ({columns_sql})'
+            )
+
+    def drop_index(self, name):
+        if self.dialect == 'postgresql':
+            self.execute(f'DROP INDEX CONCURRENTLY IF EXISTS {name}')
+        else:
+            self.execute(f'DROP INDEX IF EXISTS {name}')
+
+    def add_column(self, table, column_ddl):
+        if self.dialect == 'postgresql':
+            self.execute(f'ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {column_ddl}')
+            return
+        if not self.has_column(table, column_ddl.split()[0]):
+            self.execute(f'ALTER TABLE {table} ADD COLUMN {column_ddl}')
+
+    def has_column(self, table, name):
+        if self.dialect == 'postgresql':
+            return self.execute(
+                'SELECT 1 FROM information_schema.columns WHERE table_name = :table AND column_name = :name',
+                table=table, name=name,
+            ).first() is not None
+        return name in [row[1] for row in self.execute(f'PRAGMA table_info({table})')]
+
+    def _drop_invalid_index(self, name):
+        # Un CREATE INDEX CONCURRENTLY interrumpido deja el índice marcado
+        # como inválido; IF NOT EXISTS lo daría por bueno.
+        invalid = self.execute(
+            'SELECT 1 FROM pg_class c JOIN pg_index i ON i.indexrelid = c.oid '
+            'WHERE c.relname = :name AND NOT i.indisvalid',
+            name=name,
+        ).first()
+        if invalid:
+            logger.warning(f"⚠️  Índice inválido {name}, se vuelve a crear")
+            self.drop_index(name)
+
+
+def _initial_indexes(op):
+    op.create_index('ix_hair_cuts_user_id_date_cut', 'hair_cuts', ['user_id', 'date_cut'])
+    op.create_index('ix_hair_cuts_date_cut', 'hair_cuts', ['date_cut'])
+    op.create_index('ix_product_sales_date_sale', 'product_sales', ['date_sale'])
+    op.create_index('ix_monthly_expenses_month_year', 'monthly_expenses', ['month_year'])
+
+
+def _keyset_indexes(op):
+    # (fecha, id) para paginar por cursor; reemplazan a los índices de una columna
+    op.create_index('ix_hair_cuts_date_cut_id', 'hair_cuts', ['date_cut', 'id'])
+    op.create_index('ix_product_sales_date_sale_id', 'product_sales', ['date_sale', 'id'])
+    op.create_index('ix_monthly_expenses_month_year_id', 'monthly_expenses', ['month_year', 'id'])
+    op.drop_index('ix_hair_cuts_date_cut')
+    op.drop_index('ix_product_sales_date_sale')
+    op.drop_index('ix_monthly_expenses_month_year')
+
+
+def _cut_idempotency_keys(op):
+    op.add_column('hair_cuts', 'idempotency_key VARCHAR(64)')
+    op.create_index('uq_hair_cuts_user_id_idempotency_key', 'hair_cuts',
+                    ['user_id', 'idempotency_key'], unique=True)
+
+
+def _expense_month_start(op):
+    op.add_column('monthly_expenses', 'month_start DATE')
+    if op.dialect == 'postgresql':
+        first_day = "to_date(month_year || '-01', 'YYYY-MM-DD')"
+    else:
+        first_day = "date(month_year || '-01')"
+    op.execute(f'UPDATE monthly_expenses SET month_start = {first_day} WHERE month_start IS NULL')
+    op.create_index('ix_monthly_expenses_month_start', 'monthly_expenses', ['month_start'])
+
+
+def _shops(op):
+    from models import DEFAULT_SHOP_NAME, DailyRollup
+
+    # db.create_all() ya creó la tabla shops; lo existente pasa a la sede principal
+    shop_id = op.execute('SELECT MIN(id) FROM shops').scalar()
+    if shop_id is None:
+        op.execute('INSERT INTO shops (name, created_at) VALUES (:name, :now)',
+                   name=DEFAULT_SHOP_NAME, now=datetime.utcnow())
+        shop_id = op.execute('SELECT MIN(id) FROM shops').scalar()
+    for table in ('users', 'hair_cuts', 'product_sales', 'monthly_expenses'):
+        op.add_column(table, f'shop_id INTEGER NOT NULL DEFAULT {int(shop_id)}')
+    op.add_column('users', 'is_owner BOOLEAN NOT NULL DEFAULT FALSE')
+    # El primer jefe queda como dueño
+    op.execute("UPDATE users SET is_owner = TRUE WHERE id = (SELECT MIN(id) FROM users WHERE role = 'jefe')"
+               " AND NOT EXISTS (SELECT 1 FROM users WHERE is_owner)")
+
+    op.create_index('ix_users_shop_id', 'users', ['shop_id'])
+    op.create_index('ix_hair_cuts_shop_id_date_cut_id', 'hair_cuts', ['shop_id', 'date_cut', 'id'])
+    op.create_index('ix_product_sales_shop_id_date_sale_id', 'product_sales', ['shop_id', 'date_sale', 'id'])
+    op.create_index('ix_monthly_expenses_shop_id_month_year_id', 'monthly_expenses',
+                    ['shop_id', 'month_year', 'id'])
+    op.create_index('ix_monthly_expenses_shop_id_month_start', 'monthly_expenses', ['shop_id', 'month_start'])
+    op.drop_index('ix_hair_cuts_date_cut_id')
+    op.drop_index('ix_product_sales_date_sale_id')
+    op.drop_index('ix_monthly_expenses_month_year_id')
+    op.drop_index('ix_monthly_expenses_month_start')
+
+    # El resumen diario cambia de clave única (SQLite no permite cambiarla en
+    # la tabla): se vuelve a crear vacío e init-db lo reconstruye.
+    if not op.has_column('daily_rollups', 'shop_id'):
+        DailyRollup.__table__.drop(op.conn)
+        DailyRollup.__table__.create(op.conn)
+
+
+def _password_hash_length(op):
+    # scrypt y pbkdf2:sha512 no caben en 128 caracteres. SQLite no aplica el
+    # largo de VARCHAR: sólo hace falta en PostgreSQL.
+    if op.dialect == 'postgresql':
+        op.execute('ALTER TABLE users ALTER COLUMN password_hash TYPE VARCHAR(255)')
+
+
+# (versión, descripción, función). Sólo se agregan al final, nunca se reordenan.
+MIGRATIONS = [
+    (1, 'Índices de cortes, ventas y gastos', _initial_indexes),
+    (2, 'Índices (fecha, id) para paginación por cursor', _keyset_indexes),
+    (3, 'Claves de idempotencia en cortes', _cut_idempotency_keys),
+    (4, 'Fecha de inicio de mes indexable en gastos', _expense_month_start),
+    (5, 'Sedes: shop_id en usuarios, cortes, ventas, gastos y resumen diario', _shops),
+    (6, 'Hash de contraseña de hasta 255 caracteres', _password_hash_length),
+]
+
+
+def applied_versions(conn):
+    schema_migrations.create(conn, checkfirst=True)
+    return {row.version for row in conn.execute(schema_migrations.select())}
+
+
+def pending_migrations(engine):
+    with engine.connect() as conn:
+        applied = applied_versions(conn)
+        conn.commit()
+    return [m for m in MIGRATIONS if m[0] not in applied]
+
+
+def upgrade(engine):
+    """Aplica las migraciones pendientes. Devuelve las versiones aplicadas."""
+    applied_now = []
+    with engine.connect().execution_options(isolation_level='AUTOCOMMIT') as conn:
+        is_postgres = conn.dialect.name == 'postgresql'
+        if is_postgres:
+            conn.execute(text('SELECT pg_advisory_lock(:key)'), {'key': _LOCK_KEY})
+        try:
+            applied = applied_versions(conn)
+            for version, description, operation in MIGRATIONS:
+                if version in applied:
+                    continue
+                logger.info(f"🔧 Aplicando migración {version}: {description}")
+                operation(Operations(conn))
+                conn.execute(schema_migrations.insert().values(
+                    version=version,
+                    description=description,
+                    applied_at=datetime.utcnow(),
+                ))
+                applied_now.append(version)
+        finally:
+            if is_postgres:
+                conn.execute(text('SELECT pg_advisory_unlock(:key)'), {'key': _LOCK_KEY})
+    return applied_now
@@ -1,26 +1,53 @@
+"""Modelos de la base de datos.
+
+Único módulo de modelos de la aplicación: ``db`` se enlaza a la app en
+``create_app`` y las tablas se crean con ``flask init-db``.
+"""
+from datetime import datetime
+
+from flask import g, has_app_context
 from flask_sqlalchemy import SQLAlchemy
-from werkzeug.security import generate_password_hash, check_password_hash
-from datetime import datetime, date
 
-db = SQLAlchemy()
+import passwords
+from replicas import RoutingSession
+
+db = SQLAlchemy(session_options={'class_': RoutingSession})
+
+DEFAULT_SHOP_NAME = 'Barbería Principal'
+
+class Shop(db.Model):
+    """Sede de la barbería. Cortes, ventas, gastos y usuarios pertenecen a una."""
+    __tablename__ = 'shops'
+    id = db.Column(db.Integer, primary_key=True)
+    name = db.Column(db.String(100), nullable=False)
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
 class User(db.Model):
+    __tablename__ = 'users'
     id = db.Column(db.Integer, primary_key=True)
     email = db.Column(db.String(120), unique=True, nullable=False)
-    password_hash = db.Column(db.String(128), nullable=False)
+    password_hash = db.Column(db.String(passwords.MAX_HASH_LENGTH), nullable=False)
     name = db.Column(db.String(100), nullable=False)
     role = db.Column(db.String(20), nullable=False, default='barbero')  # 'jefe' o 'barbero'
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
+    # Dueño: un jefe que puede cambiar de sede y ver el resumen de todas
+    is_owner = db.Column(db.Boolean, nullable=False, default=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
 
+    __table_args__ = (
+        db.Index('ix_users_shop_id', 'shop_id'),
+    )
+    
     cuts = db.relationship('HairCut', backref='barber', lazy=True)
-
+    
     def set_password(self, password):
-        self.password_hash = generate_password_hash(password)
-
+        self.password_hash = passwords.hash_password(password)
+    
     def check_password(self, password):
-        return check_password_hash(self.password_hash, password)
+        return passwords.check_password(self.password_hash, password)
 
 class HairCut(db.Model):
+    __tablename__ = 'hair_cuts'
     id = db.Column(db.Integer, primary_key=True)
     date_cut = db.Column(db.Date, nullable=False)  # Fecha cuando se hizo el corte
     date_recorded = db.Column(db.DateTime, default=datetime.utcnow)  # Fecha cuando se registró
@@ -28,18 +55,69 @@ class HairCut(db.Model):
     quantity = db.Column(db.Integer, nullable=False, default=1)
     total = db.Column(db.Float, nullable=False)
     divided_total = db.Column(db.Float, nullable=False)
-    user_id = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
+    # Clave enviada por el cliente para que reintentar un envío no duplique cortes
+    idempotency_key = db.Column(db.String(64))
+
+    # Las consultas de la barbería filtran siempre por sede: va primero en los índices
+    __table_args__ = (
+        db.Index('ix_hair_cuts_user_id_date_cut', 'user_id', 'date_cut'),
+        db.Index('ix_hair_cuts_shop_id_date_cut_id', 'shop_id', 'date_cut', 'id'),
+        db.Index('uq_hair_cuts_user_id_idempotency_key', 'user_id', 'idempotency_key', unique=True),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date_cut': self.date_cut.isoformat(),
+            'date_recorded': self.date_recorded.isoformat() if self.date_recorded else None,
+            'price': self.price,
+            'quantity': self.quantity,
+            'total': self.total,
+            'divided_total': self.divided_total,
+            'user_id': self.user_id,
+            'shop_id': self.shop_id,
+            'barber': self.barber.name,
+        }
+
+def month_start_of(month_year):
+    """``'YYYY-MM'`` -> primer día del mes como ``date``."""
+    return datetime.strptime(month_year, '%Y-%m').date()
+
+def _default_month_start(context):
+    return month_start_of(context.get_current_parameters()['month_year'])
 
 class MonthlyExpense(db.Model):
+    __tablename__ = 'monthly_expenses'
     id = db.Column(db.Integer, primary_key=True)
     month_year = db.Column(db.String(7), nullable=False)  # Formato: YYYY-MM
+    # Primer día del mes: clave de fecha indexable para reportes por rango
+    month_start = db.Column(db.Date, default=_default_month_start)
     amount = db.Column(db.Float, nullable=False)
     description = db.Column(db.String(200))
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
-    creator = db.relationship('User', backref='expenses')
+
+    __table_args__ = (
+        db.Index('ix_monthly_expenses_shop_id_month_year_id', 'shop_id', 'month_year', 'id'),
+        db.Index('ix_monthly_expenses_shop_id_month_start', 'shop_id', 'month_start'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'month_year': self.month_year,
+            'amount': self.amount,
+            'description': self.description,
+            'created_by': self.created_by,
+            'shop_id': self.shop_id,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+        }
 
 class ProductSale(db.Model):
+    __tablename__ = 'product_sales'
     id = db.Column(db.Integer, primary_key=True)
     date_sale = db.Column(db.Date, nullable=False)
     date_recorded = db.Column(db.DateTime, default=datetime.utcnow)
@@ -47,7 +125,155 @@ class ProductSale(db.Model):
     price = db.Column(db.Float, nullable=False)
     quantity = db.Column(db.Integer, nullable=False, default=1)
     total = db.Column(db.Float, nullable=False)
-    created_by = db.Column(db.Integer, db.ForeignKey('user.id'), nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_product_sales_shop_id_date_sale_id', 'shop_id', 'date_sale', 'id'),
+    )
+    
+    def to_dict(self):
+        return {
+            'id': self.id,
+            'date_sale': self.date_sale.isoformat(),
+            'date_recorded': self.date_recorded.isoformat() if self.date_recorded else None,
+            'product_name': self.product_name,
+            'price': self.price,
+            'quantity': self.quantity,
+            'total': self.total,
+            'created_by': self.created_by,
+            'shop_id': self.shop_id,
+        }
+
+# Archivo: filas de periodos cerrados, movidas por archive.py con el mismo id
+class HairCutArchive(db.Model):
+    """Cortes archivados; mismas columnas que ``hair_cuts``."""
+    __tablename__ = 'hair_cuts_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date_cut = db.Column(db.Date, nullable=False)
+    date_recorded = db.Column(db.DateTime)
+    price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    divided_total = db.Column(db.Float, nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
+    idempotency_key = db.Column(db.String(64))
+
+    __table_args__ = (
+        db.Index('ix_hair_cuts_archive_user_id_date_cut', 'user_id', 'date_cut'),
+        db.Index('ix_hair_cuts_archive_shop_id_date_cut_id', 'shop_id', 'date_cut', 'id'),
+    )
+
+class ProductSaleArchive(db.Model):
+    """Ventas de productos archivadas; mismas columnas que ``product_sales``."""
+    __tablename__ = 'product_sales_archive'
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    date_sale = db.Column(db.Date, nullable=False)
+    date_recorded = db.Column(db.DateTime)
+    product_name = db.Column(db.String(200), nullable=False)
+    price = db.Column(db.Float, nullable=False)
+    quantity = db.Column(db.Integer, nullable=False)
+    total = db.Column(db.Float, nullable=False)
+    created_by = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
+
+    __table_args__ = (
+        db.Index('ix_product_sales_archive_shop_id_date_sale_id', 'shop_id', 'date_sale', 'id'),
+    )
+
+class ArchivedPeriod(db.Model):
+    """Fecha (excluida) hasta la que una tabla puede tener filas en su archivo."""
+    __tablename__ = 'archived_periods'
+    table_name = db.Column(db.String(40), primary_key=True)
+    before = db.Column(db.Date, nullable=False)
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+
+class DailyRollup(db.Model):
+    """Resumen precalculado por día, sede y barbero.
+
+    Se actualiza en la misma transacción que cada escritura de cortes o
+    ventas, así los resúmenes leen como mucho una fila por día y barbero.
+    """
+    __tablename__ = 'daily_rollups'
+    id = db.Column(db.Integer, primary_key=True)
+    day = db.Column(db.Date, nullable=False)
+    shop_id = db.Column(db.Integer, db.ForeignKey('shops.id'), nullable=False)
+    user_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
+    cut_entries = db.Column(db.Integer, nullable=False, default=0)
+    cut_quantity = db.Column(db.Integer, nullable=False, default=0)
+    cut_total = db.Column(db.Float, nullable=False, default=0)
+    cut_divided_total = db.Column(db.Float, nullable=False, default=0)
+    product_sales_total = db.Column(db.Float, nullable=False, default=0)
+
+    __table_args__ = (
+        db.UniqueConstraint('shop_id', 'user_id', 'day', name='uq_daily_rollups_shop_user_day'),
+        db.Index('ix_daily_rollups_shop_id_day', 'shop_id', 'day'),
+        # Resumen del dueño: todas las sedes de un periodo
+        db.Index('ix_daily_rollups_day', 'day'),
+    )
+
+class DataVersion(db.Model):
+    """Contador que sube con cada escritura de un ámbito (un barbero o una
+    sede). Las páginas derivan su ETag de él."""
+    __tablename__ = 'data_versions'
+    scope = db.Column(db.String(40), primary_key=True)
+    version = db.Column(db.Integer, nullable=False, default=0)
+
+ROLLUP_FIELDS = ('cut_entries', 'cut_quantity', 'cut_total',
+                 'cut_divided_total', 'product_sales_total')
+
+# Resumen diario
+def bump_daily_rollup(day, shop_id, user_id, **deltas):
+    """Suma ``deltas`` a la fila (day, shop_id, user_id) dentro de la transacción actual."""
+    values = {field: getattr(DailyRollup, field) + delta for field, delta in deltas.items()}
+    updated = DailyRollup.query.filter_by(shop_id=shop_id, user_id=user_id, day=day).update(
+        values, synchronize_session=False
+    )
+    if not updated:
+        db.session.add(DailyRollup(day=day, shop_id=shop_id, user_id=user_id, **deltas))
+
+# Versiones de datos (ETag)
+def shop_scope(shop_id):
+    return f'shop:{shop_id}'
+
+def user_scope(user_id):
+    return f'user:{user_id}'
+
+def month_scope(shop_id, day):
+    """Un mes de la sede: sólo lo cambian escrituras con fecha en ese mes."""
+    return f'shop:{shop_id}:{day:%Y-%m}'
+
+def data_versions(scopes):
+    """Versión de cada ámbito de ``scopes`` (0 si nunca se escribió).
+
+    Se guarda en ``g`` durante la petición: el ETag y las claves de la caché
+    de resultados comparten una sola consulta.
+    """
+    known = g.setdefault('data_versions', {}) if has_app_context() else {}
+    missing = [scope for scope in scopes if scope not in known]
+    if missing:
+        known.update(dict.fromkeys(missing, 0))
+        known.update(db.session.query(DataVersion.scope, DataVersion.version).filter(
+            DataVersion.scope.in_(missing)
+        ).all())
+    return {scope: known[scope] for scope in scopes}
+
+def bump_data_version(*scopes):
+    """Sube la versión de ``scopes`` dentro de la transacción actual."""
+    if has_app_context():
+        g.pop('data_versions', None)
+    for scope in scopes:
+        updated = DataVersion.query.filter_by(scope=scope).update(
+            {DataVersion.version: DataVersion.version + 1}, synchronize_session=False
+        )
+        if not updated:
+            db.session.add(DataVersion(scope=scope, version=1))
+
+def bump_shop_versions(shop_id, days=()):
+    """Sube la versión de la sede y la de cada mes que contiene alguno de ``days``."""
+    bump_data_version(shop_scope(shop_id), *{month_scope(shop_id, day) for day in days})
 
-    # Relación con el usuario que creó la venta
-    creator = db.relationship('User', backref='product_sales')
\ No newline at end of file
+def bump_cut_versions(user_id, shop_id, days=()):
+    bump_data_version(user_scope(user_id))
+    bump_shop_versions(shop_id, days)
@@ -0,0 +1,64 @@
+"""Paginación por cursor (keyset) sobre ``(fecha, id)``.
+
+En vez de ``OFFSET``, cada página pide las filas estrictamente anteriores a
+la última de la página previa, así la página N cuesta lo mismo que la
+primera mientras exista un índice sobre ``(fecha, id)``.
+"""
+from datetime import date
+
+from sqlalchemy import Date, tuple_
+
+DEFAULT_PER_PAGE = 50
+MAX_PER_PAGE = 200
+
+
+class Page:
+    def __init__(self, items, next_cursor):
+        self.items = items
+        self.next_cursor = next_cursor
+
+    @property
+    def has_next(self):
+        return self.next_cursor is not None
+
+
+def encode_cursor(value, row_id):
+    if isinstance(value, date):
+        value = value.isoformat()
+    return f"{value}_{row_id}"
+
+
+def decode_cursor(cursor, column):
+    """Convierte ``"2024-05-01_123"`` en ``(valor, id)``; ``None`` si no es válido."""
+    try:
+        value, row_id = cursor.rsplit('_', 1)
+        row_id = int(row_id)
+        if isinstance(column.type, Date):
+            value = date.fromisoformat(value)
+    except (AttributeError, ValueError):
+        return None
+    return value, row_id
+
+
+def per_page_arg(value, default=DEFAULT_PER_PAGE):
+    try:
+        per_page = int(value)
+    except (TypeError, ValueError):
+        return default
+    return max(1, min(per_page, MAX_PER_PAGE))
+
+
+def paginate_keyset(query, order_column, id_column, cursor=None, per_page=DEFAULT_PER_PAGE):
+    """Página de ``query`` ordenada de más reciente a más antigua por ``(order_column, id)``."""
+    position = decode_cursor(cursor, order_column) if cursor else None
+    if position is not None:
+        query = query.filter(tuple_(order_column, id_column) < tuple_(*position))
+
+    rows = query.order_by(order_column.desc(), id_column.desc()).limit(per_page + 1).all()
+    items = rows[:per_page]
+
+    next_cursor = None
+    if len(rows) > per_page:
+        last = items[-1]
+        next_cursor = encode_cursor(getattr(last, order_column.key), getattr(last, id_column.key))
+    return Page(items, next_cursor)
@@ -0,0 +1,69 @@
+"""Hash de contraseñas con parámetros configurables.
+
+``PASSWORD_HASH_METHOD`` es el método de werkzeug con sus parámetros
+(``pbkdf2:sha256:600000``, ``scrypt:32768:8:1``...). Cada verificación cuesta
+lo que indiquen esos parámetros en el worker, así que conviene ajustarlos al
+CPU del plan. Al cambiarlos los hashes guardados siguen sirviendo: el login
+vuelve a calcular el de cada usuario la próxima vez que entra
+(``needs_rehash``).
+
+El hash tiene que caber en ``users.password_hash`` (``MAX_HASH_LENGTH``):
+pbkdf2 con sha256 ocupa 102 caracteres, scrypt 162 y pbkdf2 con sha512 166.
+Nada se calcula al arrancar (un hash de prueba cuesta lo mismo que un
+login): ``hash_password`` rechaza un hash que no cabe y ``needs_rehash`` no
+pide recalcular hacia un método así, para que el login siga funcionando.
+"""
+import logging
+
+from flask import current_app, has_app_context
+from werkzeug.security import check_password_hash, generate_password_hash
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_METHOD = 'pbkdf2:sha256:600000'
+
+# Largo de la columna users.password_hash
+MAX_HASH_LENGTH = 255
+
+# método configurado -> hash de prueba (su prefijo trae los parámetros completos)
+_samples = {}
+
+
+def hash_method():
+    if has_app_context():
+        return current_app.config.get('PASSWORD_HASH_METHOD') or DEFAULT_METHOD
+    return DEFAULT_METHOD
+
+
+def _sample(method):
+    # Un método sin parámetros ("scrypt") se completa con los de werkzeug;
+    # se calcula un hash de prueba una sola vez por proceso, en el primer login.
+    if method not in _samples:
+        _samples[method] = generate_password_hash('', method=method)
+    return _samples[method]
+
+
+def _prefix(method):
+    return _sample(method).split('$', 1)[0]
+
+
+def hash_password(password):
+    password_hash = generate_password_hash(password, method=hash_method())
+    if len(password_hash) > MAX_HASH_LENGTH:
+        raise ValueError(f"PASSWORD_HASH_METHOD={hash_method()} genera hashes de {len(password_hash)} "
+                         f"caracteres; users.password_hash admite {MAX_HASH_LENGTH}")
+    return password_hash
+
+
+def check_password(password_hash, password):
+    return check_password_hash(password_hash, password)
+
+
+def needs_rehash(password_hash):
+    """Si ``password_hash`` se hizo con otro método o parámetros que los actuales."""
+    method = hash_method()
+    if len(_sample(method)) > MAX_HASH_LENGTH:
+        logger.error(f"❌ PASSWORD_HASH_METHOD={method} no cabe en users.password_hash; "
+                     f"se mantienen los hashes actuales")
+        return False
+    return password_hash.split('$', 1)[0] != _prefix(method)
@@ -0,0 +1,79 @@
+"""Contador de sentencias SQL por request.
+
+Cada sentencia que pasa por cualquier engine de SQLAlchemy suma uno en
+``g.sql_query_count`` mientras haya un request activo. ``query_budget``
+limita cuántas puede ejecutar una vista: con ``TESTING`` activo pasarse del
+límite es un error (así un N+1 reintroducido rompe las pruebas) y en
+producción sólo se registra una advertencia.
+"""
+import logging
+import threading
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+logger = logging.getLogger(__name__)
+
+_local = threading.local()
+
+
+@event.listens_for(Engine, 'before_cursor_execute')
+def _count_statement(conn, cursor, statement, parameters, context, executemany):
+    if has_request_context():
+        g.sql_query_count = g.get('sql_query_count', 0) + 1
+    for counter in getattr(_local, 'counters', ()):
+        counter.append(statement)
+
+
+def query_count():
+    """Sentencias ejecutadas hasta ahora en el request actual."""
+    return g.get('sql_query_count', 0)
+
+
+@contextmanager
+def count_queries():
+    """Captura las sentencias ejecutadas en este hilo dentro del bloque.
+
+        with count_queries() as statements:
+            client.get('/weekly_summary')
+        assert len(statements) <= 4
+    """
+    statements = []
+    counters = getattr(_local, 'counters', None)
+    if counters is None:
+        counters = _local.counters = []
+    counters.append(statements)
+    try:
+        yield statements
+    finally:
+        counters.remove(statements)
+
+
+def query_budget(limit):
+    """Máximo de sentencias SQL que puede ejecutar una vista, decoradores incluidos."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            before = query_count()
+            response = f(*args, **kwargs)
+            used = query_count() - before
+            if used > limit:
+                message = f"{f.__name__} ejecutó {used} consultas SQL (límite {limit})"
+                if current_app.testing:
+                    raise AssertionError(message)
+                logger.warning(f"⚠️  {message}")
+            return response
+        return decorated_function
+    return decorator
+
+
+def init_app(app):
+    """Agrega la cabecera ``X-SQL-Queries`` en pruebas o si se activa en la config."""
+    @app.after_request
+    def add_query_count_header(response):
+        if app.testing or app.config.get('SQL_QUERY_COUNT_HEADER'):
+            response.headers['X-SQL-Queries'] = str(query_count())
+        return response
@@ -0,0 +1,64 @@
+"""Captura de las consultas de cada ruta y su plan de ejecución (EXPLAIN)."""
+from contextlib import contextmanager
+
+from sqlalchemy import event
+
+
+def explain(conn, statement, parameters=None):
+    """Devuelve las líneas del plan de ``statement`` (SQL tal como va al driver)."""
+    if conn.dialect.name == 'sqlite':
+        prefix = 'EXPLAIN QUERY PLAN '
+    else:
+        prefix = 'EXPLAIN '
+    result = conn.exec_driver_sql(prefix + statement, parameters or ())
+    if conn.dialect.name == 'sqlite':
+        # (id, parent, notused, detail)
+        return [row[-1] for row in result]
+    return [row[0] for row in result]
+
+
+@contextmanager
+def capture_selects(engine):
+    """Acumula en una lista los SELECT que se ejecutan sobre ``engine``."""
+    captured = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith('SELECT'):
+            captured.append((statement, parameters))
+
+    event.listen(engine, 'before_cursor_execute', before_cursor_execute)
+    try:
+        yield captured
+    finally:
+        event.remove(engine, 'before_cursor_execute', before_cursor_execute)
+
+
+def route_query_plans(app, engine, user_id, user_role):
+    """Recorre las rutas GET sin argumentos como ``user_id`` y explica sus consultas.
+
+    Devuelve ``[(ruta, [(sql, [líneas del plan]), ...]), ...]``.
+    """
+    skip = {'static', 'login', 'logout', 'index', 'manifest'}
+    rules = sorted(
+        (rule for rule in app.url_map.iter_rules()
+         if 'GET' in rule.methods and not rule.arguments
+         and rule.endpoint.rpartition('.')[2] not in skip),
+        key=lambda rule: rule.rule,
+    )
+
+    client = app.test_client()
+    with client.session_transaction() as sess:
+        sess['user_id'] = user_id
+        sess['user_role'] = user_role
+
+    plans = []
+    for rule in rules:
+        with capture_selects(engine) as captured:
+            client.get(rule.rule)
+        with engine.connect() as conn:
+            statements = [
+                (statement, explain(conn, statement, parameters))
+                for statement, parameters in captured
+            ]
+        plans.append((rule.rule, statements))
+    return plans
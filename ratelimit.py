@@ -0,0 +1,128 @@
+"""Límite de intentos de login con baldes de fichas (token bucket).
+
+Cada POST a ``/login`` gasta una ficha del balde de su IP; si está vacío el
+intento se rechaza antes de buscar al usuario y de calcular el hash, así un
+ataque desde una IP no deja sin CPU al worker. Cada contraseña incorrecta
+gasta además una ficha del balde de la cuenta; con ese balde vacío los
+intentos fallidos contra la cuenta responden "Demasiados intentos" (429).
+
+El balde de la cuenta nunca frena una contraseña correcta: un ataque desde
+muchas IPs contra ``jefe@barberia.com`` no deja afuera al dueño, que entra
+en cuanto el balde de su IP lo permite. A cambio ese balde no limita cuántas
+contraseñas se prueban; sólo lo hacen los baldes de cada IP.
+
+Por defecto los baldes viven en memoria de cada worker. Con
+``LOGIN_RATE_LIMIT_BACKEND = 'redis'`` se comparten entre workers usando
+``CACHE_REDIS_URL``; las pruebas pueden pasar a ``init_app`` cualquier objeto
+con el mismo método ``take``.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+from flask import current_app
+
+DEFAULT_MAXSIZE = 10000
+
+
+class MemoryBuckets:
+    """Baldes en memoria, seguros entre hilos. Se descartan los menos usados."""
+
+    def __init__(self, maxsize=DEFAULT_MAXSIZE):
+        self.maxsize = maxsize
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def take(self, key, capacity, per_second, cost=1):
+        """Gasta ``cost`` fichas de ``key``. Devuelve 0 si había, o los segundos
+        hasta que haya (sin gastar nada). Con ``cost=0`` sólo revisa que quede
+        al menos una."""
+        now = time.monotonic()
+        with self._lock:
+            tokens, stamp = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + (now - stamp) * per_second)
+            needed = max(cost, 1)
+            wait = 0.0 if tokens >= needed else (needed - tokens) / per_second
+            if not wait:
+                tokens -= cost
+            self._buckets[key] = (tokens, now)
+            self._buckets.move_to_end(key)
+            while len(self._buckets) > self.maxsize:
+                self._buckets.popitem(last=False)
+        return wait
+
+
+class RedisBuckets:
+    """Baldes compartidos entre workers. Requiere el paquete ``redis`` (opcional)."""
+
+    # Recarga y descuento atómicos en el servidor
+    SCRIPT = """
+    local capacity = tonumber(ARGV[1])
+    local per_second = tonumber(ARGV[2])
+    local now = tonumber(ARGV[3])
+    local cost = tonumber(ARGV[4])
+    local state = redis.call('HMGET', KEYS[1], 'tokens', 'stamp')
+    local tokens = tonumber(state[1]) or capacity
+    local stamp = tonumber(state[2]) or now
+    tokens = math.min(capacity, tokens + math.max(0, now - stamp) * per_second)
+    local needed = math.max(cost, 1)
+    local wait = 0
+    if tokens >= needed then
+        tokens = tokens - cost
+    else
+        wait = (needed - tokens) / per_second
+    end
+    redis.call('HSET', KEYS[1], 'tokens', tokens, 'stamp', now)
+    redis.call('EXPIRE', KEYS[1], math.ceil(capacity / per_second) + 1)
+    return tostring(wait)
+    """
+
+    def __init__(self, url, namespace='barberapp:ratelimit:'):
+        import redis
+
+        self.client = redis.Redis.from_url(url)
+        self.namespace = namespace
+        self._take = self.client.register_script(self.SCRIPT)
+
+    def take(self, key, capacity, per_second, cost=1):
+        return float(self._take(keys=[self.namespace + key],
+                                args=[capacity, per_second, time.time(), cost]))
+
+
+def init_app(app, backend=None):
+    if backend is None:
+        if app.config.get('LOGIN_RATE_LIMIT_BACKEND') == 'redis':
+            backend = RedisBuckets(app.config['CACHE_REDIS_URL'])
+        else:
+            backend = MemoryBuckets()
+    app.extensions['login_buckets'] = backend
+    return backend
+
+
+def get_buckets():
+    return current_app.extensions['login_buckets']
+
+
+def _ip_key(ip):
+    return f'login:ip:{ip}'
+
+
+def _account_key(email):
+    return f'login:account:{email.strip().lower()}'
+
+
+def _limits(kind):
+    config = current_app.config
+    return config[f'LOGIN_{kind}_BURST'], config[f'LOGIN_{kind}_PER_MINUTE'] / 60
+
+
+def login_wait(ip):
+    """Segundos que debe esperar este intento de login desde ``ip`` (0 si puede
+    seguir). Gasta una ficha de la IP."""
+    return get_buckets().take(_ip_key(ip), *_limits('IP'))
+
+
+def login_failed(email):
+    """Contraseña incorrecta: gasta una ficha de la cuenta. Devuelve los
+    segundos a esperar si el balde ya estaba vacío (0 si no)."""
+    return get_buckets().take(_account_key(email), *_limits('ACCOUNT'))
@@ -0,0 +1,132 @@
+"""Lecturas en réplicas de la base de datos.
+
+Con ``DATABASE_REPLICA_URLS`` (URLs separadas por comas) cada réplica queda
+como un bind ``replica_N`` de Flask-SQLAlchemy. Las vistas marcadas con
+``@replica_reads`` mandan sus SELECT a una réplica sana; todo lo demás
+(escrituras, ``flush``, vistas sin marcar) va a la base principal.
+
+- Lee lo que escribiste: un request que escribe en la principal deja en la
+  sesión del usuario ``db_primary_until``; durante ``DB_REPLICA_STICKY_SECONDS``
+  sus lecturas siguen yendo a la principal aunque la réplica vaya atrasada.
+- Réplica caída: si una sentencia falla en la réplica, ésta queda fuera por
+  ``DB_REPLICA_RETRY_SECONDS`` y la vista (de sólo lectura) se repite entera
+  contra la principal.
+- Lo que se guarda en la caché compartida se calcula siempre en la principal
+  (``primary()``), para no dejar cacheado un dato atrasado.
+
+Para probarlo en local basta con copiar la base SQLite:
+
+    cp barber.db replica.db
+    DATABASE_URL=sqlite:///$PWD/barber.db DATABASE_REPLICA_URLS=sqlite:///$PWD/replica.db \\
+        flask --app app run
+"""
+import logging
+import random
+import time
+from contextlib import contextmanager
+from functools import wraps
+
+from flask import current_app, g, has_request_context, session
+from flask_sqlalchemy.session import Session
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+from sqlalchemy.exc import DBAPIError
+
+logger = logging.getLogger(__name__)
+
+BIND_PREFIX = 'replica_'
+DEFAULT_STICKY_SECONDS = 10
+DEFAULT_RETRY_SECONDS = 30
+
+
+def replica_binds(urls):
+    """``SQLALCHEMY_BINDS`` para una lista de URLs de réplicas."""
+    return {f'{BIND_PREFIX}{index}': url for index, url in enumerate(urls)}
+
+
+class RoutingSession(Session):
+    """Sesión que manda los SELECT a la réplica elegida para el request."""
+
+    def get_bind(self, mapper=None, clause=None, bind=None, **kwargs):
+        if bind is None and has_request_context():
+            if self._flushing or getattr(clause, 'is_dml', False):
+                g.db_wrote = True
+            elif getattr(clause, 'is_select', False) and g.get('db_replica') is not None:
+                return g.db_replica
+        return super().get_bind(mapper=mapper, clause=clause, bind=bind, **kwargs)
+
+
+def _state():
+    return current_app.extensions['replicas']
+
+
+def choose_replica():
+    """Engine de una réplica sana, o ``None`` si hay que leer de la principal."""
+    state = _state()
+    if not state['keys'] or session.get('db_primary_until', 0) > time.time():
+        return None
+    now = time.monotonic()
+    healthy = [key for key in state['keys'] if state['down_until'].get(key, 0) <= now]
+    if not healthy:
+        return None
+    return current_app.extensions['sqlalchemy'].engines[random.choice(healthy)]
+
+
+def replica_reads(f):
+    """La vista sólo lee: sus consultas pueden ir a una réplica."""
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        engine = choose_replica()
+        if engine is None:
+            return f(*args, **kwargs)
+        g.db_replica = engine
+        try:
+            return f(*args, **kwargs)
+        except DBAPIError:
+            if not g.pop('db_replica_failed', False):
+                raise
+            current_app.extensions['sqlalchemy'].session.rollback()
+            g.db_replica = None
+            return f(*args, **kwargs)
+    return decorated_function
+
+
+@contextmanager
+def primary():
+    """Dentro del bloque todas las lecturas van a la base principal."""
+    replica = g.get('db_replica') if has_request_context() else None
+    if replica is not None:
+        g.db_replica = None
+    try:
+        yield
+    finally:
+        if replica is not None:
+            g.db_replica = replica
+
+
+@event.listens_for(Engine, 'handle_error')
+def _replica_failed(context):
+    if not has_request_context() or context.engine is not g.get('db_replica'):
+        return
+    state = _state()
+    engines = current_app.extensions['sqlalchemy'].engines
+    for key in state['keys']:
+        if engines[key] is context.engine:
+            state['down_until'][key] = time.monotonic() + state['retry_seconds']
+            logger.warning(f"⚠️  Réplica {key} fuera por {state['retry_seconds']}s: {context.original_exception}")
+    g.db_replica_failed = True
+
+
+def init_app(app):
+    app.extensions['replicas'] = {
+        'keys': sorted(key for key in app.config.get('SQLALCHEMY_BINDS', {}) if key.startswith(BIND_PREFIX)),
+        'down_until': {},
+        'retry_seconds': app.config.get('DB_REPLICA_RETRY_SECONDS', DEFAULT_RETRY_SECONDS),
+    }
+    sticky_seconds = app.config.get('DB_REPLICA_STICKY_SECONDS', DEFAULT_STICKY_SECONDS)
+
+    @app.after_request
+    def stick_to_primary(response):
+        if app.extensions['replicas']['keys'] and g.get('db_wrote') and 'user_id' in session:
+            session['db_primary_until'] = time.time() + sticky_seconds
+        return response
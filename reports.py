@@ -0,0 +1,460 @@
+"""Resúmenes y totales de reportes.
+
+Las consultas leen el resumen diario (``daily_rollups``) y se limitan a una
+sede; los agregados de cada sede se guardan además en la caché de resultados
+por periodo. ``shops_rollup`` compara todas las sedes para el dueño.
+"""
+from sqlalchemy import case, func
+
+from datetime import date, timedelta
+
+import cache
+import replicas
+from models import (db, DailyRollup, HairCut, HairCutArchive, MonthlyExpense, ProductSale, ProductSaleArchive,
+                    Shop, User, ROLLUP_FIELDS, data_versions, month_scope, shop_scope)
+
+# Resumen diario
+def _rollups_from_raw(before=None, shop_id=None):
+    """Calcula el resumen diario directamente de las tablas de cortes y ventas,
+    activas y archivadas. Con ``before`` sólo los días anteriores a esa fecha;
+    con ``shop_id``, sólo esa sede."""
+    rollups = {}
+
+    def row_for(day, shop, user_id):
+        return rollups.setdefault((day, shop, user_id), dict.fromkeys(ROLLUP_FIELDS, 0))
+
+    for model in (HairCut, HairCutArchive):
+        cut_rows = db.session.query(
+            model.date_cut,
+            model.shop_id,
+            model.user_id,
+            func.count(model.id),
+            func.sum(model.quantity),
+            func.sum(model.total),
+            func.sum(model.divided_total),
+        ).group_by(model.date_cut, model.shop_id, model.user_id)
+        if before is not None:
+            cut_rows = cut_rows.filter(model.date_cut < before)
+        if shop_id is not None:
+            cut_rows = cut_rows.filter(model.shop_id == shop_id)
+        for day, shop, user_id, entries, quantity, total, divided in cut_rows:
+            row = row_for(day, shop, user_id)
+            row['cut_entries'] += entries
+            row['cut_quantity'] += quantity or 0
+            row['cut_total'] += total or 0
+            row['cut_divided_total'] += divided or 0
+
+    for model in (ProductSale, ProductSaleArchive):
+        sale_rows = db.session.query(
+            model.date_sale,
+            model.shop_id,
+            model.created_by,
+            func.sum(model.total),
+        ).group_by(model.date_sale, model.shop_id, model.created_by)
+        if before is not None:
+            sale_rows = sale_rows.filter(model.date_sale < before)
+        if shop_id is not None:
+            sale_rows = sale_rows.filter(model.shop_id == shop_id)
+        for day, shop, user_id, total in sale_rows:
+            row_for(day, shop, user_id)['product_sales_total'] += total or 0
+
+    return rollups
+
+def rebuild_daily_rollups(shop_id=None):
+    """Reconstruye ``daily_rollups`` desde cero (sólo las filas de ``shop_id`` si
+    se indica). Devuelve la cantidad de filas."""
+    rollups = _rollups_from_raw(shop_id=shop_id)
+    stale = DailyRollup.query
+    if shop_id is not None:
+        stale = stale.filter(DailyRollup.shop_id == shop_id)
+    stale.delete()
+    db.session.add_all(
+        DailyRollup(day=day, shop_id=shop_id, user_id=user_id, **values)
+        for (day, shop_id, user_id), values in rollups.items()
+    )
+    db.session.commit()
+    return len(rollups)
+
+def verify_daily_rollups(tolerance=0.005, before=None):
+    """Compara ``daily_rollups`` con las tablas originales (y su archivo).
+
+    Devuelve una lista de ``(day, shop_id, user_id, campo, esperado, guardado)`` con
+    cada diferencia encontrada; vacía si el resumen es correcto. Con ``before``
+    sólo revisa los días anteriores a esa fecha.
+    """
+    expected = _rollups_from_raw(before)
+    stored_rows = DailyRollup.query
+    if before is not None:
+        stored_rows = stored_rows.filter(DailyRollup.day < before)
+    stored = {
+        (row.day, row.shop_id, row.user_id): {field: getattr(row, field) for field in ROLLUP_FIELDS}
+        for row in stored_rows
+    }
+    empty = dict.fromkeys(ROLLUP_FIELDS, 0)
+
+    mismatches = []
+    for key in sorted(set(expected) | set(stored)):
+        want = expected.get(key, empty)
+        have = stored.get(key, empty)
+        for field in ROLLUP_FIELDS:
+            if abs((want[field] or 0) - (have[field] or 0)) > tolerance:
+                mismatches.append((*key, field, want[field], have[field]))
+    return mismatches
+
+# Consultas de reportes
+def _sum_if(condition, column):
+    return func.coalesce(func.sum(case((condition, column), else_=0)), 0)
+
+def _period_condition(column, start, end=None):
+    if end is None:
+        return column >= start
+    if start == end:
+        return column == start
+    return column.between(start, end)
+
+def cut_period_totals(periods, shop_id, user_id=None):
+    """Totales de cortes para varios periodos en una sola consulta.
+
+    ``periods`` es un dict ``{nombre: (desde, hasta)}``; ``hasta`` puede ser
+    ``None`` para un periodo abierto. Devuelve ``{nombre: {'count', 'quantity',
+    'total', 'divided_total'}}`` de la sede leyendo sólo el resumen diario.
+    """
+    columns = []
+    for start, end in periods.values():
+        condition = _period_condition(DailyRollup.day, start, end)
+        columns.extend([
+            _sum_if(condition, DailyRollup.cut_entries),
+            _sum_if(condition, DailyRollup.cut_quantity),
+            _sum_if(condition, DailyRollup.cut_total),
+            _sum_if(condition, DailyRollup.cut_divided_total),
+        ])
+
+    query = db.session.query(*columns).filter(
+        DailyRollup.shop_id == shop_id,
+        DailyRollup.day >= min(start for start, _ in periods.values()),
+    )
+    if user_id is not None:
+        query = query.filter(DailyRollup.user_id == user_id)
+    row = query.one()
+
+    totals = {}
+    for i, name in enumerate(periods):
+        count, quantity, total, divided = row[i * 4:i * 4 + 4]
+        totals[name] = {
+            'count': int(count),
+            'quantity': int(quantity),
+            'total': float(total),
+            'divided_total': float(divided),
+        }
+    return totals
+
+def cut_totals_by_user(shop_id, start, end=None):
+    """Cantidad, total y parte dividida por barbero dentro de un periodo."""
+    rows = db.session.query(
+        DailyRollup.user_id,
+        func.sum(DailyRollup.cut_quantity),
+        func.sum(DailyRollup.cut_total),
+        func.sum(DailyRollup.cut_divided_total),
+    ).filter(
+        DailyRollup.shop_id == shop_id,
+        _period_condition(DailyRollup.day, start, end),
+    ).group_by(DailyRollup.user_id).having(
+        func.sum(DailyRollup.cut_entries) > 0
+    ).all()
+
+    return {
+        user_id: {
+            'quantity': int(quantity or 0),
+            'total': float(total or 0),
+            'divided_total': float(divided or 0),
+        }
+        for user_id, quantity, total, divided in rows
+    }
+
+def product_sales_totals(shop_id, periods):
+    """Total de ventas de productos por periodo en una sola consulta."""
+    columns = [
+        _sum_if(_period_condition(DailyRollup.day, start, end), DailyRollup.product_sales_total)
+        for start, end in periods.values()
+    ]
+    row = db.session.query(*columns).filter(
+        DailyRollup.shop_id == shop_id,
+        DailyRollup.day >= min(start for start, _ in periods.values()),
+    ).one()
+    return {name: float(value) for name, value in zip(periods, row)}
+
+def cut_days(first, last, shop_id, user_id=None):
+    """Cortes por día entre ``first`` y ``last`` con una sola consulta agrupada.
+
+    Devuelve una lista ordenada de ``{'date', 'entries', 'quantity', 'total',
+    'divided_total'}`` sólo con los días que tienen cortes.
+    """
+    query = db.session.query(
+        DailyRollup.day,
+        func.sum(DailyRollup.cut_entries),
+        func.sum(DailyRollup.cut_quantity),
+        func.sum(DailyRollup.cut_total),
+        func.sum(DailyRollup.cut_divided_total),
+    ).filter(
+        DailyRollup.shop_id == shop_id,
+        DailyRollup.day.between(first, last),
+        DailyRollup.cut_entries > 0,
+    )
+    if user_id is not None:
+        query = query.filter(DailyRollup.user_id == user_id)
+    rows = query.group_by(DailyRollup.day).order_by(DailyRollup.day)
+    return [
+        {
+            'date': day.isoformat(),
+            'entries': int(entries),
+            'quantity': int(quantity or 0),
+            'total': float(total or 0),
+            'divided_total': float(divided or 0),
+        }
+        for day, entries, quantity, total, divided in rows
+    ]
+
+# Agregados de cada sede, cacheados por periodo
+def shop_cache_prefix(kind, shop_id):
+    """Prefijo de las claves ``kind`` de la sede.
+
+    Con Redis basta con borrar los periodos afectados por cada escritura. En
+    memoria cada worker sólo borra sus propias claves, así que el prefijo
+    lleva la versión de datos de la sede: tras una escritura en cualquier
+    worker, todos dejan de encontrar lo anterior.
+    """
+    if cache.is_shared():
+        return f'{kind}:{shop_id}'
+    scope = shop_scope(shop_id)
+    return f'{kind}:{shop_id}:v{data_versions([scope])[scope]}'
+
+def _cached_windows(prefix, periods, compute):
+    store = cache.get_cache()
+    keys = {name: cache.window_key(prefix, start, end) for name, (start, end) in periods.items()}
+    results = {name: store.get(key) for name, key in keys.items()}
+    missing = {name: periods[name] for name, value in results.items() if value is None}
+    if missing:
+        with replicas.primary():
+            computed = compute(missing)
+        for name, value in computed.items():
+            store.set(keys[name], value)
+            results[name] = value
+    return results
+
+def shop_cut_period_totals(shop_id, periods):
+    return _cached_windows(f"{shop_cache_prefix('cuts', shop_id)}:shop", periods,
+                           lambda missing: cut_period_totals(missing, shop_id))
+
+def shop_cut_totals_by_user(shop_id, start, end=None):
+    pairs = cache.memoize(
+        cache.window_key(f"{shop_cache_prefix('cuts', shop_id)}:by_user", start, end),
+        lambda: list(cut_totals_by_user(shop_id, start, end).items()),
+    )
+    return {user_id: totals for user_id, totals in pairs}
+
+def shop_product_sales_totals(shop_id, periods):
+    return _cached_windows(shop_cache_prefix('sales', shop_id), periods,
+                           lambda missing: product_sales_totals(shop_id, missing))
+
+def shop_users(shop_id):
+    return cache.memoize(shop_cache_prefix('users', shop_id), lambda: [
+        {'id': user.id, 'name': user.name, 'role': user.role}
+        for user in User.query.filter_by(shop_id=shop_id).order_by(User.id)
+    ])
+
+def rollup_days(shop_id, user_id=None):
+    """Días con movimientos de la sede (o de un barbero) en el resumen diario."""
+    query = db.session.query(DailyRollup.day).filter(DailyRollup.shop_id == shop_id)
+    if user_id is not None:
+        query = query.filter(DailyRollup.user_id == user_id)
+    return [day for day, in query.distinct()]
+
+def invalidate_cut_aggregates(days, shop_id):
+    for day in days:
+        cache.invalidate_windows(f'cuts:{shop_id}', day.isoformat())
+        invalidate_pnl(shop_id, day)
+
+# Resumen del dueño
+def shops_rollup(periods):
+    """Totales de cada sede para varios periodos, en una sola consulta agrupada.
+
+    Devuelve ``[{'id', 'name', 'periods': {nombre: {'quantity', 'total',
+    'shop_share', 'product_income'}}}]`` con todas las sedes, incluidas las
+    que no tienen movimientos. La parte de la sede es el total de cortes menos
+    lo que se llevan los barberos (los jefes se quedan con sus cortes).
+    """
+    is_jefe = User.role == 'jefe'
+    columns = []
+    for start, end in periods.values():
+        condition = _period_condition(DailyRollup.day, start, end)
+        columns.extend([
+            _sum_if(condition, DailyRollup.cut_quantity),
+            _sum_if(condition, DailyRollup.cut_total),
+            _sum_if(condition, case((is_jefe, 0), else_=DailyRollup.cut_divided_total)),
+            _sum_if(condition, DailyRollup.product_sales_total),
+        ])
+    rows = db.session.query(DailyRollup.shop_id, *columns).join(
+        User, User.id == DailyRollup.user_id
+    ).filter(
+        DailyRollup.day >= min(start for start, _ in periods.values())
+    ).group_by(DailyRollup.shop_id)
+    by_shop = {row[0]: row[1:] for row in rows}
+
+    shops = []
+    for shop in Shop.query.order_by(Shop.id):
+        row = by_shop.get(shop.id, (0,) * len(columns))
+        totals = {}
+        for i, name in enumerate(periods):
+            quantity, total, payouts, products = row[i * 4:i * 4 + 4]
+            totals[name] = {
+                'quantity': int(quantity),
+                'total': float(total),
+                'shop_share': float(total) - float(payouts),
+                'product_income': float(products),
+            }
+        shops.append({'id': shop.id, 'name': shop.name, 'periods': totals})
+    return shops
+
+# Estado de resultados (P&L) mensual
+PNL_PAST_TTL = 7 * 24 * 3600
+
+def month_range(month):
+    """Primer y último día del mes ``date`` dado."""
+    first = date(month.year, month.month, 1)
+    following = date(first.year + first.month // 12, first.month % 12 + 1, 1)
+    return first, following - timedelta(days=1)
+
+def _months(first, last):
+    month = date(first.year, first.month, 1)
+    while month <= last:
+        yield month
+        month = month_range(month)[1] + timedelta(days=1)
+
+def _month_key(column):
+    if db.engine.dialect.name == 'postgresql':
+        return func.to_char(column, 'YYYY-MM')
+    return func.strftime('%Y-%m', column)
+
+def _empty_pnl(month):
+    return {
+        'month': month.strftime('%Y-%m'),
+        'cut_quantity': 0,
+        'cut_total': 0.0,
+        'payouts': 0.0,
+        'shop_share': 0.0,
+        'product_income': 0.0,
+        'revenue': 0.0,
+        'expenses': 0.0,
+        'net': 0.0,
+        'barbers': [],
+    }
+
+def compute_monthly_pnl(shop_id, first, last):
+    """P&L de la sede para los meses entre ``first`` y ``last`` con dos consultas agrupadas.
+
+    Cortes y ventas salen del resumen diario agrupado por mes y barbero; los
+    gastos, de ``monthly_expenses.month_start``. La parte del barbero
+    (``divided_total``) es pago a barberos salvo para los jefes, que se
+    quedan con el 100% de sus cortes. El rol sale de ``users`` y no de la
+    lista de la sede: el dueño también corta en sedes que no son la suya.
+    """
+    start, end = date(first.year, first.month, 1), month_range(last)[1]
+    months = {month.strftime('%Y-%m'): _empty_pnl(month) for month in _months(start, end)}
+
+    month = _month_key(DailyRollup.day).label('month')
+    rollup_rows = db.session.query(
+        month,
+        DailyRollup.user_id,
+        User.role,
+        func.sum(DailyRollup.cut_quantity),
+        func.sum(DailyRollup.cut_total),
+        func.sum(DailyRollup.cut_divided_total),
+        func.sum(DailyRollup.product_sales_total),
+    ).join(User, User.id == DailyRollup.user_id).filter(
+        DailyRollup.shop_id == shop_id,
+        DailyRollup.day.between(start, end),
+    ).group_by('month', DailyRollup.user_id, User.role)
+    for key, user_id, role, quantity, total, divided, products in rollup_rows:
+        row = months[key]
+        payout = 0.0 if role == 'jefe' else float(divided or 0)
+        row['cut_quantity'] += int(quantity or 0)
+        row['cut_total'] += float(total or 0)
+        row['payouts'] += payout
+        row['product_income'] += float(products or 0)
+        if quantity:
+            row['barbers'].append({
+                'user_id': user_id,
+                'quantity': int(quantity),
+                'total': float(total or 0),
+                'payout': payout,
+            })
+
+    expense_rows = db.session.query(
+        MonthlyExpense.month_start, func.sum(MonthlyExpense.amount)
+    ).filter(
+        MonthlyExpense.shop_id == shop_id,
+        MonthlyExpense.month_start.between(start, end),
+    ).group_by(MonthlyExpense.month_start)
+    for month_start, amount in expense_rows:
+        months[month_start.strftime('%Y-%m')]['expenses'] += float(amount or 0)
+
+    for row in months.values():
+        row['shop_share'] = row['cut_total'] - row['payouts']
+        row['revenue'] = row['cut_total'] + row['product_income']
+        row['net'] = row['shop_share'] + row['product_income'] - row['expenses']
+    return months
+
+def monthly_pnl(shop_id, first, last):
+    """Lista del P&L de la sede para cada mes entre ``first`` y ``last``.
+
+    Los meses ya terminados se guardan en la caché una semana, o hasta que
+    una escritura con fecha en ese mes los invalide; el mes en curso se
+    calcula siempre. Los que faltan se calculan juntos, con las mismas dos
+    consultas. En memoria cada mes lleva su propia versión (``month_scope``):
+    lo que se escribe hoy no invalida los meses cerrados en ningún worker.
+    """
+    store = cache.get_cache()
+    current = date.today().replace(day=1)
+    months = list(_months(first, last))
+    past = [month for month in months if month < current]
+    versions = {} if cache.is_shared() else data_versions([month_scope(shop_id, month) for month in past])
+
+    def key(month):
+        prefix = f'pnl:{shop_id}'
+        if versions:
+            prefix += f':v{versions[month_scope(shop_id, month)]}'
+        return cache.window_key(prefix, *(day.isoformat() for day in month_range(month)))
+
+    keys = {month: key(month) for month in past}
+    results = {month: store.get(keys[month]) if month in keys else None for month in months}
+    missing = [month for month, value in results.items() if value is None]
+    if missing:
+        with replicas.primary():
+            computed = compute_monthly_pnl(shop_id, missing[0], missing[-1])
+        for month in missing:
+            results[month] = computed[month.strftime('%Y-%m')]
+            if month in keys:
+                store.set(keys[month], results[month], PNL_PAST_TTL)
+    return [results[month] for month in months]
+
+def sum_pnl(months):
+    """Suma varios meses del P&L; los barberos se acumulan por ``user_id``."""
+    total = _empty_pnl(date.today())
+    total['month'] = None
+    barbers = {}
+    for row in months:
+        for field in ('cut_quantity', 'cut_total', 'payouts', 'shop_share', 'product_income',
+                      'revenue', 'expenses', 'net'):
+            total[field] += row[field]
+        for barber in row['barbers']:
+            acc = barbers.setdefault(barber['user_id'], {
+                'user_id': barber['user_id'], 'quantity': 0, 'total': 0.0, 'payout': 0.0,
+            })
+            acc['quantity'] += barber['quantity']
+            acc['total'] += barber['total']
+            acc['payout'] += barber['payout']
+    total['barbers'] = sorted(barbers.values(), key=lambda barber: -barber['total'])
+    return total
+
+def invalidate_pnl(shop_id, day):
+    cache.invalidate_windows(f'pnl:{shop_id}', day.isoformat())
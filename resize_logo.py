@@ -1,18 +1,52 @@
-from PIL import Image
+"""Variantes del logo para cada tamaño en que se muestra.
+
+Por cada alto de ``HEIGHTS`` (los ``height`` de las plantillas) genera la
+imagen a 1x y 2x en JPEG y WebP: ``static/images/logo-45.jpg``,
+``logo-90.webp``, etc. Las plantillas las usan con ``image_srcset`` dentro de
+un ``<picture>``; ``flask --app app build-assets`` las genera antes de poner
+huella a los archivos. Requiere Pillow.
+
+    python resize_logo.py
+"""
 import os
 
-# Redimensionar logo si es muy grande
-def resize_logo(input_path, output_path, max_size=(300, 300)):
-    try:
-        with Image.open(input_path) as img:
-            img.thumbnail(max_size, Image.Resampling.LANCZOS)
-            img.save(output_path, optimize=True, quality=85)
-        print(f"✅ Logo optimizado: {output_path}")
-    except Exception as e:
-        print(f"❌ Error: {e}")
-
-# Ejecutar si el archivo existe
-if os.path.exists('static/images/logo.jpg'):
-    resize_logo('static/images/logo.jpg', 'static/images/logo_optimized.jpg')
-else:
-    print("⚠️  Sube primero tu logo como 'static/images/logo.jpg'")
\ No newline at end of file
+SOURCE = os.path.join('static', 'images', 'logo.jpg')
+# Alturas en píxeles CSS: barra de navegación, login en móvil y en escritorio
+HEIGHTS = (45, 70, 120)
+DENSITIES = (1, 2)
+FORMATS = {'jpg': {'format': 'JPEG', 'quality': 85, 'optimize': True, 'progressive': True},
+           'webp': {'format': 'WEBP', 'quality': 80, 'method': 6}}
+
+
+def variant_path(source, height, ext):
+    return f'{os.path.splitext(source)[0]}-{height}.{ext}'
+
+
+def build_variants(source=SOURCE, heights=HEIGHTS):
+    """Escribe las variantes de ``source`` y devuelve sus rutas."""
+    from PIL import Image
+
+    written = []
+    with Image.open(source) as img:
+        img = img.convert('RGB')
+        for height in sorted({height * density for height in heights for density in DENSITIES}):
+            # Nunca se agranda: si el original es más chico se usa tal cual
+            target = min(height, img.height)
+            size = (max(1, round(img.width * target / img.height)), target)
+            resized = img.resize(size, Image.Resampling.LANCZOS)
+            for ext, options in FORMATS.items():
+                path = variant_path(source, height, ext)
+                resized.save(path, **options)
+                written.append(path)
+    return written
+
+
+if __name__ == '__main__':
+    if not os.path.exists(SOURCE):
+        print(f"⚠️  Sube primero tu logo como '{SOURCE}'")
+    else:
+        try:
+            for path in build_variants():
+                print(f"✅ {path}")
+        except Exception as e:
+            print(f"❌ Error: {e}")
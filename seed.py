@@ -0,0 +1,174 @@
+"""Datos sintéticos para pruebas de carga (``flask --app app seed-demo``).
+
+Genera sedes, barberos, cortes, ventas de productos y gastos mensuales con
+volúmenes configurables, insertados por lotes. Pensado para una base vacía creada con
+``flask init-db``; al terminar reconstruye el resumen diario y sube las
+versiones de datos para que ningún ETag o caché quede desactualizado.
+"""
+import random
+from datetime import date, timedelta
+
+from sqlalchemy import insert
+import cache
+import passwords
+from models import (db, Shop, User, HairCut, MonthlyExpense, ProductSale, user_scope,
+                    bump_data_version, bump_shop_versions)
+from reports import rebuild_daily_rollups, rollup_days
+
+BARBER_PASSWORD = 'barbero123'
+BATCH_SIZE = 5000
+
+PRICES = (8, 10, 10, 12, 12, 15, 20)
+PRODUCTS = (('Cera para cabello', 12), ('Gel fijador', 8), ('Aceite para barba', 15),
+            ('Shampoo', 10), ('Bálsamo', 9))
+EXPENSES = (('Alquiler', 800, 1200), ('Luz y agua', 80, 160), ('Insumos', 100, 300),
+            ('Publicidad', 0, 150))
+# Menos clientes a principio de semana, más el viernes y sábado; domingo cerrado
+WEEKDAY_FACTOR = (0.7, 0.8, 0.9, 1.0, 1.3, 1.5, 0.0)
+
+
+def _shop_jefes(jefe, count, password_hash):
+    """La sede del jefe principal más ``Sede 2..N``, cada una con su jefe
+    ``jefe2..N@barberia.com``. Devuelve el jefe de cada sede, en orden."""
+    jefes = [jefe]
+    for i in range(2, count + 1):
+        email = f'jefe{i}@barberia.com'
+        user = User.query.filter_by(email=email).first()
+        if user is None:
+            shop = Shop(name=f'Sede {i}')
+            db.session.add(shop)
+            db.session.flush()
+            user = User(email=email, name=f'Jefe Sede {i}', role='jefe', shop_id=shop.id,
+                        password_hash=password_hash)
+            db.session.add(user)
+        jefes.append(user)
+    db.session.commit()
+    return jefes
+
+
+def _barbers(count, shop_ids, password_hash):
+    """Crea (o reutiliza) ``barbero1..N@barberia.com``, repartidos entre ``shop_ids``."""
+    existing = {user.email: user for user in User.query.filter(User.email.like('barbero%@barberia.com'))}
+    barbers = []
+    for i in range(1, count + 1):
+        email = f'barbero{i}@barberia.com'
+        user = existing.get(email)
+        if user is None:
+            user = User(email=email, name=f'Barbero {i}', role='barbero', password_hash=password_hash,
+                        shop_id=shop_ids[(i - 1) % len(shop_ids)])
+            db.session.add(user)
+        barbers.append(user)
+    db.session.commit()
+    return barbers
+
+
+def _insert_batched(model, rows):
+    inserted = 0
+    batch = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= BATCH_SIZE:
+            db.session.execute(insert(model), batch)
+            inserted += len(batch)
+            batch = []
+    if batch:
+        db.session.execute(insert(model), batch)
+        inserted += len(batch)
+    db.session.commit()
+    return inserted
+
+
+def _days(start, end):
+    day = start
+    while day <= end:
+        yield day
+        day += timedelta(days=1)
+
+
+def _cut_rows(rng, barbers, start, end, cuts_per_day):
+    for day in _days(start, end):
+        factor = WEEKDAY_FACTOR[day.weekday()]
+        if not factor:
+            continue
+        for barber in barbers:
+            for _ in range(rng.randint(0, round(2 * cuts_per_day * factor))):
+                price = rng.choice(PRICES)
+                quantity = 1 if rng.random() < 0.85 else 2
+                total = price * quantity
+                yield {
+                    'date_cut': day,
+                    'price': price,
+                    'quantity': quantity,
+                    'total': total,
+                    'divided_total': total if barber.role == 'jefe' else total / 2,
+                    'user_id': barber.id,
+                    'shop_id': barber.shop_id,
+                }
+
+
+def _sale_rows(rng, jefes, start, end, sales_per_day):
+    for day in _days(start, end):
+        if not WEEKDAY_FACTOR[day.weekday()]:
+            continue
+        for jefe in jefes:
+            for _ in range(rng.randint(0, 2 * sales_per_day)):
+                name, price = rng.choice(PRODUCTS)
+                quantity = rng.randint(1, 2)
+                yield {
+                    'date_sale': day,
+                    'product_name': name,
+                    'price': price,
+                    'quantity': quantity,
+                    'total': price * quantity,
+                    'created_by': jefe.id,
+                    'shop_id': jefe.shop_id,
+                }
+
+
+def _expense_rows(rng, jefes, start, end):
+    month = date(start.year, start.month, 1)
+    while month <= end:
+        for jefe in jefes:
+            for description, low, high in EXPENSES:
+                yield {
+                    'month_year': month.strftime('%Y-%m'),
+                    'amount': round(rng.uniform(low, high), 2),
+                    'description': description,
+                    'created_by': jefe.id,
+                    'shop_id': jefe.shop_id,
+                }
+        month = date(month.year + month.month // 12, month.month % 12 + 1, 1)
+
+
+def seed_database(barbers=20, years=5, cuts_per_day=6, sales_per_day=3, end=None, random_seed=1, shops=1):
+    """Llena la base con datos sintéticos. Devuelve las filas insertadas por tabla.
+
+    ``cuts_per_day`` es el promedio por barbero en un día normal; el volumen de
+    cortes ronda ``barbers * years * 310 * cuts_per_day``. Con ``shops`` > 1
+    los barberos se reparten entre las sedes y cada sede tiene sus ventas y gastos.
+    """
+    rng = random.Random(random_seed)
+    end = end or date.today()
+    start = end - timedelta(days=round(365.25 * years))
+
+    jefe = User.query.filter_by(role='jefe').order_by(User.id).first()
+    if jefe is None:
+        raise RuntimeError('Se necesita un usuario jefe: ejecuta primero flask init-db')
+    password_hash = passwords.hash_password(BARBER_PASSWORD)
+    jefes = _shop_jefes(jefe, max(1, shops), password_hash)
+    staff = _barbers(barbers, [user.shop_id for user in jefes], password_hash)
+
+    counts = {
+        'users': len(staff) + len(jefes) - 1,
+        'hair_cuts': _insert_batched(HairCut, _cut_rows(rng, staff, start, end, cuts_per_day)),
+        'product_sales': _insert_batched(ProductSale, _sale_rows(rng, jefes, start, end, sales_per_day)),
+        'monthly_expenses': _insert_batched(MonthlyExpense, _expense_rows(rng, jefes, start, end)),
+    }
+    counts['daily_rollups'] = rebuild_daily_rollups()
+
+    bump_data_version(*(user_scope(user.id) for user in staff + jefes))
+    for shop_id in {user.shop_id for user in jefes}:
+        bump_shop_versions(shop_id, rollup_days(shop_id))
+    db.session.commit()
+    cache.get_cache().clear()
+    return counts
@@ -0,0 +1,139 @@
+"""Registro opcional de consultas lentas con su plan de ejecución.
+
+Se activa con ``SLOW_QUERY_MS``: cada sentencia que tarda más que ese umbral
+se registra en el log con su SQL, parámetros, endpoint y duración, y se
+guarda en un buffer circular de ``SLOW_QUERY_BUFFER`` entradas que el jefe ve
+en ``/admin/slow_queries``. Para los SELECT se agrega el ``EXPLAIN`` (``EXPLAIN
+QUERY PLAN`` en SQLite), que se ejecuta al terminar el request en una conexión
+aparte, así nunca interfiere con la transacción ni con el cursor de la vista.
+
+El buffer es de cada worker de gunicorn; el log es el registro completo.
+"""
+import logging
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+from flask import current_app, g, has_app_context, has_request_context, request
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+import query_plans
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_BUFFER = 100
+_MAX_PARAMS_LENGTH = 500
+
+
+def _format_params(parameters):
+    text = repr(parameters)
+    if len(text) > _MAX_PARAMS_LENGTH:
+        text = text[:_MAX_PARAMS_LENGTH] + '…'
+    return text
+
+
+class SlowQueryLog:
+    """Buffer circular de consultas lentas, seguro entre hilos."""
+
+    def __init__(self, threshold_ms, maxsize=DEFAULT_BUFFER, explain=True):
+        self.threshold_ms = threshold_ms
+        self.explain = explain
+        self._entries = deque(maxlen=maxsize)
+        self._lock = threading.Lock()
+
+    def record(self, engine, statement, parameters, executemany, duration_ms):
+        entry = {
+            'at': datetime.now(),
+            'endpoint': request.endpoint if has_request_context() else None,
+            'duration_ms': round(duration_ms, 1),
+            'sql': ' '.join(statement.split()),
+            'params': _format_params(parameters),
+            'plan': [],
+        }
+        logger.warning(f"🐢 Consulta lenta ({entry['duration_ms']} ms) en {entry['endpoint']}: "
+                       f"{entry['sql']} -- {entry['params']}")
+        with self._lock:
+            self._entries.append(entry)
+
+        if self.explain and not executemany and statement.lstrip().upper().startswith('SELECT'):
+            if has_request_context():
+                # Se explica al terminar el request, fuera de su transacción
+                g.setdefault('slow_query_pending', []).append((entry, engine, statement, parameters))
+            else:
+                entry['plan'] = self._explain(engine, statement, parameters)
+
+    def explain_pending(self):
+        for entry, engine, statement, parameters in g.pop('slow_query_pending', ()):
+            entry['plan'] = self._explain(engine, statement, parameters)
+
+    def _explain(self, engine, statement, parameters):
+        try:
+            with engine.connect() as conn:
+                conn.info['slow_query_explaining'] = True
+                try:
+                    return query_plans.explain(conn, statement, parameters)
+                finally:
+                    conn.info.pop('slow_query_explaining', None)
+        except Exception as e:
+            return [f'EXPLAIN falló: {e}']
+
+    def entries(self):
+        """Entradas de la más reciente a la más antigua."""
+        with self._lock:
+            return list(reversed(self._entries))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+def _start_statement(conn, cursor, statement, parameters, context, executemany):
+    conn.info.setdefault('slow_query_start', []).append(time.perf_counter())
+
+
+def _end_statement(conn, cursor, statement, parameters, context, executemany):
+    starts = conn.info.get('slow_query_start')
+    if not starts:
+        return
+    duration_ms = (time.perf_counter() - starts.pop()) * 1000
+    if not has_app_context() or conn.info.get('slow_query_explaining'):
+        return
+    log = current_app.extensions.get('slow_queries')
+    if log is not None and duration_ms >= log.threshold_ms:
+        log.record(conn.engine, statement, parameters, executemany, duration_ms)
+
+
+def _failed_statement(context):
+    starts = context.connection.info.get('slow_query_start') if context.connection else None
+    if starts:
+        starts.pop()
+
+
+def get_log():
+    """El registro de la app actual, o ``None`` si está desactivado."""
+    return current_app.extensions.get('slow_queries')
+
+
+def init_app(app):
+    threshold_ms = app.config.get('SLOW_QUERY_MS')
+    if threshold_ms is None:
+        return None
+
+    log = SlowQueryLog(float(threshold_ms),
+                       maxsize=app.config.get('SLOW_QUERY_BUFFER', DEFAULT_BUFFER),
+                       explain=app.config.get('SLOW_QUERY_EXPLAIN', True))
+    app.extensions['slow_queries'] = log
+
+    # Los listeners sólo existen si alguna app activa el registro
+    if not event.contains(Engine, 'after_cursor_execute', _end_statement):
+        event.listen(Engine, 'before_cursor_execute', _start_statement)
+        event.listen(Engine, 'after_cursor_execute', _end_statement)
+        event.listen(Engine, 'handle_error', _failed_statement)
+
+    @app.teardown_request
+    def explain_slow_queries(exc):
+        log.explain_pending()
+
+    return log
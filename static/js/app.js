@@ -9,6 +9,31 @@ if ('serviceWorker' in navigator) {
                 console.log('Error registrando ServiceWorker: ', error);
             });
     });
+
+    // Enviar los cortes guardados sin conexión en cuanto vuelva la red
+    // (para navegadores sin Background Sync)
+    window.addEventListener('online', function() {
+        if (navigator.serviceWorker.controller) {
+            navigator.serviceWorker.controller.postMessage({ type: 'sync-cuts' });
+        }
+    });
+
+    // Cerrar sesión: borrar las páginas guardadas de esta sesión
+    // (el service worker también lo hace al ver la navegación al logout)
+    document.addEventListener('click', function(e) {
+        if (!e.target.closest('[data-logout]')) {
+            return;
+        }
+        if (navigator.serviceWorker.controller) {
+            navigator.serviceWorker.controller.postMessage({ type: 'logout' });
+        }
+        if (window.caches) {
+            caches.keys().then(function(keys) {
+                keys.filter(function(key) { return key.startsWith('barberapp-pages-'); })
+                    .forEach(function(key) { caches.delete(key); });
+            });
+        }
+    });
 }
 
 // Funcionalidades generales de la app
@@ -106,4 +131,97 @@ window.addEventListener('beforeinstallprompt', (e) => {
 // Función para formatear números como soles
 function formatSoles(amount) {
     return 'S/.' + parseFloat(amount).toFixed(2);
-}
\ No newline at end of file
+}
+// Calendario mensual: el detalle de un día se pide sólo al tocarlo
+document.addEventListener('DOMContentLoaded', function() {
+    const calendar = document.getElementById('month-calendar');
+    if (!calendar) {
+        return;
+    }
+    const detail = document.getElementById('day-detail');
+    const rows = document.getElementById('day-detail-rows');
+    const empty = document.getElementById('day-detail-empty');
+    const more = document.getElementById('day-detail-more');
+    const showBarber = detail.querySelector('thead th').textContent === 'Barbero';
+    let nextUrl = null;
+
+    function dayUrl(day, cursor) {
+        const params = new URLSearchParams({ start: day, end: day, limit: 100 });
+        if (calendar.dataset.userId) {
+            params.set('user_id', calendar.dataset.userId);
+        }
+        if (cursor) {
+            params.set('cursor', cursor);
+        }
+        return calendar.dataset.cutsUrl + '?' + params.toString();
+    }
+
+    function addRow(cut) {
+        const cells = [
+            formatSoles(cut.price),
+            cut.quantity,
+            formatSoles(cut.total),
+            formatSoles(cut.divided_total),
+            cut.date_recorded ? cut.date_recorded.slice(0, 16).replace('T', ' ') : ''
+        ];
+        if (showBarber) {
+            cells.unshift(cut.barber);
+        }
+        const tr = document.createElement('tr');
+        cells.forEach(value => {
+            const td = document.createElement('td');
+            td.textContent = value;
+            tr.appendChild(td);
+        });
+        rows.appendChild(tr);
+    }
+
+    function load(url, day) {
+        return fetch(url, { credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(page => {
+                page.items.forEach(addRow);
+                empty.classList.toggle('d-none', rows.children.length > 0);
+                nextUrl = page.next_cursor ? dayUrl(day, page.next_cursor) : null;
+                more.classList.toggle('d-none', !nextUrl);
+            });
+    }
+
+    calendar.querySelectorAll('.calendar-day').forEach(button => {
+        button.addEventListener('click', () => {
+            const day = button.dataset.day;
+            rows.innerHTML = '';
+            document.getElementById('day-detail-title').textContent =
+                day.split('-').reverse().join('/');
+            detail.classList.remove('d-none');
+            more.onclick = () => load(nextUrl, day);
+            load(dayUrl(day), day).then(() => detail.scrollIntoView({ behavior: 'smooth' }));
+        });
+    });
+});
+
+// Trabajos en segundo plano: sondear el estado hasta que terminen
+document.addEventListener('DOMContentLoaded', function() {
+    document.querySelectorAll('.job-row').forEach(row => {
+        if (row.dataset.status === 'done' || row.dataset.status === 'failed') {
+            return;
+        }
+        const poll = () => fetch(row.dataset.statusUrl, { credentials: 'same-origin' })
+            .then(response => response.json())
+            .then(job => {
+                row.querySelector('.job-progress').style.width = (job.progress * 100) + '%';
+                row.querySelector('.job-message').textContent = job.error || job.message;
+                if (job.download_url) {
+                    const link = document.createElement('a');
+                    link.href = job.download_url;
+                    link.className = 'btn btn-sm btn-outline-success';
+                    link.textContent = '⬇️ Descargar';
+                    row.querySelector('.job-download').replaceChildren(link);
+                }
+                if (job.status !== 'done' && job.status !== 'failed') {
+                    setTimeout(poll, 2000);
+                }
+            });
+        setTimeout(poll, 1000);
+    });
+});
@@ -0,0 +1,240 @@
+// Service Worker de BarberApp (generado por /sw.js)
+const CACHE_VERSION = {{ version|tojson }};
+const SHELL_CACHE = 'barberapp-shell-' + CACHE_VERSION;
+const PAGES_CACHE = 'barberapp-pages-' + CACHE_VERSION;
+const SHELL_URLS = {{ shell_urls|tojson }};
+const CDN_URLS = {{ cdn_urls|tojson }};
+const BATCH_URL = {{ batch_url|tojson }};
+const MAX_BATCH_CUTS = {{ max_batch_cuts|tojson }};
+const ADD_CUT_PATH = {{ add_cut_path|tojson }};
+const LOGIN_PATH = {{ login_path|tojson }};
+const LOGOUT_PATH = {{ logout_path|tojson }};
+
+const DB_NAME = 'barberapp';
+const STORE = 'pending-cuts';
+const SYNC_TAG = 'sync-cuts';
+
+// ---------- Instalación y limpieza de versiones anteriores ----------
+self.addEventListener('install', event => {
+    event.waitUntil(
+        caches.open(SHELL_CACHE).then(cache => Promise.all([
+            cache.addAll(SHELL_URLS),
+            // Recursos de otro origen: se guardan como respuestas opacas
+            ...CDN_URLS.map(url =>
+                fetch(new Request(url, { mode: 'no-cors' }))
+                    .then(response => cache.put(url, response))
+                    .catch(() => null)
+            )
+        ])).then(() => self.skipWaiting())
+    );
+});
+
+self.addEventListener('activate', event => {
+    event.waitUntil(
+        caches.keys()
+            .then(keys => Promise.all(
+                keys.filter(key => key.startsWith('barberapp-') &&
+                                   key !== SHELL_CACHE && key !== PAGES_CACHE)
+                    .map(key => caches.delete(key))
+            ))
+            .then(() => self.clients.claim())
+            .then(() => flushPendingCuts())
+    );
+});
+
+// ---------- Peticiones ----------
+self.addEventListener('fetch', event => {
+    const request = event.request;
+    const url = new URL(request.url);
+
+    if (request.method === 'POST' && url.origin === self.location.origin &&
+        url.pathname === ADD_CUT_PATH) {
+        event.respondWith(submitCut(request));
+        return;
+    }
+    if (request.method !== 'GET') {
+        return;
+    }
+    if (SHELL_URLS.includes(url.pathname + url.search) || CDN_URLS.includes(request.url)) {
+        // App shell: primero la caché
+        event.respondWith(
+            caches.match(request).then(cached => cached || fetch(request))
+        );
+        return;
+    }
+    if (request.mode === 'navigate' && url.origin === self.location.origin &&
+        url.pathname === LOGOUT_PATH) {
+        // Al salir no deben quedar páginas de la sesión para el próximo usuario
+        event.respondWith(clearPages().then(() => fetch(request)));
+        return;
+    }
+    if (request.mode === 'navigate') {
+        // Páginas: primero la red, la última copia si no hay conexión
+        event.respondWith(
+            fetch(request)
+                .then(response => {
+                    if (response.ok && !response.redirected) {
+                        const copy = response.clone();
+                        caches.open(PAGES_CACHE).then(cache => cache.put(request, copy));
+                    } else if (response.redirected && new URL(response.url).pathname === LOGIN_PATH) {
+                        // Sesión vencida: lo guardado era de esa sesión
+                        clearPages();
+                    }
+                    return response;
+                })
+                .catch(() => caches.match(request).then(cached => cached || offlinePage(
+                    'Sin conexión',
+                    'Esta página no está disponible sin conexión.'
+                )))
+        );
+    }
+});
+
+function clearPages() {
+    return caches.delete(PAGES_CACHE).catch(() => null);
+}
+
+// ---------- Cortes sin conexión ----------
+function submitCut(request) {
+    const queued = request.clone();
+    return fetch(request).catch(() =>
+        queued.formData()
+            .then(form => queueCut({
+                date_cut: form.get('date_cut'),
+                price: form.get('price'),
+                quantity: form.get('quantity'),
+                idempotency_key: form.get('idempotency_key') || crypto.randomUUID(),
+                // Quién tenía la sesión: sólo se envía con la sesión de ese usuario
+                user_id: form.get('user_id') || null
+            }))
+            .then(() => registerSync())
+            .then(() => offlinePage(
+                'Corte guardado sin conexión',
+                'El corte se enviará automáticamente cuando vuelva la conexión.'
+            ))
+    );
+}
+
+function openQueue() {
+    return new Promise((resolve, reject) => {
+        const open = indexedDB.open(DB_NAME, 1);
+        open.onupgradeneeded = () => {
+            open.result.createObjectStore(STORE, { keyPath: 'idempotency_key' });
+        };
+        open.onsuccess = () => resolve(open.result);
+        open.onerror = () => reject(open.error);
+    });
+}
+
+function withStore(mode, callback) {
+    return openQueue().then(db => new Promise((resolve, reject) => {
+        const tx = db.transaction(STORE, mode);
+        const result = callback(tx.objectStore(STORE));
+        tx.oncomplete = () => resolve(result && result.result);
+        tx.onerror = () => reject(tx.error);
+    }));
+}
+
+function queueCut(cut) {
+    return withStore('readwrite', store => store.put(cut));
+}
+
+function registerSync() {
+    if (self.registration.sync) {
+        return self.registration.sync.register(SYNC_TAG).catch(() => null);
+    }
+    return Promise.resolve();
+}
+
+function removeCuts(cuts) {
+    return withStore('readwrite', store => {
+        cuts.forEach(cut => store.delete(cut.idempotency_key));
+    });
+}
+
+function flushPendingCuts() {
+    return withStore('readonly', store => store.getAll()).then(cuts => {
+        // Un lote por usuario (y de a MAX_BATCH_CUTS), uno tras otro
+        const batches = new Map();
+        (cuts || []).forEach(cut => {
+            const owner = cut.user_id || '';
+            if (!batches.has(owner)) {
+                batches.set(owner, []);
+            }
+            batches.get(owner).push(cut);
+        });
+        let chain = Promise.resolve();
+        batches.forEach(group => {
+            for (let i = 0; i < group.length; i += MAX_BATCH_CUTS) {
+                const batch = group.slice(i, i + MAX_BATCH_CUTS);
+                chain = chain.then(() => sendCuts(batch));
+            }
+        });
+        return chain;
+    });
+}
+
+function sendCuts(cuts) {
+    if (!cuts.length) {
+        return Promise.resolve();
+    }
+    const body = { cuts: cuts };
+    if (cuts[0].user_id) {
+        body.user_id = cuts[0].user_id;
+    }
+    return fetch(BATCH_URL, {
+        method: 'POST',
+        credentials: 'same-origin',
+        redirect: 'manual',
+        headers: { 'Content-Type': 'application/json' },
+        body: JSON.stringify(body)
+    }).then(response => {
+        // Cortes de otro usuario: esperan en la cola a que vuelva a entrar
+        if (response.status === 409) {
+            return;
+        }
+        // Un corte que el servidor nunca aceptará se descarta; el resto se reintenta
+        if (response.status === 400) {
+            return response.json().then(result => {
+                const rejected = cuts[result.index];
+                if (!rejected) {
+                    throw new Error('Sincronización rechazada: ' + result.error);
+                }
+                return removeCuts([rejected])
+                    .then(() => sendCuts(cuts.filter(cut => cut !== rejected)));
+            });
+        }
+        // Sin sesión el servidor redirige al login: se reintenta más tarde
+        if (!response.ok) {
+            throw new Error('Sincronización pendiente: ' + response.status);
+        }
+        // Las claves ya guardadas vuelven como duplicadas, así que
+        // reenviar el lote completo nunca duplica cortes.
+        return removeCuts(cuts);
+    });
+}
+
+self.addEventListener('sync', event => {
+    if (event.tag === SYNC_TAG) {
+        event.waitUntil(flushPendingCuts());
+    }
+});
+
+self.addEventListener('message', event => {
+    if (event.data && event.data.type === SYNC_TAG) {
+        event.waitUntil(flushPendingCuts().catch(() => null));
+    }
+    if (event.data && event.data.type === 'logout') {
+        event.waitUntil(clearPages());
+    }
+});
+
+function offlinePage(title, message) {
+    const html = '<!DOCTYPE html><html lang="es"><head><meta charset="UTF-8">' +
+        '<meta name="viewport" content="width=device-width, initial-scale=1.0">' +
+        '<title>BarberApp - ' + title + '</title></head>' +
+        '<body style="font-family: sans-serif; text-align: center; padding: 2rem;">' +
+        '<h2>' + title + '</h2><p>' + message + '</p>' +
+        '<p><a href="/">Volver</a></p></body></html>';
+    return new Response(html, { headers: { 'Content-Type': 'text/html; charset=utf-8' } });
+}
@@ -0,0 +1,52 @@
+"""Fixtures comunes: una app con TESTING sobre una base SQLite temporal.
+
+La base se crea una sola vez por sesión con ``init_db`` y datos sintéticos
+chicos (``seed_database``); cada prueba entra con su propio cliente.
+"""
+import pytest
+
+import cache
+import cli
+import seed
+from app import create_app
+
+JEFE = (cli.DEFAULT_JEFE_EMAIL, cli.DEFAULT_JEFE_PASSWORD)
+BARBER = ('barbero1@barberia.com', seed.BARBER_PASSWORD)
+
+
+@pytest.fixture(scope='session')
+def app(tmp_path_factory):
+    directory = tmp_path_factory.mktemp('barberapp')
+    app = create_app({
+        'TESTING': True,
+        'SQLALCHEMY_DATABASE_URI': f"sqlite:///{directory / 'test.db'}",
+        'JOBS_DIR': str(directory / 'jobs'),
+        # Hash barato y sin límite de intentos: las pruebas entran muchas veces
+        'PASSWORD_HASH_METHOD': 'pbkdf2:sha256:1000',
+        'LOGIN_IP_BURST': 10000,
+        'LOGIN_ACCOUNT_BURST': 10000,
+    })
+    with app.app_context():
+        cli.init_db()
+        seed.seed_database(barbers=4, years=0.25, cuts_per_day=3, sales_per_day=2)
+    return app
+
+
+@pytest.fixture
+def login(app):
+    """``login(email, password)`` -> cliente con la sesión iniciada."""
+    def login(email, password):
+        client = app.test_client()
+        response = client.post('/login', data={'email': email, 'password': password})
+        assert response.status_code == 302, response.data
+        return client
+    return login
+
+
+@pytest.fixture
+def cold_cache(app):
+    """Vacía la caché de resultados, como tras reiniciar los workers."""
+    def clear():
+        with app.app_context():
+            cache.get_cache().clear()
+    return clear
@@ -0,0 +1,105 @@
+"""Archivo de periodos cerrados: las vistas no lo notan y se puede deshacer."""
+import functools
+from datetime import date
+
+import pytest
+
+import archive
+from models import db, HairCut, HairCutArchive, ProductSale, ProductSaleArchive, User
+from query_counter import count_queries
+from tests.conftest import BARBER, JEFE
+
+OLD_DAY = archive.months_ago(3).replace(day=10)
+
+PAGES = [
+    ('/api/cuts', BARBER),
+    (f'/api/cuts?start={OLD_DAY.replace(day=1)}&end={date.today()}', BARBER),
+    ('/export/cuts.csv', BARBER),
+    ('/export/cuts.csv', JEFE),
+    ('/export/product_sales.csv', JEFE),
+    ('/admin/pnl', JEFE),
+    ('/calendar', BARBER),
+]
+
+
+@pytest.fixture
+def boundary(app, monkeypatch):
+    """Sin espera tras subir la fecha del archivo; todo vuelve a las tablas activas al final."""
+    monkeypatch.setitem(app.config, 'ARCHIVE_BOUNDARY_TTL', 0)
+    app.extensions.pop('archive_boundaries', None)
+    yield
+    with app.app_context():
+        archive.restore()
+    app.extensions.pop('archive_boundaries', None)
+
+
+def _rows(app):
+    with app.app_context():
+        return {model.__tablename__: model.query.count()
+                for model in (HairCut, HairCutArchive, ProductSale, ProductSaleArchive)}
+
+
+def _pages(login, cold_cache):
+    cold_cache()
+    clients = {user: login(*user) for user in (BARBER, JEFE)}
+    pages = {}
+    for path, user in PAGES:
+        clients[user].get(path)  # mensajes flash del login
+        response = clients[user].get(path)
+        assert response.status_code == 200, path
+        pages[path, user] = response.get_data(as_text=True)
+    return pages
+
+
+def test_archive_and_restore_leave_pages_unchanged(app, login, cold_cache, boundary):
+    before = _pages(login, cold_cache)
+    rows = _rows(app)
+
+    with app.app_context():
+        moved = archive.archive(archive.months_ago(1), chunk_size=100)
+    assert moved['hair_cuts'] > 100 and moved['product_sales'] > 0
+    archived = _rows(app)
+    assert archived['hair_cuts_archive'] == rows['hair_cuts_archive'] + moved['hair_cuts']
+    assert archived['hair_cuts'] == rows['hair_cuts'] - moved['hair_cuts']
+    assert _pages(login, cold_cache) == before
+
+    with app.app_context():
+        archive.restore(chunk_size=100)
+        assert archive.archived_before('hair_cuts') is None
+    assert _rows(app) == rows
+    assert _pages(login, cold_cache) == before
+
+
+def test_deleting_user_removes_archived_cuts_in_chunks(app, login, boundary, monkeypatch):
+    with app.app_context():
+        jefe = User.query.filter_by(email=JEFE[0]).one()
+        barber = User(email='archivado@barberia.com', name='Archivado', role='barbero', shop_id=jefe.shop_id)
+        barber.set_password('archivado123')
+        db.session.add(barber)
+        db.session.commit()
+        barber_id = barber.id
+
+    client = login('archivado@barberia.com', 'archivado123')
+    response = client.post('/api/cuts/batch', json={'cuts': [
+        {'date_cut': OLD_DAY.isoformat(), 'price': 10 + i} for i in range(7)
+    ] + [{'date_cut': date.today().isoformat(), 'price': 30}]})
+    assert response.status_code == 201
+
+    with app.app_context():
+        archive.archive(archive.months_ago(1))
+        assert HairCutArchive.query.filter_by(user_id=barber_id).count() == 7
+        assert HairCut.query.filter_by(user_id=barber_id).count() == 1
+
+    monkeypatch.setattr(archive, 'delete_user_cuts', functools.partial(archive.delete_user_cuts, chunk_size=3))
+    jefe_client = login(*JEFE)
+    with count_queries() as statements:
+        response = jefe_client.get(f'/admin/delete_user/{barber_id}')
+    assert response.status_code == 302
+    # 7 cortes de a 3: tres lotes
+    assert sum(statement.lower().startswith('delete from hair_cuts_archive')
+               for statement in statements) == 3
+
+    with app.app_context():
+        assert db.session.get(User, barber_id) is None
+        assert HairCutArchive.query.filter_by(user_id=barber_id).count() == 0
+        assert HairCut.query.filter_by(user_id=barber_id).count() == 0
@@ -0,0 +1,101 @@
+"""Caché de resultados del panel del jefe con varios workers."""
+from datetime import date, timedelta
+
+import pytest
+
+import cache
+from app import create_app
+from models import User
+from query_counter import count_queries
+from reports import monthly_pnl
+from tests.conftest import BARBER, JEFE
+
+
+class SharedCache(cache.LRUCache):
+    """LRU que se comporta como Redis: lo que se borra deja de verse en todos."""
+    shared = True
+
+
+def _post_cut(client, day, price=10):
+    response = client.post('/api/cuts/batch', json={'cuts': [{'date_cut': day.isoformat(), 'price': price}]})
+    assert response.status_code == 201
+
+
+def _shop_keys(app):
+    with app.app_context():
+        shop_id = User.query.filter_by(email=JEFE[0]).one().shop_id
+        return sorted(cache.get_cache().keys(f'cuts:{shop_id}:'))
+
+
+def test_write_in_another_worker_is_seen(app, login):
+    # Otro worker: misma base, su propio LRU en memoria
+    other = create_app(dict(app.config))
+    other_jefe = other.test_client()
+    other_jefe.post('/login', data={'email': JEFE[0], 'password': JEFE[1]})
+    other_jefe.get('/')
+    with other.app_context():
+        assert not cache.is_shared()
+    before = other_jefe.get('/admin/dashboard').get_data(as_text=True)
+
+    _post_cut(login(*BARBER), date.today(), price=777)
+
+    after = other_jefe.get('/admin/dashboard').get_data(as_text=True)
+    assert after != before
+    assert 'S/.777.00' in after
+
+
+@pytest.fixture
+def shared_cache(app):
+    previous = app.extensions['result_cache']
+    app.extensions['result_cache'] = SharedCache()
+    yield
+    app.extensions['result_cache'] = previous
+
+
+def test_shared_backend_invalidates_only_affected_windows(app, login, shared_cache):
+    jefe = login(*JEFE)
+    jefe.get('/')
+    jefe.get('/admin/dashboard')
+    cached = _shop_keys(app)
+    assert cached and all(':v' not in key for key in cached)
+
+    # Un corte de hace un año no toca los periodos del día, la semana ni el mes
+    _post_cut(login(*BARBER), date.today() - timedelta(days=365))
+    assert _shop_keys(app) == cached
+
+    _post_cut(login(*BARBER), date.today())
+    assert not [key for key in _shop_keys(app) if key in cached]
+
+
+def _pnl(app, shop_id, first, last):
+    with app.test_request_context(), count_queries() as statements:
+        months = monthly_pnl(shop_id, first, last)
+    return months, len(statements)
+
+
+def test_closed_months_survive_writes_to_other_months(app, login):
+    with app.app_context():
+        shop_id = User.query.filter_by(email=JEFE[0]).one().shop_id
+        cache.get_cache().clear()
+    this_month = date.today().replace(day=1)
+    last = this_month - timedelta(days=1)
+    first = last.replace(day=1) - timedelta(days=1)
+    first = first.replace(day=1)
+
+    _, cold = _pnl(app, shop_id, first, last)
+    assert _pnl(app, shop_id, first, last)[1] < cold
+
+    # Un corte de hoy no toca los meses cerrados
+    _post_cut(login(*BARBER), date.today())
+    cached, statements = _pnl(app, shop_id, first, last)
+    assert statements < cold
+
+    # Un corte con fecha en un mes cerrado, registrado en otro worker
+    other = create_app(dict(app.config))
+    barber = other.test_client()
+    barber.post('/login', data={'email': BARBER[0], 'password': BARBER[1]})
+    _post_cut(barber, first + timedelta(days=3), price=500)
+    months, statements = _pnl(app, shop_id, first, last)
+    assert statements == cold
+    assert months[0]['cut_total'] == cached[0]['cut_total'] + 500
+    assert months[1] == cached[1]
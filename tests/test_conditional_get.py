@@ -0,0 +1,87 @@
+"""Respuestas 304 de las páginas con ETag.
+
+Con ``If-None-Match`` igual al ETag vigente la vista no se ejecuta: sólo
+se consulta la tabla de versiones. Una escritura cambia el ETag.
+"""
+from datetime import date
+
+import pytest
+
+from models import db, Shop
+from tests.conftest import BARBER, JEFE
+
+PAGES = [
+    ('/dashboard', BARBER),
+    ('/weekly_summary', BARBER),
+    ('/weekly_summary', JEFE),
+    ('/calendar', BARBER),
+    ('/calendar', JEFE),
+    ('/admin/dashboard', JEFE),
+]
+
+
+def _etag(client, path):
+    # La primera visita muestra los mensajes flash del login (sin ETag)
+    client.get(path)
+    response = client.get(path)
+    assert response.status_code == 200
+    assert response.headers['ETag']
+    return response.headers['ETag']
+
+
+@pytest.mark.parametrize('path, user', PAGES)
+def test_not_modified_costs_one_query(login, path, user):
+    client = login(*user)
+    etag = _etag(client, path)
+
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 304
+    assert response.headers['ETag'] == etag
+    assert response.headers['X-SQL-Queries'] == '1'
+    assert response.data == b''
+
+
+@pytest.mark.parametrize('path, user', PAGES)
+def test_write_changes_etag(login, path, user):
+    client = login(*user)
+    etag = _etag(client, path)
+
+    barber = login(*BARBER)
+    response = barber.post('/api/cuts/batch', json={'cuts': [
+        {'date_cut': date.today().isoformat(), 'price': 15},
+    ]})
+    assert response.status_code == 201
+
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('path', ['/dashboard', '/weekly_summary', '/admin/dashboard'])
+def test_switching_shop_changes_etag(app, login, path):
+    with app.app_context():
+        shop = Shop(name=f'Sede {path}')
+        db.session.add(shop)
+        db.session.commit()
+        shop_id = shop.id
+    client = login(*JEFE)
+    etag = _etag(client, path)
+
+    assert client.post(f'/owner/shops/{shop_id}/select').status_code == 302
+    client.get(path)  # mensaje flash del cambio de sede
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
+
+
+@pytest.mark.parametrize('path, user', [('/weekly_summary', BARBER), ('/admin/pnl', JEFE)])
+def test_rebuild_rollups_command_changes_etag(app, login, path, user):
+    client = login(*user)
+    etag = _etag(client, path)
+
+    result = app.test_cli_runner().invoke(args=['rebuild-rollups'])
+    assert result.exit_code == 0, result.output
+
+    response = client.get(path, headers={'If-None-Match': etag})
+    assert response.status_code == 200
+    assert response.headers['ETag'] != etag
@@ -0,0 +1,81 @@
+"""``POST /api/cuts/batch``: validación y claves de idempotencia."""
+import uuid
+from datetime import date
+
+import pytest
+
+from models import HairCut
+from tests.conftest import BARBER
+
+
+def _cut(**fields):
+    cut = {'date_cut': date.today().isoformat(), 'price': 10}
+    cut.update(fields)
+    return cut
+
+
+def _count(app, key):
+    with app.app_context():
+        return HairCut.query.filter_by(idempotency_key=key).count()
+
+
+def test_replayed_key_is_not_inserted_twice(app, login):
+    client = login(*BARBER)
+    key = uuid.uuid4().hex
+
+    response = client.post('/api/cuts/batch', json={'cuts': [_cut(idempotency_key=key)]})
+    assert response.status_code == 201
+    assert response.get_json() == {'created': 1, 'duplicates': []}
+
+    response = client.post('/api/cuts/batch', json={'cuts': [_cut(idempotency_key=key)]})
+    assert response.status_code == 200
+    assert response.get_json() == {'created': 0, 'duplicates': [key]}
+    assert _count(app, key) == 1
+
+
+def test_repeated_key_in_one_batch(app, login):
+    client = login(*BARBER)
+    key = uuid.uuid4().hex
+
+    response = client.post('/api/cuts/batch', json={'cuts': [
+        _cut(idempotency_key=key), _cut(idempotency_key=key, price=20), _cut(),
+    ]})
+    assert response.status_code == 201
+    assert response.get_json() == {'created': 2, 'duplicates': [key]}
+    assert _count(app, key) == 1
+
+
+@pytest.mark.parametrize('body', [
+    [_cut()],
+    'cortes',
+    {'cuts': []},
+    {'cuts': _cut()},
+])
+def test_malformed_body(login, body):
+    response = login(*BARBER).post('/api/cuts/batch', json=body)
+    assert response.status_code == 400
+    assert 'error' in response.get_json()
+
+
+def test_body_that_is_not_json(login):
+    response = login(*BARBER).post('/api/cuts/batch', data='{cuts', content_type='application/json')
+    assert response.status_code == 400
+
+
+@pytest.mark.parametrize('cut', [
+    _cut(price=True),
+    _cut(price=None),
+    _cut(price='nan'),
+    _cut(price=-1),
+    _cut(quantity=False),
+    _cut(quantity=1.5),
+    _cut(idempotency_key={'a': 1}),
+    _cut(idempotency_key=12345),
+    _cut(idempotency_key='x' * 65),
+    {'price': 10},
+])
+def test_invalid_cut_names_its_index(login, cut):
+    response = login(*BARBER).post('/api/cuts/batch', json={'cuts': [_cut(), cut]})
+    assert response.status_code == 400
+    assert response.get_json()['index'] == 1
+    assert response.get_json()['error'].startswith('Corte 1:')
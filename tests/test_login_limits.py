@@ -0,0 +1,47 @@
+"""Baldes de intentos de login: por IP antes del hash, por cuenta sólo al fallar."""
+import pytest
+
+import ratelimit
+from tests.conftest import BARBER
+
+
+@pytest.fixture
+def limits(app, monkeypatch):
+    """Baldes nuevos y chicos: 3 intentos por IP y 2 fallidos por cuenta."""
+    monkeypatch.setitem(app.extensions, 'login_buckets', ratelimit.MemoryBuckets())
+    monkeypatch.setitem(app.config, 'LOGIN_IP_BURST', 3)
+    monkeypatch.setitem(app.config, 'LOGIN_IP_PER_MINUTE', 1)
+    monkeypatch.setitem(app.config, 'LOGIN_ACCOUNT_BURST', 2)
+    monkeypatch.setitem(app.config, 'LOGIN_ACCOUNT_PER_MINUTE', 1)
+
+
+def post_login(app, ip, password):
+    client = app.test_client()
+    return client.post('/login', data={'email': BARBER[0], 'password': password},
+                       environ_base={'REMOTE_ADDR': ip})
+
+
+def test_ip_bucket_limits_every_attempt(app, limits):
+    for _ in range(3):
+        assert post_login(app, '10.0.0.1', BARBER[1]).status_code == 302
+    response = post_login(app, '10.0.0.1', BARBER[1])
+    assert response.status_code == 429
+    assert int(response.headers['Retry-After']) > 0
+    assert post_login(app, '10.0.0.2', BARBER[1]).status_code == 302
+
+
+def test_drained_account_rejects_wrong_passwords(app, limits):
+    # Cada intento desde otra IP: sólo cuenta el balde de la cuenta
+    assert post_login(app, '10.0.1.1', 'incorrecta').status_code == 200
+    assert post_login(app, '10.0.1.2', 'incorrecta').status_code == 200
+    response = post_login(app, '10.0.1.3', 'incorrecta')
+    assert response.status_code == 429
+    assert 'Demasiados intentos' in response.get_data(as_text=True)
+
+
+def test_drained_account_lets_correct_password_in(app, limits):
+    for i in range(5):
+        post_login(app, f'10.0.2.{i}', 'incorrecta')
+    # El dueño entra desde una IP nueva aunque la cuenta esté frenada
+    response = post_login(app, '10.0.3.1', BARBER[1])
+    assert response.status_code == 302
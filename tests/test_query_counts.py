@@ -0,0 +1,90 @@
+"""Cantidad de sentencias SQL de las vistas con más tráfico.
+
+``query_budget`` ya falla con TESTING si una vista se pasa de su límite;
+aquí además se comprueba que la cantidad no crece con el número de barberos
+(un N+1 reintroducido la haría crecer con cada barbero nuevo).
+"""
+import re
+from datetime import date
+
+import pytest
+
+from models import db, User
+from query_counter import count_queries
+from tests.conftest import BARBER, JEFE
+
+# (ruta, usuario, límite de query_budget)
+VIEWS = [
+    ('/weekly_summary', JEFE, 5),
+    ('/weekly_summary', BARBER, 5),
+    ('/calendar', JEFE, 4),
+    ('/calendar', BARBER, 4),
+    ('/admin/dashboard', JEFE, 7),
+    ('/admin/pnl', JEFE, 5),
+]
+
+
+def _statements(client, path):
+    with count_queries() as statements:
+        response = client.get(path)
+    assert response.status_code == 200
+    return len(statements)
+
+
+def _add_barbers(app, login, count):
+    """Barberos nuevos en la sede del jefe, cada uno con cortes de hoy."""
+    with app.app_context():
+        jefe = User.query.filter_by(email=JEFE[0]).one()
+        emails = [f'extra{User.query.count() + i}@barberia.com' for i in range(count)]
+        for email in emails:
+            user = User(email=email, name=email, role='barbero', shop_id=jefe.shop_id)
+            user.set_password(BARBER[1])
+            db.session.add(user)
+        db.session.commit()
+    for email in emails:
+        client = login(email, BARBER[1])
+        response = client.post('/api/cuts/batch', json={'cuts': [
+            {'date_cut': date.today().isoformat(), 'price': 10, 'quantity': 2},
+            {'date_cut': date.today().isoformat(), 'price': 12},
+        ]})
+        assert response.status_code == 201
+
+
+@pytest.mark.parametrize('path, user, budget', VIEWS)
+def test_within_budget_with_cold_cache(login, cold_cache, path, user, budget):
+    client = login(*user)
+    client.get('/')
+    cold_cache()
+    assert _statements(client, path) <= budget
+
+
+@pytest.mark.parametrize('path, user, budget', VIEWS)
+def test_constant_in_number_of_barbers(app, login, cold_cache, path, user, budget):
+    client = login(*user)
+    client.get(path)
+    cold_cache()
+    before = _statements(client, path)
+
+    _add_barbers(app, login, 3)
+    cold_cache()
+    assert _statements(client, path) == before
+
+
+def test_cached_aggregates_skip_queries(login, cold_cache):
+    client = login(*JEFE)
+    client.get('/')
+    cold_cache()
+    cold = _statements(client, '/admin/dashboard')
+    assert _statements(client, '/admin/dashboard') < cold
+
+
+def test_product_sales_pages_do_not_count_history(login):
+    client = login(*JEFE)
+    client.get('/')
+    first = client.get('/admin/product_sales')
+    cursor = re.search(r'cursor=([^"&]+)', first.get_data(as_text=True))
+    assert cursor, 'la semilla debe tener más de una página de ventas'
+    for path in ('/admin/product_sales', f'/admin/product_sales?cursor={cursor.group(1)}'):
+        with count_queries() as statements:
+            assert client.get(path).status_code == 200
+        assert not [sql for sql in statements if 'count(' in sql.lower() and 'product_sales' in sql]
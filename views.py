@@ -0,0 +1,1168 @@
+"""Vistas de BarberApp."""
+from calendar import Calendar
+from datetime import datetime, date, timedelta
+from functools import wraps
+import hashlib
+import logging
+import math
+import uuid
+
+from flask import (Blueprint, current_app, render_template, request, redirect, url_for,
+                   flash, session, jsonify, make_response, send_file)
+from sqlalchemy import func, insert
+from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import joinedload
+
+import analytics
+import archive
+import assets
+import cache
+import exports
+import jobs
+import pagination
+import passwords
+import ratelimit
+import slow_queries
+from auth import (current_user, current_shop_id, invalidate_current_user, select_shop,
+                  login_required, jefe_required, owner_required)
+from models import (db, Shop, User, HairCut, MonthlyExpense, ProductSale, DailyRollup,
+                    shop_scope, month_scope, user_scope, bump_daily_rollup, bump_data_version, data_versions,
+                    bump_cut_versions, bump_shop_versions, month_start_of)
+from pagination import paginate_keyset
+from query_counter import query_budget
+from replicas import replica_reads
+from reports import (cut_days, cut_period_totals, invalidate_cut_aggregates, month_range, invalidate_pnl, monthly_pnl,
+                     rebuild_daily_rollups, rollup_days, shop_cache_prefix, shop_cut_period_totals, shop_cut_totals_by_user,
+                     shop_product_sales_totals, shop_users, shops_rollup, sum_pnl)
+
+logger = logging.getLogger(__name__)
+
+bp = Blueprint('main', __name__)
+
+# Versiones de datos (ETag)
+def data_etag(scopes):
+    """ETag fuerte a partir de las versiones de ``scopes`` (una sola consulta por petición)."""
+    versions = data_versions(scopes)
+    parts = [
+        current_app.config['RELEASE_VERSION'],
+        request.full_path,
+        str(session.get('user_id')),
+        str(session.get('user_role')),
+        # El dueño ve otra sede al cambiar de sede, con las mismas versiones
+        str(session.get('shop_id')),
+        date.today().isoformat(),
+    ] + [f"{scope}={versions.get(scope, 0)}" for scope in sorted(scopes)]
+    return hashlib.sha1('|'.join(parts).encode()).hexdigest()
+
+def viewer_scopes():
+    """El jefe ve datos de toda la sede; un barbero sólo los suyos."""
+    if session.get('user_role') == 'jefe':
+        return [shop_scope(current_shop_id())]
+    return [user_scope(session['user_id'])]
+
+def own_scopes():
+    return [user_scope(session['user_id'])]
+
+def shop_scopes():
+    return [shop_scope(current_shop_id())]
+
+# Registro de cortes
+MAX_BATCH_CUTS = 500
+
+def split_cut_total(user, total):
+    """Parte del barbero: el jefe recibe 100%, el barbero 50%."""
+    if user.role == 'jefe':
+        return total
+    return total / 2
+
+def parse_cut(data):
+    """Valida un corte recibido (formulario o JSON). Lanza ``ValueError``."""
+    try:
+        date_cut = datetime.strptime(str(data['date_cut']), '%Y-%m-%d').date()
+        # En JSON true/false pasarían por 1 y 0
+        if isinstance(data['price'], bool) or isinstance(data.get('quantity'), bool):
+            raise TypeError
+        price = float(data['price'])
+        quantity = float(data.get('quantity', 1))
+    except KeyError as e:
+        raise ValueError(f"falta el campo {e.args[0]}")
+    except (TypeError, ValueError):
+        # null, listas, objetos o texto que no es número
+        raise ValueError("fecha, precio o cantidad inválidos")
+    # NaN e infinito pasan la comparación con 0; 1.5 cortes no existen
+    if not math.isfinite(price) or price < 0:
+        raise ValueError("precio inválido")
+    if not math.isfinite(quantity) or not quantity.is_integer() or quantity < 1:
+        raise ValueError("cantidad inválida")
+    quantity = int(quantity)
+    key = data.get('idempotency_key') or None
+    if key is not None and not isinstance(key, str):
+        raise ValueError("idempotency_key debe ser texto")
+    if key is not None and len(key) > 64:
+        raise ValueError("idempotency_key demasiado larga")
+    return date_cut, price, quantity, key
+
+def existing_idempotency_keys(user_id, keys):
+    keys = [key for key in keys if key]
+    if not keys:
+        return set()
+    rows = db.session.query(HairCut.idempotency_key).filter(
+        HairCut.user_id == user_id,
+        HairCut.idempotency_key.in_(keys),
+    )
+    return {key for key, in rows}
+
+def insert_cuts(user, parsed_cuts, shop_id):
+    """Inserta cortes ya validados de la sede en una sola transacción con un INSERT masivo.
+
+    Los que repiten una ``idempotency_key`` ya guardada (o repetida dentro del
+    mismo lote) se omiten. Devuelve ``(creados, claves_duplicadas)``.
+    """
+    seen = existing_idempotency_keys(user.id, [key for *_, key in parsed_cuts])
+    duplicates = []
+    rows = []
+    rollups = {}
+    for date_cut, price, quantity, key in parsed_cuts:
+        if key is not None:
+            if key in seen:
+                duplicates.append(key)
+                continue
+            seen.add(key)
+        total = price * quantity
+        divided_total = split_cut_total(user, total)
+        rows.append({
+            'date_cut': date_cut,
+            'price': price,
+            'quantity': quantity,
+            'total': total,
+            'divided_total': divided_total,
+            'user_id': user.id,
+            'shop_id': shop_id,
+            'idempotency_key': key,
+        })
+        day = rollups.setdefault(date_cut, dict.fromkeys(
+            ('cut_entries', 'cut_quantity', 'cut_total', 'cut_divided_total'), 0
+        ))
+        day['cut_entries'] += 1
+        day['cut_quantity'] += quantity
+        day['cut_total'] += total
+        day['cut_divided_total'] += divided_total
+
+    if rows:
+        db.session.execute(insert(HairCut), rows)
+        for day, deltas in rollups.items():
+            bump_daily_rollup(day, shop_id, user.id, **deltas)
+        bump_cut_versions(user.id, shop_id, rollups)
+    db.session.commit()
+    invalidate_cut_aggregates(rollups, shop_id)
+    return len(rows), duplicates
+
+# Filtros de listados
+def _date_arg(name):
+    try:
+        return datetime.strptime(request.args.get(name, ''), '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+def _month_arg(name):
+    try:
+        return datetime.strptime(request.args.get(name, ''), '%Y-%m').strftime('%Y-%m')
+    except ValueError:
+        return None
+
+def cut_filters(user, shop_id, start=None, end=None, barber_id=None, cuts=HairCut):
+    """Criterios para listar cortes de la sede; un barbero sólo ve los suyos.
+
+    ``cuts`` es el modelo que da ``archive.hair_cuts`` para el periodo."""
+    criteria = [cuts.shop_id == shop_id]
+    if user.role != 'jefe':
+        criteria.append(cuts.user_id == user.id)
+    elif barber_id:
+        criteria.append(cuts.user_id == barber_id)
+    if start:
+        criteria.append(cuts.date_cut >= start)
+    if end:
+        criteria.append(cuts.date_cut <= end)
+    return criteria
+
+def product_sale_filters(shop_id, start=None, end=None, product=None, sales=ProductSale):
+    criteria = [sales.shop_id == shop_id]
+    if start:
+        criteria.append(sales.date_sale >= start)
+    if end:
+        criteria.append(sales.date_sale <= end)
+    if product:
+        criteria.append(sales.product_name.ilike(f"%{product}%"))
+    return criteria
+
+def expense_filters(shop_id, start_month=None, end_month=None):
+    criteria = [MonthlyExpense.shop_id == shop_id]
+    if start_month:
+        criteria.append(MonthlyExpense.month_year >= start_month)
+    if end_month:
+        criteria.append(MonthlyExpense.month_year <= end_month)
+    return criteria
+
+def cuts_page(criteria, cuts=HairCut):
+    query = db.session.query(cuts).options(joinedload(cuts.barber)).filter(*criteria)
+    return paginate_keyset(query, cuts.date_cut, cuts.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=pagination.per_page_arg(request.args.get('limit')))
+
+def product_sales_page(criteria, sales=ProductSale):
+    query = db.session.query(sales).filter(*criteria)
+    return paginate_keyset(query, sales.date_sale, sales.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=pagination.per_page_arg(request.args.get('limit')))
+
+def expenses_page(criteria):
+    query = MonthlyExpense.query.filter(*criteria)
+    return paginate_keyset(query, MonthlyExpense.month_year, MonthlyExpense.id,
+                           cursor=request.args.get('cursor'),
+                           per_page=pagination.per_page_arg(request.args.get('limit')))
+
+def page_urls(page):
+    """URLs de la primera y la siguiente página conservando los filtros."""
+    args = request.args.to_dict()
+    args.pop('cursor', None)
+    first_url = url_for(request.endpoint, **args) if 'cursor' in request.args else None
+    next_url = url_for(request.endpoint, **args, cursor=page.next_cursor) if page.has_next else None
+    return first_url, next_url
+
+def page_json(page):
+    return jsonify(items=[item.to_dict() for item in page.items],
+                   next_cursor=page.next_cursor)
+
+def conditional_get(scopes_for):
+    """Responde 304 a ``If-None-Match`` sin ejecutar la vista si los datos no
+    cambiaron. Va antes de ``login_required`` para que el 304 sólo cueste la
+    consulta de versiones."""
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            # Con mensajes flash pendientes la página cambia aunque los datos no
+            if 'user_id' not in session or '_flashes' in session:
+                return f(*args, **kwargs)
+            etag = data_etag(scopes_for())
+            if request.if_none_match.contains(etag):
+                response = make_response('', 304)
+                response.set_etag(etag)
+                return response
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+                response.headers['Cache-Control'] = 'private, no-cache'
+            return response
+        return decorated_function
+    return decorator
+
+# Rutas
+@bp.route('/')
+def index():
+    if 'user_id' in session:
+        if session.get('user_role') == 'jefe':
+            return redirect(url_for('.admin_dashboard'))
+        else:
+            return redirect(url_for('.dashboard'))
+    return redirect(url_for('.login'))
+
+def login_limited(wait):
+    flash(f'Demasiados intentos. Espera {math.ceil(wait)} segundos e intenta nuevamente.', 'error')
+    response = make_response(render_template('login.html'), 429)
+    response.headers['Retry-After'] = str(math.ceil(wait))
+    return response
+
+@bp.route('/login', methods=['GET', 'POST'])
+def login():
+    try:
+        if request.method == 'POST':
+            email = request.form['email']
+            password = request.form['password']
+            
+            logger.info(f"Intento de login para: {email}")
+            
+            # Antes de tocar la base o el hash: un intento rechazado casi no cuesta CPU
+            wait = ratelimit.login_wait(request.remote_addr)
+            if wait:
+                logger.warning(f"⚠️  Login limitado para {email} desde {request.remote_addr}")
+                return login_limited(wait)
+            
+            user = User.query.filter_by(email=email).first()
+            
+            if user and user.check_password(password):
+                # Parámetros del hash cambiados: se actualiza con la contraseña ya verificada
+                if passwords.needs_rehash(user.password_hash):
+                    try:
+                        user.set_password(password)
+                        db.session.commit()
+                        logger.info(f"🔑 Hash de contraseña actualizado: {user.email}")
+                    except Exception as e:
+                        # El hash anterior sigue sirviendo: no se bloquea el login
+                        db.session.rollback()
+                        logger.error(f"❌ No se pudo actualizar el hash de {user.email}: {e}")
+                
+                session['user_id'] = user.id
+                session['user_name'] = user.name
+                session['user_role'] = user.role
+                session['is_owner'] = user.is_owner
+                select_shop(db.session.get(Shop, user.shop_id))
+                
+                logger.info(f"Login exitoso: {user.name} ({user.role})")
+                
+                if user.role == 'jefe':
+                    return redirect(url_for('.admin_dashboard'))
+                else:
+                    return redirect(url_for('.dashboard'))
+            else:
+                # Cuenta frenada por contraseñas incorrectas: la correcta igual entra
+                wait = ratelimit.login_failed(email)
+                if wait:
+                    logger.warning(f"⚠️  Login fallido con la cuenta limitada: {email}")
+                    return login_limited(wait)
+                flash('Email o contraseña incorrectos', 'error')
+                logger.warning(f"Login fallido para: {email}")
+        
+        return render_template('login.html')
+        
+    except Exception as e:
+        logger.error(f"Error en login: {str(e)}")
+        flash('Error interno del servidor. Por favor intenta nuevamente.', 'error')
+        return render_template('login.html')
+
+@bp.route('/register', methods=['GET', 'POST'])
+@jefe_required
+def register():
+    if request.method == 'POST':
+        try:
+            email = request.form['email']
+            name = request.form['name']
+            password = request.form['password']
+            role = request.form['role']
+            
+            if User.query.filter_by(email=email).first():
+                flash('El email ya está registrado', 'error')
+                return render_template('register.html')
+            
+            shop_id = current_shop_id()
+            user = User(email=email, name=name, role=role, shop_id=shop_id)
+            user.set_password(password)
+            
+            db.session.add(user)
+            bump_data_version(shop_scope(shop_id))
+            db.session.commit()
+            invalidate_current_user()
+            cache.invalidate_prefix(f'users:{shop_id}:')
+            
+            flash('Usuario creado exitosamente', 'success')
+            return redirect(url_for('.admin_users'))
+            
+        except Exception as e:
+            flash('Error al crear usuario: ' + str(e), 'error')
+    
+    return render_template('register.html')
+
+@bp.route('/dashboard')
+@replica_reads
+@conditional_get(own_scopes)
+@login_required
+def dashboard():
+    try:
+        user = current_user()
+        shop_id = current_shop_id()
+        today = date.today()
+        today_cuts = HairCut.query.filter_by(shop_id=shop_id, user_id=user.id, date_cut=today).all()
+        
+        # ✅ Totales calculados en SQL, una sola consulta para todos los periodos
+        totals = cut_period_totals({
+            'daily': (today, today),
+            'weekly': (today - timedelta(days=7), None),
+            'biweekly': (today - timedelta(days=14), None),
+        }, shop_id, user_id=user.id)
+        
+        daily_total = totals['daily']['total']
+        daily_divided = totals['daily']['divided_total']
+        weekly_total = totals['weekly']['total']
+        weekly_divided = totals['weekly']['divided_total']
+        biweekly_total = totals['biweekly']['total']
+        biweekly_divided = totals['biweekly']['divided_total']
+        
+        return render_template('dashboard.html',
+                             user=user,
+                             today_cuts=today_cuts,
+                             daily_total=daily_total,
+                             daily_divided=daily_divided,
+                             weekly_total=weekly_total,
+                             weekly_divided=weekly_divided,
+                             biweekly_total=biweekly_total,
+                             biweekly_divided=biweekly_divided)
+                             
+    except Exception as e:
+        logger.error(f"Error en dashboard: {str(e)}")
+        flash('Error al cargar el dashboard', 'error')
+        return redirect(url_for('.login'))
+
+@bp.route('/add_cut', methods=['GET', 'POST'])
+@login_required
+def add_cut():
+    if request.method == 'POST':
+        try:
+            date_cut, price, quantity, key = parse_cut(request.form)
+            
+            user = current_user()
+            created, _ = insert_cuts(user, [(date_cut, price, quantity, key)], current_shop_id())
+            
+            if created:
+                flash('Corte registrado exitosamente', 'success')
+            else:
+                flash('Este corte ya estaba registrado', 'success')
+            return redirect(url_for('.dashboard'))
+            
+        except Exception as e:
+            db.session.rollback()
+            flash('Error al registrar el corte: ' + str(e), 'error')
+    
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    return render_template('add_cut.html',
+                         current_date=current_date,
+                         idempotency_key=uuid.uuid4().hex)
+
+@bp.route('/calendar')
+@replica_reads
+@query_budget(4)
+@conditional_get(viewer_scopes)
+@login_required
+def calendar():
+    user = current_user()
+    selected_date = request.args.get('date', date.today().isoformat())
+    
+    try:
+        selected_date = datetime.strptime(selected_date, '%Y-%m-%d').date()
+    except:
+        selected_date = date.today()
+    
+    source = archive.hair_cuts(selected_date)
+    cuts_query = db.session.query(source).options(joinedload(source.barber)).filter(
+        source.shop_id == current_shop_id(),
+        source.date_cut == selected_date,
+    )
+    if user.role != 'jefe':
+        cuts_query = cuts_query.filter(source.user_id == user.id)
+    cuts = cuts_query.all()
+    
+    return render_template('calendar.html', cuts=cuts, selected_date=selected_date)
+
+def calendar_month_args(user):
+    """Mes (``?month=YYYY-MM``) y barbero a mostrar; un barbero sólo ve lo suyo."""
+    month = month_start_of(_month_arg('month') or date.today().strftime('%Y-%m'))
+    barber_id = request.args.get('user_id', type=int) if user.role == 'jefe' else user.id
+    return month, barber_id
+
+def month_totals(days):
+    return {
+        field: sum(day[field] for day in days)
+        for field in ('entries', 'quantity', 'total', 'divided_total')
+    }
+
+@bp.route('/calendar/month')
+@replica_reads
+@query_budget(4)
+@conditional_get(viewer_scopes)
+@login_required
+def calendar_month():
+    user = current_user()
+    shop_id = current_shop_id()
+    month, barber_id = calendar_month_args(user)
+    first, last = month_range(month)
+    days = {day['date']: day for day in cut_days(first, last, shop_id, barber_id)}
+    
+    weeks = [
+        [(day, days.get(day.isoformat())) if day.month == month.month else (None, None) for day in week]
+        for week in Calendar().monthdatescalendar(month.year, month.month)
+    ]
+    previous_month = (first - timedelta(days=1)).strftime('%Y-%m')
+    next_month = (last + timedelta(days=1)).strftime('%Y-%m')
+    
+    return render_template('calendar_month.html',
+                         user=user,
+                         month=month,
+                         weeks=weeks,
+                         totals=month_totals(days.values()),
+                         barber_id=barber_id,
+                         barbers=shop_users(shop_id) if user.role == 'jefe' else [],
+                         previous_month=previous_month,
+                         next_month=next_month,
+                         today=date.today())
+
+@bp.route('/api/calendar/month')
+@replica_reads
+@query_budget(3)
+@conditional_get(viewer_scopes)
+@login_required
+def api_calendar_month():
+    user = current_user()
+    month, barber_id = calendar_month_args(user)
+    days = cut_days(*month_range(month), current_shop_id(), barber_id)
+    return jsonify(month=month.strftime('%Y-%m'),
+                   user_id=barber_id,
+                   days=days,
+                   totals=month_totals(days))
+
+@bp.route('/weekly_summary')
+@replica_reads
+@query_budget(5)
+@conditional_get(viewer_scopes)
+@login_required
+def weekly_summary():
+    user = current_user()
+    shop_id = current_shop_id()
+    
+    specific_user_id = request.args.get('user_id')
+    weeks_back = int(request.args.get('weeks', 0))
+    
+    end_date = date.today() - timedelta(weeks=weeks_back)
+    start_date = end_date - timedelta(days=6)
+    
+    if user.role == 'jefe' and specific_user_id:
+        specific_user = User.query.filter_by(id=specific_user_id, shop_id=shop_id).first_or_404()
+        page_title = f"Cortes de {specific_user.name}"
+    elif user.role == 'jefe':
+        page_title = "Todos los Cortes"
+    else:
+        page_title = "Mis Cortes"
+    
+    source = archive.hair_cuts(start_date)
+    page = cuts_page(cut_filters(user, shop_id, start_date, end_date, specific_user_id, source), source)
+    cuts = page.items
+    first_page_url, next_page_url = page_urls(page)
+    
+    week_user_id = user.id if user.role != 'jefe' else specific_user_id
+    week_totals = cut_period_totals({'week': (start_date, end_date)}, shop_id, user_id=week_user_id)['week']
+    total_cuts = week_totals['quantity']
+    total_earned = week_totals['total']
+    total_divided = week_totals['divided_total']
+    
+    return render_template('weekly_summary.html',
+                         cuts=cuts,
+                         start_date=start_date,
+                         end_date=end_date,
+                         total_cuts=total_cuts,
+                         total_earned=total_earned,
+                         total_divided=total_divided,
+                         user=user,
+                         weeks_back=weeks_back,
+                         page_title=page_title,
+                         specific_user_id=specific_user_id,
+                         first_page_url=first_page_url,
+                         next_page_url=next_page_url)
+
+@bp.route('/admin/dashboard')
+@replica_reads
+@query_budget(7)
+@conditional_get(shop_scopes)
+@jefe_required
+def admin_dashboard():
+    shop_id = current_shop_id()
+    today = date.today()
+    
+    today_cuts = HairCut.query.options(
+        joinedload(HairCut.barber)
+    ).filter_by(shop_id=shop_id, date_cut=today).all()
+    
+    totals = shop_cut_period_totals(shop_id, {
+        'daily': (today, today),
+        'weekly': (today - timedelta(days=7), None),
+        'monthly': (today - timedelta(days=30), None),
+    })
+    daily_total = totals['daily']['total']
+    daily_divided = totals['daily']['divided_total']
+    weekly_total = totals['weekly']['total']
+    weekly_divided = totals['weekly']['divided_total']
+    monthly_total = totals['monthly']['total']
+    monthly_divided = totals['monthly']['divided_total']
+    
+    month_start = date(today.year, today.month, 1)
+    product_sales_total = shop_product_sales_totals(shop_id, {'month': (month_start, None)})['month']
+    
+    users = shop_users(shop_id)
+    user_totals = shop_cut_totals_by_user(shop_id, today, today)
+    
+    return render_template('admin_dashboard.html',
+                         today_cuts=today_cuts,
+                         daily_total=daily_total,
+                         daily_divided=daily_divided,
+                         weekly_total=weekly_total,
+                         weekly_divided=weekly_divided,
+                         monthly_total=monthly_total,
+                         monthly_divided=monthly_divided,
+                         product_sales_total=product_sales_total,
+                         users=users,
+                         user_totals=user_totals)
+
+@bp.route('/admin/users')
+@jefe_required
+def admin_users():
+    users = User.query.filter_by(shop_id=current_shop_id()).all()
+    return render_template('admin_users.html', users=users)
+
+@bp.route('/admin/delete_user/<int:user_id>')
+@jefe_required
+def delete_user(user_id):
+    try:
+        shop_id = current_shop_id()
+        user = User.query.filter_by(id=user_id, shop_id=shop_id).first_or_404()
+        
+        # No permitir borrarse a sí mismo
+        if user.id == session['user_id']:
+            flash('No puedes eliminar tu propio usuario', 'error')
+            return redirect(url_for('.admin_users'))
+        
+        # Borrar todos los cortes del usuario primero; los archivados, por lotes
+        days = rollup_days(shop_id, user_id)
+        archive.delete_user_cuts(user_id)
+        HairCut.query.filter_by(user_id=user_id).delete()
+        DailyRollup.query.filter_by(user_id=user_id).delete()
+        bump_cut_versions(user_id, shop_id, days)
+        
+        # Borrar el usuario
+        db.session.delete(user)
+        db.session.commit()
+        invalidate_current_user()
+        cache.invalidate_prefix(f'users:{shop_id}:')
+        cache.invalidate_prefix(f'cuts:{shop_id}:')
+        cache.invalidate_prefix(f'sales:{shop_id}:')
+        cache.invalidate_prefix(f'pnl:{shop_id}:')
+        
+        flash(f'Usuario {user.name} eliminado exitosamente', 'success')
+        
+    except Exception as e:
+        flash(f'Error al eliminar usuario: {str(e)}', 'error')
+    
+    return redirect(url_for('.admin_users'))
+
+@bp.route('/admin/expenses', methods=['GET', 'POST'])
+@jefe_required
+def admin_expenses():
+    shop_id = current_shop_id()
+    if request.method == 'POST':
+        month_year = request.form.get('month_year', '')
+        description = request.form.get('description', '')
+        try:
+            amount = float(request.form.get('amount', ''))
+            month_start = month_start_of(month_year)
+            if not math.isfinite(amount):
+                raise ValueError
+        except ValueError:
+            flash('Error al registrar el gasto: mes (AAAA-MM) o monto inválidos', 'error')
+            return redirect(url_for('.admin_expenses'))
+        
+        expense = MonthlyExpense(
+            month_year=month_year,
+            month_start=month_start,
+            amount=amount,
+            description=description,
+            created_by=session['user_id'],
+            shop_id=shop_id
+        )
+        
+        db.session.add(expense)
+        bump_shop_versions(shop_id, [month_start])
+        db.session.commit()
+        cache.invalidate_windows(f'expenses:{shop_id}', month_year)
+        invalidate_pnl(shop_id, month_start)
+        
+        flash('Gasto mensual registrado exitosamente', 'success')
+        return redirect(url_for('.admin_expenses'))
+    
+    start_month, end_month = _month_arg('start'), _month_arg('end')
+    criteria = expense_filters(shop_id, start_month, end_month)
+    page = expenses_page(criteria)
+    first_page_url, next_page_url = page_urls(page)
+    expenses_total = cache.memoize(
+        cache.window_key(shop_cache_prefix('expenses', shop_id), start_month or '', end_month),
+        lambda: float(db.session.query(
+            func.coalesce(func.sum(MonthlyExpense.amount), 0)
+        ).filter(*criteria).scalar()),
+    )
+    current_date = datetime.now().strftime('%Y-%m')
+    
+    return render_template('admin_expenses.html', 
+                         expenses=page.items, 
+                         expenses_total=expenses_total,
+                         first_page_url=first_page_url,
+                         next_page_url=next_page_url,
+                         current_date=current_date)
+
+@bp.route('/admin/product_sales', methods=['GET', 'POST'])
+@jefe_required
+def admin_product_sales():
+    shop_id = current_shop_id()
+    if request.method == 'POST':
+        try:
+            date_sale_str = request.form['date_sale']
+            product_name = request.form['product_name']
+            price = float(request.form['price'])
+            quantity = int(request.form['quantity'])
+            
+            date_sale = datetime.strptime(date_sale_str, '%Y-%m-%d').date()
+            total = price * quantity
+            
+            sale = ProductSale(
+                date_sale=date_sale,
+                product_name=product_name,
+                price=price,
+                quantity=quantity,
+                total=total,
+                created_by=session['user_id'],
+                shop_id=shop_id
+            )
+            
+            db.session.add(sale)
+            bump_daily_rollup(date_sale, shop_id, session['user_id'], product_sales_total=total)
+            bump_shop_versions(shop_id, [date_sale])
+            db.session.commit()
+            cache.invalidate_windows(f'sales:{shop_id}', date_sale.isoformat())
+            invalidate_pnl(shop_id, date_sale)
+            
+            flash('Venta de producto registrada exitosamente', 'success')
+            return redirect(url_for('.admin_product_sales'))
+            
+        except Exception as e:
+            flash('Error al registrar la venta: ' + str(e), 'error')
+    
+    start = _date_arg('start')
+    source = archive.product_sales(start)
+    criteria = product_sale_filters(shop_id, start, _date_arg('end'), request.args.get('product'), source)
+    page = product_sales_page(criteria, source)
+    first_page_url, next_page_url = page_urls(page)
+    
+    today = date.today()
+    sales_totals = shop_product_sales_totals(shop_id, {
+        'today': (today, today),
+        'month': (date(today.year, today.month, 1), None),
+    })
+    today_total = sales_totals['today']
+    month_total = sales_totals['month']
+    
+    current_date = datetime.now().strftime('%Y-%m-%d')
+    
+    return render_template('admin_product_sales.html',
+                         product_sales=page.items,
+                         first_page_url=first_page_url,
+                         next_page_url=next_page_url,
+                         today_total=today_total,
+                         month_total=month_total,
+                         current_date=current_date)
+
+@bp.route('/admin/delete_product_sale/<int:sale_id>')
+@jefe_required
+def delete_product_sale(sale_id):
+    sale = ProductSale.query.filter_by(id=sale_id, shop_id=current_shop_id()).first_or_404()
+    db.session.delete(sale)
+    bump_daily_rollup(sale.date_sale, sale.shop_id, sale.created_by, product_sales_total=-sale.total)
+    bump_shop_versions(sale.shop_id, [sale.date_sale])
+    db.session.commit()
+    cache.invalidate_windows(f'sales:{sale.shop_id}', sale.date_sale.isoformat())
+    invalidate_pnl(sale.shop_id, sale.date_sale)
+    flash('Venta de producto eliminada exitosamente', 'success')
+    return redirect(url_for('.admin_product_sales'))
+
+def pnl_months():
+    """Meses del año pedido en ``/admin/pnl``: hasta diciembre, o hasta el actual."""
+    today = date.today()
+    year = request.args.get('year', today.year, type=int)
+    if not 2000 <= year <= today.year:
+        year = today.year
+    last_month = 12 if year < today.year else today.month
+    return [date(year, month, 1) for month in range(1, last_month + 1)]
+
+def pnl_scopes():
+    # Las versiones de cada mes salen en la misma consulta que el ETag
+    shop_id = current_shop_id()
+    return [shop_scope(shop_id)] + [month_scope(shop_id, month) for month in pnl_months()]
+
+@bp.route('/admin/pnl')
+@replica_reads
+@query_budget(5)
+@conditional_get(pnl_scopes)
+@jefe_required
+def admin_pnl():
+    shop_id = current_shop_id()
+    today = date.today()
+    requested = pnl_months()
+    year = requested[0].year
+    months = monthly_pnl(shop_id, requested[0], requested[-1])
+    year_total = sum_pnl(months)
+    names = {user['id']: user['name'] for user in shop_users(shop_id)}
+    
+    return render_template('admin_pnl.html',
+                         year=year,
+                         current_year=today.year,
+                         months=months,
+                         year_total=year_total,
+                         names=names)
+
+WEEKDAY_NAMES = ('Lunes', 'Martes', 'Miércoles', 'Jueves', 'Viernes', 'Sábado', 'Domingo')
+
+@bp.route('/admin/analytics')
+@replica_reads
+@query_budget(4)
+@conditional_get(shop_scopes)
+@jefe_required
+def admin_analytics():
+    shop_id = current_shop_id()
+    weeks = request.args.get('weeks', analytics.DEFAULT_WEEKS, type=int)
+    barber_id = request.args.get('user_id', type=int)
+    stats = analytics.barber_analytics(
+        shop_id,
+        weeks=weeks,
+        user_id=barber_id,
+        utc_offset_hours=current_app.config['LOCAL_UTC_OFFSET_HOURS'],
+    )
+    if request.args.get('format') == 'json':
+        return jsonify(stats)
+    
+    users = shop_users(shop_id)
+    return render_template('admin_analytics.html',
+                         stats=stats,
+                         barber_id=barber_id,
+                         barbers=users,
+                         names={user['id']: user['name'] for user in users},
+                         weekday_names=WEEKDAY_NAMES)
+
+@bp.route('/admin/slow_queries', methods=['GET', 'POST'])
+@jefe_required
+def admin_slow_queries():
+    log = slow_queries.get_log()
+    if request.method == 'POST' and log is not None:
+        log.clear()
+        flash('Registro de consultas lentas vaciado', 'success')
+        return redirect(url_for('.admin_slow_queries'))
+    
+    return render_template('admin_slow_queries.html',
+                         enabled=log is not None,
+                         threshold_ms=log.threshold_ms if log else None,
+                         entries=log.entries() if log else [])
+
+@bp.route('/api/cuts')
+@replica_reads
+@login_required
+def api_cuts():
+    start = _date_arg('start')
+    source = archive.hair_cuts(start)
+    criteria = cut_filters(current_user(), current_shop_id(), start, _date_arg('end'),
+                           request.args.get('user_id', type=int), source)
+    return page_json(cuts_page(criteria, source))
+
+@bp.route('/api/cuts/batch', methods=['POST'])
+@login_required
+def api_cuts_batch():
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        return jsonify(error='Se espera un objeto JSON con la lista "cuts"'), 400
+    items = payload.get('cuts')
+    if not isinstance(items, list) or not items:
+        return jsonify(error='Se espera una lista "cuts" con al menos un corte'), 400
+    if len(items) > MAX_BATCH_CUTS:
+        return jsonify(error=f'Máximo {MAX_BATCH_CUTS} cortes por envío'), 400
+    # Cortes guardados sin conexión por otra sesión del mismo navegador
+    if payload.get('user_id') is not None and str(payload['user_id']) != str(session['user_id']):
+        return jsonify(error='Los cortes son de otro usuario', user_id=session['user_id']), 409
+    
+    parsed = []
+    for index, item in enumerate(items):
+        try:
+            parsed.append(parse_cut(item if isinstance(item, dict) else {}))
+        except ValueError as e:
+            return jsonify(error=f'Corte {index}: {e}', index=index), 400
+    
+    user = current_user()
+    try:
+        created, duplicates = insert_cuts(user, parsed, current_shop_id())
+    except IntegrityError:
+        # Otro envío con las mismas claves ganó la carrera; reintentar omite esas filas
+        db.session.rollback()
+        created, duplicates = insert_cuts(user, parsed, current_shop_id())
+    
+    return jsonify(created=created, duplicates=duplicates), 201 if created else 200
+
+@bp.route('/api/product_sales')
+@replica_reads
+@jefe_required
+def api_product_sales():
+    start = _date_arg('start')
+    source = archive.product_sales(start)
+    criteria = product_sale_filters(current_shop_id(), start, _date_arg('end'), request.args.get('product'), source)
+    return page_json(product_sales_page(criteria, source))
+
+@bp.route('/api/expenses')
+@replica_reads
+@jefe_required
+def api_expenses():
+    criteria = expense_filters(current_shop_id(), _month_arg('start'), _month_arg('end'))
+    return page_json(expenses_page(criteria))
+
+CUT_EXPORT_HEADER = ['fecha', 'barbero', 'precio', 'cantidad', 'total', 'parte_barbero', 'registrado']
+PRODUCT_SALE_EXPORT_HEADER = ['fecha', 'producto', 'precio', 'cantidad', 'total']
+EXPENSE_EXPORT_HEADER = ['mes', 'descripcion', 'monto', 'registrado']
+
+def cut_export_query(criteria, cuts=HairCut):
+    return db.session.query(
+        cuts.date_cut, User.name, cuts.price, cuts.quantity,
+        cuts.total, cuts.divided_total, cuts.date_recorded,
+    ).join(User, cuts.user_id == User.id).filter(*criteria).order_by(
+        cuts.date_cut, cuts.id
+    )
+
+def cut_export_rows(query):
+    return (
+        (date_cut.isoformat(), barber, exports.money(price), quantity,
+         exports.money(total), exports.money(divided), recorded.strftime('%Y-%m-%d %H:%M') if recorded else '')
+        for date_cut, barber, price, quantity, total, divided, recorded in exports.stream_query(query)
+    )
+
+def product_sale_export_query(criteria, sales=ProductSale):
+    return db.session.query(
+        sales.date_sale, sales.product_name, sales.price,
+        sales.quantity, sales.total,
+    ).filter(*criteria).order_by(sales.date_sale, sales.id)
+
+def product_sale_export_rows(query):
+    return (
+        (date_sale.isoformat(), product_name, exports.money(price), quantity, exports.money(total))
+        for date_sale, product_name, price, quantity, total in exports.stream_query(query)
+    )
+
+@bp.route('/export/cuts.csv')
+@replica_reads
+@login_required
+def export_cuts():
+    start = _date_arg('start')
+    source = archive.hair_cuts(start)
+    criteria = cut_filters(current_user(), current_shop_id(), start, _date_arg('end'),
+                           request.args.get('user_id', type=int), source)
+    return exports.csv_response('cortes.csv', CUT_EXPORT_HEADER,
+                                cut_export_rows(cut_export_query(criteria, source)))
+
+@bp.route('/export/product_sales.csv')
+@replica_reads
+@jefe_required
+def export_product_sales():
+    start = _date_arg('start')
+    source = archive.product_sales(start)
+    criteria = product_sale_filters(current_shop_id(), start, _date_arg('end'), request.args.get('product'), source)
+    return exports.csv_response('ventas_productos.csv', PRODUCT_SALE_EXPORT_HEADER,
+                                product_sale_export_rows(product_sale_export_query(criteria, source)))
+
+@bp.route('/export/expenses.csv')
+@replica_reads
+@jefe_required
+def export_expenses():
+    criteria = expense_filters(current_shop_id(), _month_arg('start'), _month_arg('end'))
+    query = db.session.query(
+        MonthlyExpense.month_year, MonthlyExpense.description, MonthlyExpense.amount,
+        MonthlyExpense.created_at,
+    ).filter(*criteria).order_by(MonthlyExpense.month_year, MonthlyExpense.id)
+    rows = (
+        (month_year, description or '', exports.money(amount),
+         created_at.strftime('%Y-%m-%d') if created_at else '')
+        for month_year, description, amount, created_at in exports.stream_query(query)
+    )
+    return exports.csv_response('gastos.csv', EXPENSE_EXPORT_HEADER, rows)
+
+# Sedes (dueño)
+@bp.route('/owner/shops', methods=['GET', 'POST'])
+@owner_required
+def owner_shops():
+    if request.method == 'POST':
+        name = request.form.get('name', '').strip()
+        if not name:
+            flash('El nombre de la sede es obligatorio', 'error')
+        else:
+            db.session.add(Shop(name=name))
+            db.session.commit()
+            flash(f'Sede {name} creada exitosamente', 'success')
+        return redirect(url_for('.owner_shops'))
+    
+    today = date.today()
+    periods = {
+        'today': (today, today),
+        'month': (date(today.year, today.month, 1), None),
+        'year': (date(today.year, 1, 1), None),
+    }
+    shops = shops_rollup(periods)
+    totals = {
+        name: {field: sum(shop['periods'][name][field] for shop in shops)
+               for field in ('quantity', 'total', 'shop_share', 'product_income')}
+        for name in periods
+    }
+    return render_template('owner_shops.html',
+                         shops=shops,
+                         totals=totals,
+                         current_shop_id=current_shop_id())
+
+@bp.route('/owner/shops/<int:shop_id>/select', methods=['POST'])
+@owner_required
+def select_owner_shop(shop_id):
+    shop = Shop.query.get_or_404(shop_id)
+    select_shop(shop)
+    flash(f'Trabajando en {shop.name}', 'success')
+    return redirect(url_for('.admin_dashboard'))
+
+# Trabajos en segundo plano
+def _iso_date(value):
+    try:
+        return datetime.strptime(value or '', '%Y-%m-%d').date()
+    except ValueError:
+        return None
+
+@jobs.task('export_cuts', params=('start', 'end', 'user_id'))
+def export_cuts_job(job, shop_id, start=None, end=None, user_id=None):
+    user = db.session.get(User, job.user_id)
+    barber_id = int(user_id) if user_id and user_id.isdigit() else None
+    start = _iso_date(start)
+    source = archive.hair_cuts(start)
+    query = cut_export_query(cut_filters(user, shop_id, start, _iso_date(end), barber_id, source), source)
+    exports.write_csv(job.artifact_path, CUT_EXPORT_HEADER, cut_export_rows(query),
+                      on_row=job.counter(query.count()))
+    return 'cortes.csv'
+
+@jobs.task('export_product_sales', params=('start', 'end', 'product'), jefe_only=True)
+def export_product_sales_job(job, shop_id, start=None, end=None, product=None):
+    start = _iso_date(start)
+    source = archive.product_sales(start)
+    query = product_sale_export_query(product_sale_filters(shop_id, start, _iso_date(end), product, source), source)
+    exports.write_csv(job.artifact_path, PRODUCT_SALE_EXPORT_HEADER, product_sale_export_rows(query),
+                      on_row=job.counter(query.count()))
+    return 'ventas_productos.csv'
+
+@jobs.task('pnl', params=('start_year', 'end_year'), jefe_only=True)
+def pnl_job(job, shop_id, start_year=None, end_year=None):
+    """Recalcula el P&L de la sede año por año (repoblando la caché) y lo deja en CSV."""
+    today = date.today()
+    end_year = min(int(end_year) if end_year and end_year.isdigit() else today.year, today.year)
+    start_year = max(int(start_year) if start_year and start_year.isdigit() else end_year, 2000)
+    years = range(start_year, end_year + 1)
+    cache.invalidate_prefix(f'pnl:{shop_id}:')
+    
+    months = []
+    for index, year in enumerate(years):
+        last_month = date(year, 12, 1) if year < today.year else date(today.year, today.month, 1)
+        months.extend(monthly_pnl(shop_id, date(year, 1, 1), last_month))
+        job.update((index + 1) / len(years), f'Año {year} listo')
+    
+    fields = ['cut_quantity', 'cut_total', 'payouts', 'shop_share', 'product_income', 'revenue', 'expenses', 'net']
+    rows = ([row['month']] + [exports.money(row[field]) if isinstance(row[field], float) else row[field]
+                              for field in fields] for row in months)
+    exports.write_csv(job.artifact_path, ['mes'] + fields, rows)
+    return f'pnl_{start_year}_{end_year}.csv'
+
+@jobs.task('rebuild_rollups', jefe_only=True)
+def rebuild_rollups_job(job, shop_id):
+    """Reconstruye el resumen diario de la sede del jefe; las demás no se tocan."""
+    job.update(0.1, 'Reconstruyendo resumen diario')
+    barbers = {id_ for id_, in db.session.query(DailyRollup.user_id).filter_by(shop_id=shop_id).distinct()}
+    days = set(rollup_days(shop_id))
+    rows = rebuild_daily_rollups(shop_id)
+    barbers.update(id_ for id_, in db.session.query(DailyRollup.user_id).filter_by(shop_id=shop_id).distinct())
+    days.update(rollup_days(shop_id))
+    bump_data_version(*(user_scope(id_) for id_ in barbers))
+    bump_shop_versions(shop_id, days)
+    db.session.commit()
+    cache.invalidate_prefix(f'cuts:{shop_id}:')
+    cache.invalidate_prefix(f'sales:{shop_id}:')
+    cache.invalidate_prefix(f'pnl:{shop_id}:')
+    logger.info(f"✅ Resumen diario de la sede {shop_id} reconstruido: {rows} filas")
+    return None
+
+def job_json(job):
+    data = {key: value for key, value in job.to_dict().items() if key not in ('pid', 'user_id')}
+    data['status_url'] = url_for('.job_status', job_id=job.id)
+    if job.status == jobs.DONE and job.filename:
+        data['download_url'] = url_for('.job_download', job_id=job.id)
+    return data
+
+def visible_job(job):
+    """Un barbero ve sus trabajos; el jefe, todos los de la sede en que trabaja."""
+    if session.get('user_role') != 'jefe':
+        return job.user_id == session['user_id']
+    return job.params.get('shop_id') == current_shop_id()
+
+def viewer_job(job_id):
+    """El trabajo ``job_id`` si el usuario puede verlo."""
+    job = jobs.get_runner().get(job_id)
+    if job is None or not visible_job(job):
+        return None
+    return job
+
+@bp.route('/jobs', methods=['GET', 'POST'])
+@login_required
+def job_list():
+    is_jefe = session.get('user_role') == 'jefe'
+    if request.method == 'POST':
+        kind = request.form.get('kind', '')
+        spec = jobs.TASKS.get(kind)
+        if spec is None or (spec['jefe_only'] and not is_jefe):
+            return jsonify(error='Trabajo desconocido'), 404
+        params = {name: request.form[name] for name in spec['params'] if request.form.get(name)}
+        params['shop_id'] = current_shop_id()
+        try:
+            job = jobs.get_runner().submit(kind, session['user_id'], params)
+        except jobs.JobQueueFull:
+            response = jsonify(error='Hay demasiados trabajos en cola, intenta en unos minutos')
+            response.headers['Retry-After'] = '60'
+            return response, 503
+        if request.accept_mimetypes.best == 'application/json':
+            return jsonify(job_json(job)), 202
+        flash('Trabajo en cola; esta página se actualiza sola', 'success')
+        return redirect(url_for('.job_list'))
+    
+    job_items = [job for job in jobs.get_runner().list(None if is_jefe else session['user_id'])
+                 if visible_job(job)]
+    return render_template('jobs.html',
+                         jobs=[job_json(job) for job in job_items],
+                         is_jefe=is_jefe,
+                         current_year=date.today().year)
+
+@bp.route('/jobs/<job_id>')
+@login_required
+def job_status(job_id):
+    job = viewer_job(job_id)
+    if job is None:
+        return jsonify(error='Trabajo no encontrado'), 404
+    return jsonify(job_json(job))
+
+@bp.route('/jobs/<job_id>/download')
+@login_required
+def job_download(job_id):
+    job = viewer_job(job_id)
+    if job is None or job.status != jobs.DONE or not job.filename:
+        return jsonify(error='Archivo no disponible'), 404
+    return send_file(job.artifact_path, mimetype='text/csv', as_attachment=True,
+                     download_name=job.filename)
+
+@bp.route('/logout')
+def logout():
+    session.clear()
+    return redirect(url_for('.login'))
+
+@bp.route('/manifest.json')
+def manifest():
+    return current_app.send_static_file('manifest.json')
+
+@bp.route('/sw.js')
+def service_worker():
+    shell_urls, cdn_urls = assets.shell_urls()
+    script = render_template('sw.js',
+                             version=current_app.config['ASSET_VERSION'],
+                             shell_urls=shell_urls,
+                             cdn_urls=cdn_urls,
+                             batch_url=url_for('.api_cuts_batch'),
+                             max_batch_cuts=MAX_BATCH_CUTS,
+                             add_cut_path=url_for('.add_cut'),
+                             login_path=url_for('.login'),
+                             logout_path=url_for('.logout'))
+    response = make_response(script)
+    response.headers['Content-Type'] = 'application/javascript; charset=utf-8'
+    # El navegador debe revisar siempre si hay un service worker nuevo
+    response.headers['Cache-Control'] = 'no-cache'
+    return response